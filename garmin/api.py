@@ -1,19 +1,63 @@
 ## garmin/api.py
+# garth and boto3 are slow to import and only needed once a session actually
+# connects, so they are imported where used to keep cold starts cheap.
+import copy
 import os
-import garth
+import re
+from dataclasses import asdict
 from getpass import getpass
-from garth.exc import GarthException
 import json
-import boto3
-from botocore.exceptions import ClientError
 import tempfile
-import shutil
+import threading
+import time
+from garmin import instrumentation
+from garmin.rate_limit import RateLimiter, RetryPolicy, endpoint_family
+
+# Token state shared by every session in the process, so warm Lambda
+# invocations authenticate without calling Secrets Manager. Tokens are also
+# kept in TOKEN_CACHE_DIR, which survives for the lifetime of the container.
+TOKEN_CACHE_DIR = os.environ.get(
+    'GARMIN_TOKEN_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'garmin_tokens')
+)
+# Refresh the OAuth2 token proactively once it is this close to expiring.
+TOKEN_REFRESH_MARGIN_S = 300
+_SECRETS_CLIENT = None
+_TOKEN_CACHE: dict = {}
+# Secret whose tokens garth.client (a process-wide singleton) was last loaded from
+_GARTH_SECRET = None
 
 class GarminSession:
     """
     Wraps garth.client for login/session management.
     """
-    def __init__(self, data_dir=None, garth_home=None):
+    def __init__(self, data_dir=None, garth_home=None, response_cache=None,
+                 rate_limiter=None, retry_policy=None, archive=None, pool_maxsize=None,
+                 secrets_client=None, base_url=None):
+        """
+        Args:
+            data_dir (str, optional): Root for local session data.
+            garth_home (str, optional): Directory holding the garth tokens.
+            response_cache (ResponseCache, optional): Cache for GET responses.
+                If not given, one is created when GARMIN_RESPONSE_CACHE=1.
+            rate_limiter (RateLimiter, optional): Per-endpoint-family token
+                buckets. Defaults to GARMIN_RATE_LIMIT requests/second
+                (default 5) with bursts of GARMIN_RATE_BURST (default 10).
+            retry_policy (RetryPolicy, optional): Backoff for 429/5xx errors.
+                Defaults to GARMIN_MAX_RETRIES retries (default 4).
+            archive (ResponseArchive, optional): Append-only store that every
+                raw response from the network is written to. If not given, one
+                is created when GARMIN_RAW_ARCHIVE=1.
+            pool_maxsize (int, optional): HTTP connections kept open to Garmin,
+                shared by every thread using this session. Defaults to
+                GARMIN_HTTP_POOL (default 32).
+            secrets_client (optional): Secrets Manager client (or a stub with
+                get_secret_value/put_secret_value). Defaults to one boto3
+                client shared by the whole process.
+            base_url (str, optional): Send requests as plain HTTP to this
+                host instead of through garth, e.g. a MockGarminServer for
+                load tests. Defaults to GARMIN_API_BASE_URL; no login or
+                tokens are used when set.
+        """
         # Set default data directory relative to this file if not provided.
         if data_dir is None:
             data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data'))
@@ -28,6 +72,33 @@ class GarminSession:
         self.password = os.environ.get('GARMIN_PASSWORD')
         self.garth = None
         self._connected = False
+        self._connect_lock = threading.Lock()
+        self.secrets_client = secrets_client
+        self._saved_tokens = None
+        self.pool_maxsize = pool_maxsize or int(os.environ.get('GARMIN_HTTP_POOL', 32))
+        self.base_url = (base_url or os.environ.get('GARMIN_API_BASE_URL') or '').rstrip('/') or None
+        self._http = None
+        if response_cache is None and os.environ.get('GARMIN_RESPONSE_CACHE') == '1':
+            from garmin.io.response_cache import ResponseCache
+            response_cache = ResponseCache()
+        self.response_cache = response_cache
+        if archive is None and os.environ.get('GARMIN_RAW_ARCHIVE') == '1':
+            from garmin.io.archive import ResponseArchive
+            archive = ResponseArchive()
+        self.archive = archive
+        self.rate_limiter = rate_limiter or RateLimiter(
+            rate=float(os.environ.get('GARMIN_RATE_LIMIT', 5)),
+            burst=int(os.environ.get('GARMIN_RATE_BURST', 10)),
+        )
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_retries=int(os.environ.get('GARMIN_MAX_RETRIES', 4)),
+        )
+        self.stats = {
+            'requests': 0, 'throttled': 0, 'throttle_wait_s': 0.0, 'retried': 0,
+            'secret_reads': 0, 'secret_writes': 0,
+        }
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
 
     def _is_aws(self):
         return os.environ.get('AWS_EXECUTION_ENV') is not None or os.environ.get('GARMIN_USE_AWS_SECRETS') == '1'
@@ -36,99 +107,287 @@ class GarminSession:
         # You may want to customize this per user/environment
         return os.environ.get('GARMIN_AWS_SECRET_NAME', 'garmin/oauth2_token')
 
+    def _secrets(self):
+        """The injected Secrets Manager client, else one shared per process."""
+        global _SECRETS_CLIENT
+        if self.secrets_client is not None:
+            return self.secrets_client
+        if _SECRETS_CLIENT is None:
+            import boto3
+            region = os.environ.get('AWS_REGION', 'us-east-2')
+            _SECRETS_CLIENT = boto3.client('secretsmanager', region_name=region)
+        return _SECRETS_CLIENT
+
+    def _secret_names(self):
+        secret_name2 = self._get_secret_name()  # garmin/oauth2_token
+        return secret_name2.replace('oauth2_token', 'oauth1_token'), secret_name2
+
+    def _token_cache_file(self):
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', self._get_secret_name())
+        return os.path.join(TOKEN_CACHE_DIR, f"{safe_name}.json")
+
+    @staticmethod
+    def _usable(tokens):
+        """Tokens are worth reusing until the refresh token expires."""
+        oauth2 = (tokens or {}).get('oauth2')
+        return bool(oauth2) and oauth2.get('refresh_token_expires_at', 0) > time.time()
+
+    def _cached_tokens(self):
+        """Tokens from this process, else from the /tmp cache, if still usable."""
+        tokens = _TOKEN_CACHE.get(self._get_secret_name())
+        if self._usable(tokens):
+            return tokens
+        try:
+            with open(self._token_cache_file()) as f:
+                tokens = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return tokens if self._usable(tokens) else None
+
+    def _cache_tokens(self, tokens):
+        _TOKEN_CACHE[self._get_secret_name()] = tokens
+        try:
+            os.makedirs(TOKEN_CACHE_DIR, mode=0o700, exist_ok=True)
+            path = self._token_cache_file()
+            with open(path, 'w') as f:
+                json.dump(tokens, f)
+            os.chmod(path, 0o600)
+        except OSError as e:
+            print(f"[WARN] Could not write token cache: {e}")
+
+    def _fetch_secret_tokens(self):
+        from botocore.exceptions import ClientError
+        secret_name1, secret_name2 = self._secret_names()
+        print(f"[DEBUG] Loading token from AWS Secrets Manager: {secret_name2} and {secret_name1}")
+        client = self._secrets()
+        try:
+            secret2 = client.get_secret_value(SecretId=secret_name2)['SecretString']
+            self._count('secret_reads')
+        except ClientError as e:
+            print(f"Error loading oauth2_token from AWS Secrets Manager: {e}")
+            raise
+        # oauth1_token is optional
+        try:
+            secret1 = client.get_secret_value(SecretId=secret_name1)['SecretString']
+            self._count('secret_reads')
+        except ClientError as e:
+            print(f"[DEBUG] oauth1_token not found or error: {e}.")
+            secret1 = 'null'
+        return {'oauth1': json.loads(secret1) or None, 'oauth2': json.loads(secret2)}
+
+    @staticmethod
+    def _current_tokens(garth):
+        oauth1, oauth2 = garth.client.oauth1_token, garth.client.oauth2_token
+        return {
+            'oauth1': asdict(oauth1) if oauth1 else None,
+            'oauth2': asdict(oauth2) if oauth2 else None,
+        }
+
     def _load_token(self):
+        global _GARTH_SECRET
+        import garth
         if self._is_aws():
-            secret_name2 = self._get_secret_name()  # garmin/oauth2_token
-            secret_name1 = secret_name2.replace('oauth2_token', 'oauth1_token')
-            region = os.environ.get('AWS_REGION', 'us-east-2')
-            print(f"[DEBUG] Loading token from AWS Secrets Manager: {secret_name2} and {secret_name1} in region {region}")
-            client = boto3.client('secretsmanager', region_name=region)
-            temp_dir = tempfile.mkdtemp()
-            # Load oauth2_token.json
-            try:
-                get_secret_value_response = client.get_secret_value(SecretId=secret_name2)
-                secret2 = get_secret_value_response['SecretString']
-                print(f"[DEBUG] oauth2_token secret loaded, length: {len(secret2)}")
-                token_data2 = json.loads(secret2)
-                oauth2_path = os.path.join(temp_dir, 'oauth2_token.json')
-                with open(oauth2_path, 'w') as f:
-                    json.dump(token_data2, f)
-                print(f"[DEBUG] Written oauth2_token.json to temp dir: {oauth2_path}")
-            except ClientError as e:
-                print(f"Error loading oauth2_token from AWS Secrets Manager: {e}")
-                raise
-            # Load oauth1_token.json (optional)
-            try:
-                get_secret_value_response = client.get_secret_value(SecretId=secret_name1)
-                secret1 = get_secret_value_response['SecretString']
-                print(f"[DEBUG] oauth1_token secret loaded, length: {len(secret1)}")
-                token_data1 = json.loads(secret1)
-                oauth1_path = os.path.join(temp_dir, 'oauth1_token.json')
-                with open(oauth1_path, 'w') as f:
-                    json.dump(token_data1, f)
-                print(f"[DEBUG] Written oauth1_token.json to temp dir: {oauth1_path}")
-            except ClientError as e:
-                print(f"[DEBUG] oauth1_token not found or error: {e}. Writing empty oauth1_token.json.")
-                oauth1_path = os.path.join(temp_dir, 'oauth1_token.json')
-                with open(oauth1_path, 'w') as f:
-                    json.dump({}, f)
-            garth.resume(temp_dir)
+            from garth.auth_tokens import OAuth1Token, OAuth2Token
+            tokens = self._cached_tokens()
+            if tokens is None:
+                tokens = self._fetch_secret_tokens()
+                self._cache_tokens(tokens)
+            else:
+                print("[DEBUG] Using cached token")
+            current = self._current_tokens(garth)
+            if (_GARTH_SECRET == self._get_secret_name() and self._usable(current)
+                    and current['oauth2'].get('expires_at', 0) >= tokens['oauth2'].get('expires_at', 0)):
+                # garth refreshed its token earlier in this process (e.g. mid-way
+                # through a previous warm invocation) and that one is at least
+                # as new as the cache; keep it. Leaving _saved_tokens at the
+                # cached copy makes the next save persist the newer one.
+                print("[DEBUG] Keeping garth's in-process token")
+                self._saved_tokens = tokens
+                return
+            oauth1 = OAuth1Token(**tokens['oauth1']) if tokens['oauth1'] else None
+            garth.client.configure(
+                oauth1_token=oauth1,
+                oauth2_token=OAuth2Token(**tokens['oauth2']),
+                domain=oauth1.domain if oauth1 else None,
+            )
+            _GARTH_SECRET = self._get_secret_name()
         else:
             print(f"[DEBUG] Loading token from local file: {self.garth_home}")
             garth.resume(self.garth_home)
+        self._saved_tokens = self._current_tokens(garth)
 
     def _save_token(self):
+        """Writes the current tokens back, skipping the write if unchanged."""
+        import garth
+        tokens = self._current_tokens(garth)
+        if tokens == self._saved_tokens:
+            print("[DEBUG] Token unchanged, not saving.")
+            return
         if self._is_aws():
-            secret_name = self._get_secret_name()
-            region = os.environ.get('AWS_REGION', 'us-east-2')
-            print(f"[DEBUG] Saving token to AWS Secrets Manager: {secret_name} in region {region}")
-            client = boto3.client('secretsmanager', region_name=region)
-            # Read the token file
-            with open(self.garth_home, 'r') as f:
-                token_data = f.read()
+            from botocore.exceptions import ClientError
+            saved = self._saved_tokens or {}
+            client = self._secrets()
             try:
-                client.put_secret_value(SecretId=secret_name, SecretString=token_data)
-                print(f"[DEBUG] Token saved to AWS Secrets Manager.")
+                for key, secret_name in zip(('oauth1', 'oauth2'), self._secret_names()):
+                    if tokens[key] is not None and tokens[key] != saved.get(key):
+                        print(f"[DEBUG] Saving {key} token to AWS Secrets Manager: {secret_name}")
+                        client.put_secret_value(SecretId=secret_name, SecretString=json.dumps(tokens[key]))
+                        self._count('secret_writes')
             except ClientError as e:
                 print(f"Error saving token to AWS Secrets Manager: {e}")
                 raise
+            self._cache_tokens(tokens)
         else:
             print(f"[DEBUG] Saving token to local file: {self.garth_home}")
             garth.save(self.garth_home)
+        self._saved_tokens = tokens
+
+    def _refresh_if_expiring(self, garth):
+        """Refreshes the OAuth2 token only if it expires within TOKEN_REFRESH_MARGIN_S."""
+        oauth2 = garth.client.oauth2_token
+        if oauth2 is None or garth.client.oauth1_token is None:
+            return
+        if oauth2.expires_at - time.time() > TOKEN_REFRESH_MARGIN_S:
+            return
+        print("[DEBUG] OAuth2 token near expiry, refreshing")
+        garth.client.refresh_oauth2()
+        self._save_token()
+
+    def _connect_base_url(self):
+        """Pooled plain-HTTP transport for `base_url`; no authentication."""
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize)
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        self._connected = True
+
+    def _base_url_request(self, url, method):
+        # Mirrors garth's connectapi: HTTPError on failure, None for 204
+        res = self._http.request(method, f"{self.base_url}/{url.lstrip('/')}")
+        res.raise_for_status()
+        return None if res.status_code == 204 else res.json()
 
     def connect(self):
         """
         Connects to Garmin Connect via the garth package. Uses a stored session if available.
         """
+        if self.base_url:
+            self._connect_base_url()
+            return
+        import garth
+        from garth.exc import GarthException
         try:
             self._load_token()
+            self._refresh_if_expiring(garth)
             _ = garth.client.username  # Test if already logged in.
-        except (FileNotFoundError, GarthException, KeyError, AttributeError):
+        except (FileNotFoundError, GarthException, KeyError, AttributeError, TypeError):
             if not self.username or not self.password:
                 print("Environment variables GARMIN_USERNAME and/or GARMIN_PASSWORD not set.")
                 self.username = input("Email: ")
                 self.password = getpass("Password: ")
             garth.client.login(self.username, self.password)
             self._save_token()
+        # One pooled requests session serves every thread. garth's own urllib3
+        # retries are off: they would retry 408/5xx silently, without jitter,
+        # and end in a RetryError with no status for RetryPolicy to act on.
+        garth.client.configure(
+            pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize,
+            retries=0, status_forcelist=(),
+        )
         self.garth = garth
         self._connected = True
 
     def refresh_token(self):
         """
-        Forces a token refresh and updates the token in AWS/local file.
+        Refreshes the token if it is near expiry and saves it to AWS/local
+        file if it changed (e.g. garth refreshed it during the run).
         """
         if not self._connected:
             self.connect()
-        # Make a trivial authenticated request to force refresh if needed
-        _ = self.garth.client.username
+        if self.garth is None:
+            return
+        self._refresh_if_expiring(self.garth)
         self._save_token()
 
-    def get(self, url):
-        if not self._connected:
-            self.connect()
-        return self.garth.client.connectapi(url)
+    def get(self, url, use_cache=True):
+        if use_cache and self.response_cache is not None:
+            hit, res = self.response_cache.lookup(url)
+            instrumentation.count('garmin.cache_hits' if hit else 'garmin.cache_misses')
+            if hit:
+                return res
+        res = self._request(url)
+        if use_cache and self.response_cache is not None:
+            self.response_cache.put(url, res)
+        return res
+
+    def invalidate_cached(self, url):
+        """Drops a cached GET response, e.g. one that was not ready yet."""
+        if self.response_cache is not None:
+            self.response_cache.invalidate(url)
 
     def post(self, url):
+        return self._request(url, method='POST')
+
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _garth_connectapi(self, url, method):
+        """
+        connectapi through this thread's copy of the logged-in garth client.
+        garth.Client.request keeps the response in `self.last_resp` and
+        returns that attribute, so threads sharing one client can get each
+        other's responses. The copies share the pooled requests session and
+        the tokens: a refresh made on any thread is passed on to the others
+        through garth.client, which is also what _save_token persists.
+        """
+        shared = self.garth.client
+        client = getattr(self._local, 'garth_client', None)
+        if client is None:
+            client = self._local.garth_client = copy.copy(shared)
+        client.oauth1_token, client.oauth2_token = shared.oauth1_token, shared.oauth2_token
+        res = client.connectapi(url, method=method)
+        if client.oauth2_token is not shared.oauth2_token:
+            shared.oauth2_token = client.oauth2_token
+        return res
+
+    def _request(self, url, method='GET'):
+        """
+        Calls the Connect API through the rate limiter, retrying 408/429/5xx
+        responses with exponential backoff and jitter.
+        """
         if not self._connected:
-            self.connect()
-        return self.garth.client.connectapi(url, method='POST')
\ No newline at end of file
+            with self._connect_lock:
+                if not self._connected:
+                    self.connect()
+        attempt = 0
+        with instrumentation.span('garmin.request', label=endpoint_family(url), method=method) as span:
+            while True:
+                waited = self.rate_limiter.acquire(url)
+                if waited > 0:
+                    self._count('throttled')
+                    self._count('throttle_wait_s', waited)
+                    span.add('throttle_wait_ms', waited * 1000)
+                self._count('requests')
+                span.add('attempts')
+                try:
+                    if self._http is not None:
+                        res = self._base_url_request(url, method)
+                    else:
+                        res = self._garth_connectapi(url, method)
+                except Exception as e:
+                    if not self.retry_policy.should_retry(e, attempt):
+                        raise
+                    self._count('retried')
+                    span.add('retries')
+                    time.sleep(self.retry_policy.delay(e, attempt))
+                    attempt += 1
+                    continue
+                if instrumentation.enabled() and res is not None:
+                    # garth only hands back decoded JSON, so size it re-encoded
+                    span.add('response_bytes', len(json.dumps(res)))
+                if self.archive is not None:
+                    self.archive.record(url, method, res)
+                return res
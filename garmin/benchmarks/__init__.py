@@ -0,0 +1 @@
+from garmin.benchmarks.suite import SIZES, STAGES, compare, run_benchmarks
@@ -0,0 +1,373 @@
+## garmin/benchmarks/suite.py
+
+import contextlib
+import io
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+from garmin.mock import MockConfig, MockRouter
+
+# Days of synthetic history per named size. Inputs are fixed (seed and end
+# date), so every run of a size sees identical payloads and rows. Detailed
+# upserts dominate: roughly 2k rows per day, about 0.06s per day on sqlite.
+SIZES = {'small': 30, 'medium': 90, 'large': 365}
+BENCH_END_DATE = '2024-12-31'
+
+DAILY_TYPES = ['weight', 'steps', 'sleep', 'stress', 'body_battery', 'heart_rate']
+DETAILED_TYPES = ['heart_rate', 'respiration', 'spo2', 'steps']
+DASHBOARD_METRICS = ['health_stats', 'heart_rate', 'sleep', 'steps']
+# Same kernels and bandwidths as manual_process_data
+MA_KERNELS = ['gaussian', 'boxcar']
+MA_BANDWIDTHS = [1] + list(range(7, 150, 7))
+
+
+class StageSkipped(Exception):
+    """A stage cannot run here, e.g. an optional dependency is missing."""
+
+
+class CannedSession:
+    """
+    Session answering from responses built once by a MockRouter, so timed
+    runs measure the puller's parsing rather than payload generation.
+    """
+    def __init__(self, config: MockConfig):
+        self.router = MockRouter(config)
+        self.response_cache = None
+        self._responses = {}
+
+    def get(self, url, use_cache=True):
+        if url not in self._responses:
+            parts = urlsplit(url)
+            self._responses[url] = self.router.route('GET', '/' + parts.path.lstrip('/'),
+                                                     parse_qs(parts.query))[1]
+        return self._responses[url]
+
+    def post(self, url):
+        return {'status': 'SUBMITTED'}
+
+    def invalidate_cached(self, url):
+        pass
+
+
+class Context:
+    """Per-size inputs shared between stages, built lazily and cached."""
+    def __init__(self, size: str, work_dir: str):
+        self.size = size
+        self.days = SIZES[size]
+        self.work_dir = work_dir
+        self.config = MockConfig(history_days=self.days, end_date=BENCH_END_DATE, seed=0)
+        self.session = CannedSession(self.config)
+        self.start_date = self.session.router.payloads.first_day.isoformat()
+        self._cache = {}
+        self._n_dbs = 0
+
+    def cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def new_db(self):
+        from garmin.io.db_manager import DatabaseManager
+        self._n_dbs += 1
+        return DatabaseManager(f"sqlite:///{os.path.join(self.work_dir, f'{self.size}_{self._n_dbs}.db')}")
+
+    def health_puller(self):
+        from garmin.pullers.health import HealthPuller
+        return HealthPuller(self.session, adaptive=False, max_workers=1)
+
+    def detailed_puller(self):
+        from garmin.pullers.health_detailed import HealthDetailedPuller
+        return HealthDetailedPuller(self.session, max_workers=1)
+
+    def updater(self, db_manager):
+        from garmin.updaters import DataUpdater
+        return DataUpdater(session=self.session, db_manager=db_manager,
+                           health_puller=self.health_puller(),
+                           health_detailed_puller=self.detailed_puller())
+
+    def daily_frames(self):
+        puller = self.health_puller()
+        return self.cached('daily', lambda: {
+            t: puller.pull_data(t, self.start_date, BENCH_END_DATE, show_progress=False)
+            for t in DAILY_TYPES
+        })
+
+    def detailed_frames(self):
+        def build():
+            puller = self.detailed_puller()
+            out = {}
+            for t in DETAILED_TYPES:
+                df = puller.pull_data(t, self.start_date, BENCH_END_DATE)
+                out[t] = (df, dict(puller._last_pull_status))
+            return out
+        return self.cached('detailed', build)
+
+    def filled_db(self):
+        def build():
+            db = self.new_db()
+            updater = self.updater(db)
+            for model, df in _daily_models(self.daily_frames()):
+                updater._upsert(model, df, ['date'])
+            for model, (df, status) in _detailed_models(self.detailed_frames()):
+                updater._write_detailed_chunk(model, df, status)
+            return db
+        return self.cached('db', build)
+
+    def raw_tables(self):
+        db = self.filled_db()
+        tables = ['health_stats', 'sleep', 'steps', 'stress', 'heart_rate', 'body_battery']
+        return self.cached('raw', lambda: {t: db.get_df(t) for t in tables})
+
+    def processor(self):
+        try:
+            from garmin.data_processor.processor import GarminDataProcessor
+        except ImportError as e:
+            raise StageSkipped(f"processor unavailable: {e}")
+        return GarminDataProcessor()
+
+    def processed(self):
+        return self.cached('processed', lambda: self.processor().process_all(self.raw_tables()))
+
+    def moving_averages(self):
+        return self.cached('ma', lambda: self.processor().calculate_moving_averages_all(
+            self.processed(), kernels=MA_KERNELS, bandwidths=MA_BANDWIDTHS,
+        ))
+
+
+def _daily_models(frames):
+    from garmin.io.models import BodyBattery, HealthStats, HeartRate, Sleep, Steps, Stress
+    models = {'weight': HealthStats, 'steps': Steps, 'sleep': Sleep, 'stress': Stress,
+              'body_battery': BodyBattery, 'heart_rate': HeartRate}
+    for data_type, df in frames.items():
+        df = df.copy()
+        df['date'] = df.index.date
+        df['date_pulled'] = datetime(2025, 1, 1).date()
+        yield models[data_type], df
+
+
+def _detailed_models(frames):
+    from garmin.io.models import HeartRateDetailed, RespirationDetailed, SpO2Detailed, StepsDetailed
+    models = {'heart_rate': HeartRateDetailed, 'respiration': RespirationDetailed,
+              'spo2': SpO2Detailed, 'steps': StepsDetailed}
+    for data_type, item in frames.items():
+        yield models[data_type], item
+
+
+# --- Stages ---
+# Each stage is `(setup, run)`: `setup(ctx)` builds untimed inputs and
+# `run(ctx, inputs)` is the timed part, returning the number of rows handled.
+
+def _parse_daily(ctx, _):
+    puller = ctx.health_puller()
+    return sum(len(puller.pull_data(t, ctx.start_date, BENCH_END_DATE, show_progress=False))
+               for t in DAILY_TYPES)
+
+def _parse_detailed(ctx, _):
+    puller = ctx.detailed_puller()
+    return sum(len(puller.pull_data(t, ctx.start_date, BENCH_END_DATE)) for t in DETAILED_TYPES)
+
+def _setup_upsert_daily(ctx):
+    return ctx.updater(ctx.new_db()), list(_daily_models(ctx.daily_frames()))
+
+def _upsert_daily(ctx, inputs):
+    updater, frames = inputs
+    for model, df in frames:
+        updater._upsert(model, df, ['date'])
+    return sum(len(df) for _, df in frames)
+
+def _setup_upsert_detailed(ctx):
+    return ctx.updater(ctx.new_db()), list(_detailed_models(ctx.detailed_frames()))
+
+def _upsert_detailed(ctx, inputs):
+    updater, frames = inputs
+    for model, (df, status) in frames:
+        updater._write_detailed_chunk(model, df, status)
+    return sum(len(df) for _, (df, _) in frames)
+
+def _setup_get_df(ctx):
+    return ctx.filled_db()
+
+def _get_df(ctx, db):
+    tables = ['health_stats', 'sleep', 'steps', 'stress', 'heart_rate', 'body_battery',
+              'heart_rate_detailed', 'respiration_detailed', 'spo2_detailed', 'steps_detailed']
+    return sum(len(db.get_df(t)) for t in tables)
+
+def _setup_process_all(ctx):
+    return ctx.processor(), ctx.raw_tables()
+
+def _process_all(ctx, inputs):
+    processor, raw = inputs
+    return sum(len(df) for df in processor.process_all(raw).values())
+
+def _setup_moving_averages(ctx):
+    return ctx.processor(), ctx.processed()
+
+def _moving_averages(ctx, inputs):
+    processor, processed = inputs
+    result = processor.calculate_moving_averages_all(processed, kernels=MA_KERNELS, bandwidths=MA_BANDWIDTHS)
+    return sum(len(df) for df in result.values())
+
+def _setup_dashboard(ctx):
+    try:
+        from garmin.analysis.plotting import make_metric_bokeh_plot
+    except ImportError as e:
+        raise StageSkipped(f"plotting unavailable: {e}")
+    return make_metric_bokeh_plot, ctx.processed(), ctx.moving_averages()
+
+def _dashboard(ctx, inputs):
+    make_plot, processed, moving_averages = inputs
+    for metric in DASHBOARD_METRICS:
+        make_plot(metric, processed[metric], moving_averages[metric], ma_lims=(0, 150))
+    return sum(len(processed[m]) for m in DASHBOARD_METRICS)
+
+STAGES = {
+    'parse_daily': (lambda ctx: ctx.daily_frames(), _parse_daily),
+    'parse_detailed': (lambda ctx: ctx.detailed_frames(), _parse_detailed),
+    'upsert_daily': (_setup_upsert_daily, _upsert_daily),
+    'upsert_detailed': (_setup_upsert_detailed, _upsert_detailed),
+    'get_df': (_setup_get_df, _get_df),
+    'process_all': (_setup_process_all, _process_all),
+    'moving_averages': (_setup_moving_averages, _moving_averages),
+    'dashboard': (_setup_dashboard, _dashboard),
+}
+
+
+def _measure(ctx, setup, run, repeat):
+    """Times `repeat` runs (fresh inputs each), then one traced run for peak memory."""
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        inputs = setup(ctx)
+        t0 = time.perf_counter()
+        rows = run(ctx, inputs)
+        times.append(time.perf_counter() - t0)
+    inputs = setup(ctx)
+    tracemalloc.start()
+    try:
+        run(ctx, inputs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': 'ok',
+        'best_s': round(min(times), 4),
+        'median_s': round(statistics.median(times), 4),
+        'repeats': repeat,
+        'peak_mem_mb': round(peak / 2**20, 2),
+        'rows': rows,
+        'rows_per_s': round(rows / min(times), 1) if min(times) > 0 else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(sizes=('small',), stages=None, repeat=3, verbose=True) -> dict:
+    """
+    Runs each stage at each size on fixed synthetic inputs, with no network.
+    Stages whose optional dependencies are missing are reported as
+    'skipped'; a stage that raises is reported as 'error' and the rest carry on.
+
+    Returns:
+        dict: `{'meta': {...}, 'results': {'<stage>@<size>': {...}}}`.
+    """
+    selected = list(stages) if stages else None
+    stages = stages or list(STAGES)
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='garmin_bench_')
+    try:
+        for size in sizes:
+            ctx = Context(size, work_dir)
+            for stage in stages:
+                setup, run = STAGES[stage]
+                key = f"{stage}@{size}"
+                try:
+                    # The pipeline narrates each upsert; keep that out of the report
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        results[key] = _measure(ctx, setup, run, repeat)
+                except StageSkipped as e:
+                    results[key] = {'status': 'skipped', 'reason': str(e)}
+                except Exception as e:
+                    results[key] = {'status': 'error', 'reason': f"{type(e).__name__}: {e}"}
+                if verbose:
+                    print(format_result(key, results[key]), flush=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        'meta': {
+            'created_utc': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': {s: SIZES[s] for s in sizes},
+            # None when every stage was run, so stages added later count as missing
+            'stages': selected,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def format_result(key, r) -> str:
+    if r['status'] != 'ok':
+        return f"{key:<28} {r['status']}: {r['reason']}"
+    return (f"{key:<28} {r['best_s'] * 1000:>10.1f} ms  {r['peak_mem_mb']:>8.1f} MB  "
+            f"{r['rows']:>9} rows")
+
+
+def compare(current: dict, baseline: dict, time_tolerance=0.2, mem_tolerance=0.2, min_delta_s=0.01) -> list[dict]:
+    """
+    Compares two `run_benchmarks` results. A stage regresses when its best
+    time grows by more than `time_tolerance` (and at least `min_delta_s`), or
+    its peak memory by more than `mem_tolerance`. A stage that was 'ok' in
+    the baseline also regresses when it is no longer 'ok', or when it is
+    missing although the current run covered its stage and size. Stages not
+    'ok' in the baseline are not compared.
+
+    Returns:
+        list[dict]: One entry per compared stage with its current 'status'
+            ('missing' if absent), the ratios (None unless both ran) and a
+            'regression' flag.
+    """
+    meta = current.get('meta', {})
+    sizes, stages = meta.get('sizes'), meta.get('stages')
+    rows = []
+    for key, base in baseline['results'].items():
+        if base['status'] != 'ok':
+            continue
+        cur = current['results'].get(key)
+        if cur is None:
+            stage, size = key.rsplit('@', 1)
+            if (sizes is not None and size not in sizes) or (stages is not None and stage not in stages):
+                continue
+            cur = {'status': 'missing'}
+        row = {
+            'stage': key, 'status': cur['status'],
+            'baseline_s': base['best_s'], 'current_s': None, 'time_ratio': None,
+            'baseline_mb': base['peak_mem_mb'], 'current_mb': None, 'mem_ratio': None,
+            'regression': True,
+        }
+        if cur['status'] == 'ok':
+            time_ratio = cur['best_s'] / base['best_s'] if base['best_s'] else float('inf')
+            mem_ratio = cur['peak_mem_mb'] / base['peak_mem_mb'] if base['peak_mem_mb'] else 1.0
+            slower = time_ratio > 1 + time_tolerance and cur['best_s'] - base['best_s'] >= min_delta_s
+            bigger = mem_ratio > 1 + mem_tolerance
+            row.update({
+                'current_s': cur['best_s'], 'time_ratio': round(time_ratio, 3),
+                'current_mb': cur['peak_mem_mb'], 'mem_ratio': round(mem_ratio, 3),
+                'regression': slower or bigger,
+            })
+        rows.append(row)
+    return rows
@@ -2,6 +2,7 @@
 
 import numpy as np
 import pandas as pd
+from garmin import instrumentation, profiling
 from myutils.utils import kernel_smooth_with_uncertainty
 
 
@@ -98,13 +99,19 @@ class GarminDataProcessor:
         return df
 
     def process_all(self, df_dict):
+        steps = {
+            'health_stats': self.process_health_stats,
+            'sleep': self.process_sleep,
+            'steps': self.process_steps,
+            'stress': self.process_stress,
+            'heart_rate': self.process_heart_rate,
+            'body_battery': self.process_body_battery,
+        }
         processed = {}
-        processed['health_stats'] = self.process_health_stats(df_dict['health_stats'])
-        processed['sleep'] = self.process_sleep(df_dict['sleep'])
-        processed['steps'] = self.process_steps(df_dict['steps'])
-        processed['stress'] = self.process_stress(df_dict['stress'])
-        processed['heart_rate'] = self.process_heart_rate(df_dict['heart_rate'])
-        processed['body_battery'] = self.process_body_battery(df_dict['body_battery'])
+        for key, process in steps.items():
+            with instrumentation.span('processor.process', label=key) as span, profiling.stage('process'):
+                processed[key] = process(df_dict[key])
+                span.add('rows', len(processed[key]))
         return processed
     
     def calculate_moving_averages(
@@ -149,7 +156,10 @@ class GarminDataProcessor:
             print(f"Calculating moving averages for {key} with kernels {kernels} and bandwidths {bandwidths}")
             columns = self.MOVING_AVERAGE_COLUMNS.get(key)
             if columns is not None:
-                results[key] = self.calculate_moving_averages(df, columns, kernels, bandwidths)
+                with (instrumentation.span('processor.moving_averages', label=key) as span,
+                      profiling.stage('smooth')):
+                    results[key] = self.calculate_moving_averages(df, columns, kernels, bandwidths)
+                    span.add('series', len(columns) * len(kernels) * len(bandwidths))
         return results
 
     @staticmethod
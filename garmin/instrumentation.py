@@ -0,0 +1,245 @@
+## garmin/instrumentation.py
+"""
+Stage-level spans and counters for per-run latency breakdowns.
+
+Off unless GARMIN_INSTRUMENTATION is set (or `configure` is called):
+
+    json     one JSON line per finished span, plus a summary per run
+    summary  only the per-run summary, as one JSON line
+    emf      the per-run summary as CloudWatch Embedded Metric Format
+             records (one per stage), namespace GARMIN_METRICS_NAMESPACE
+
+Records go to stdout, which Lambda ships to CloudWatch Logs. When off,
+`span()` returns a shared no-op and `count()` returns immediately, so the
+call sites cost a function call and an attribute check.
+
+    with instrumentation.span('db.upsert', label='steps') as sp:
+        ...
+        sp.add('rows', len(df))
+    instrumentation.count('garmin.cache_hits')
+    instrumentation.flush(status='complete')   # end of the run
+
+Spans are aggregated per `name:label` into count, total/max duration and
+the sum of everything passed to `add`; nested spans record their parent.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+MODES = ('json', 'summary', 'emf')
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, key, value=1):
+        pass
+
+    def set(self, **fields):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed stage. `add` sums into the span's counters, `set` attaches fields."""
+    __slots__ = ('recorder', 'name', 'label', 'fields', 'counts', 'parent', '_start')
+
+    def __init__(self, recorder, name, label=None, fields=None):
+        self.recorder = recorder
+        self.name = name
+        self.label = label
+        self.fields = fields or {}
+        self.counts = {}
+        self.parent = None
+        self._start = None
+
+    @property
+    def key(self) -> str:
+        return self.name if self.label is None else f"{self.name}:{self.label}"
+
+    def add(self, key, value=1):
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        stack = self.recorder._stack()
+        self.parent = stack[-1].key if stack else None
+        stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        stack = self.recorder._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.recorder._finish(self, duration_ms, exc_type)
+        return False
+
+
+class Recorder:
+    """Aggregates spans and counters for one run and emits them."""
+    def __init__(self, mode: str = 'json', stream=None, namespace: str = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown instrumentation mode: {mode}")
+        self.mode = mode
+        self.stream = stream
+        self.namespace = namespace or os.environ.get('GARMIN_METRICS_NAMESPACE', 'Garmin')
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self._spans: dict[str, dict] = {}
+        self._counters: dict[str, float] = {}
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, label=None, **fields) -> Span:
+        return Span(self, name, label, fields)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def _finish(self, span: Span, duration_ms: float, exc_type):
+        # A generator running dry is how streams end, not a failure
+        failed = exc_type is not None and not issubclass(exc_type, (StopIteration, GeneratorExit))
+        with self._lock:
+            agg = self._spans.get(span.key)
+            if agg is None:
+                agg = self._spans[span.key] = {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            agg['calls'] += 1
+            agg['total_ms'] += duration_ms
+            agg['max_ms'] = max(agg['max_ms'], duration_ms)
+            if failed:
+                agg['errors'] += 1
+            for key, value in span.counts.items():
+                agg[key] = agg.get(key, 0) + value
+        if self.mode == 'json':
+            self._emit({
+                'type': 'span', 'run_id': self.run_id, 'name': span.name, 'label': span.label,
+                'parent': span.parent, 'duration_ms': round(duration_ms, 3),
+                'error': exc_type.__name__ if failed else None,
+                **span.fields, **span.counts,
+            })
+
+    def summary(self) -> dict:
+        """Aggregates so far: `{'spans': {key: {...}}, 'counters': {...}}`."""
+        with self._lock:
+            spans = {k: {f: round(v, 3) if isinstance(v, float) else v for f, v in agg.items()}
+                     for k, agg in self._spans.items()}
+            return {'spans': spans, 'counters': dict(self._counters)}
+
+    def flush(self, **fields) -> dict:
+        """Emits the run summary with `fields` attached, then starts a new run."""
+        summary = self.summary()
+        record = {
+            'run_id': self.run_id,
+            'elapsed_s': round(time.time() - self.started, 3),
+            **fields, **summary,
+        }
+        if self.mode == 'emf':
+            for record_emf in self._emf_records(summary, fields):
+                self._emit(record_emf)
+        else:
+            self._emit({'type': 'run', **record})
+        with self._lock:
+            self._reset()
+        return record
+
+    def _emf_records(self, summary, fields) -> list[dict]:
+        timestamp = int(time.time() * 1000)
+        stages = dict(summary['spans'])
+        if summary['counters']:
+            stages['run'] = summary['counters']
+        records = []
+        for stage, values in stages.items():
+            metrics = {k: v for k, v in values.items() if isinstance(v, (int, float))}
+            records.append({
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': self.namespace,
+                        'Dimensions': [['Stage']],
+                        'Metrics': [{'Name': k, 'Unit': _unit(k)} for k in metrics],
+                    }],
+                },
+                'Stage': stage,
+                'run_id': self.run_id,
+                **{k: v for k, v in fields.items() if k not in metrics},
+                **metrics,
+            })
+        return records
+
+    def _emit(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            print(line, file=self.stream or sys.stdout, flush=True)
+
+
+def _unit(metric: str) -> str:
+    if metric.endswith('_ms'):
+        return 'Milliseconds'
+    if metric.endswith('bytes'):
+        return 'Bytes'
+    return 'Count'
+
+
+_recorder: Recorder | None = None
+
+
+def configure(mode: str = None, stream=None, namespace: str = None) -> Recorder | None:
+    """
+    Turns instrumentation on in `mode` (default: GARMIN_INSTRUMENTATION), or
+    off if that is empty or '0'. Returns the active recorder, if any.
+    """
+    global _recorder
+    mode = (mode if mode is not None else os.environ.get('GARMIN_INSTRUMENTATION', '')).lower()
+    _recorder = Recorder(mode, stream, namespace) if mode not in ('', '0') else None
+    return _recorder
+
+
+def enabled() -> bool:
+    """For guarding measurements that cost something to take (e.g. sizes)."""
+    return _recorder is not None
+
+
+def span(name: str, label: str = None, **fields):
+    if _recorder is None:
+        return _NOOP_SPAN
+    return _recorder.span(name, label, **fields)
+
+
+def count(name: str, value=1):
+    if _recorder is not None:
+        _recorder.count(name, value)
+
+
+def summary() -> dict | None:
+    return _recorder.summary() if _recorder is not None else None
+
+
+def flush(**fields) -> dict | None:
+    """Emits and resets the current run's summary; a no-op when disabled."""
+    return _recorder.flush(**fields) if _recorder is not None else None
+
+
+configure()
@@ -0,0 +1,283 @@
+## garmin/io/archive.py
+
+import atexit
+import gzip
+import json
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlsplit
+from garmin.io.file_manager import FileManager
+from garmin.io.response_cache import dates_in_url
+
+
+def url_metric(url: str) -> str:
+    """
+    Stable name for the endpoint behind `url`, with dates removed, e.g.
+    'wellness-service/wellness/dailyHeartRate?date=2024-01-01' ->
+    'wellness_service_wellness_dailyHeartRate'.
+    """
+    parts = urlsplit(url)
+    path = [p for p in parts.path.strip('/').split('/') if p and not dates_in_url(p)]
+    query = [f"{k}_{v}" for k, v in parse_qsl(parts.query) if not dates_in_url(v)]
+    return re.sub(r'[^A-Za-z0-9]+', '_', '_'.join(path + query)).strip('_')
+
+
+def url_month(url: str, default: str) -> str:
+    """YYYY-MM of the latest date in `url`, or `default` if it has none."""
+    dates = dates_in_url(url)
+    return max(dates).strftime('%Y-%m') if dates else default
+
+
+def url_range(url: str) -> tuple[date, date] | None:
+    """`(start, end)` of a date-range URL such as '.../daily/{start}/{end}'."""
+    dates = dates_in_url(url)
+    if len(dates) == 2 and dates[0] <= dates[1]:
+        return dates[0], dates[1]
+    return None
+
+
+# Fields that date one entry of a daily range response
+ENTRY_DATE_FIELDS = ('calendarDate', 'summaryDate')
+
+
+def _entry_date(entry) -> date | None:
+    if isinstance(entry, dict):
+        for field in ENTRY_DATE_FIELDS:
+            if entry.get(field):
+                try:
+                    return datetime.strptime(str(entry[field])[:10], '%Y-%m-%d').date()
+                except ValueError:
+                    return None
+    return None
+
+
+def range_entries(response) -> tuple[str | None, list] | None:
+    """
+    The per-day entries of a daily range response and the key holding them
+    (None when the response is the list itself), or None if the response
+    has entries without a recognizable date.
+    """
+    if isinstance(response, list):
+        key, entries = None, response
+    elif isinstance(response, dict):
+        lists = [k for k, v in response.items() if isinstance(v, list)]
+        if len(lists) != 1:
+            return None
+        key, entries = lists[0], response[lists[0]]
+    else:
+        return None
+    if any(_entry_date(e) is None for e in entries):
+        return None
+    return key, entries
+
+
+class ArchiveMiss(KeyError):
+    """No archived response exists for the requested URL."""
+
+
+class ResponseArchive:
+    """
+    Append-only archive of raw Garmin Connect responses.
+
+    Records are buffered and written as gzip-compressed JSON Lines, partitioned
+    as `{prefix}{metric}/{YYYY-MM}/part-{timestamp}-{id}.jsonl.gz`, where the
+    month comes from the dates in the URL. Every flush adds new part files and
+    never rewrites old ones, so the layout works the same on S3.
+    """
+    def __init__(self, file_manager: FileManager = None, prefix: str = 'raw_archive/', flush_every: int = 500):
+        self.fm = file_manager or FileManager()
+        self.prefix = prefix
+        self.flush_every = flush_every
+        self._buffer: dict[tuple[str, str], list[str]] = {}
+        self._n_buffered = 0
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def record(self, url: str, method: str, response):
+        """Buffers one response, flushing once `flush_every` are pending."""
+        now = datetime.now(timezone.utc)
+        line = json.dumps({
+            'url': url,
+            'method': method,
+            'recorded_at': now.isoformat(),
+            'response': response,
+        })
+        key = (url_metric(url), url_month(url, now.strftime('%Y-%m')))
+        with self._lock:
+            self._buffer.setdefault(key, []).append(line)
+            self._n_buffered += 1
+            if self._n_buffered >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        """Writes all buffered records as new part files."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        # Microsecond stamps keep part files sortable in write order
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        for (metric, month), lines in self._buffer.items():
+            data = gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+            filename = f"{self.prefix}{metric}/{month}/part-{stamp}-{uuid.uuid4().hex[:8]}.jsonl.gz"
+            self.fm.write_bytes(data, filename)
+        self._buffer = {}
+        self._n_buffered = 0
+
+    def partition_files(self, metric: str = None, month: str = None) -> list[str]:
+        """Part files, optionally restricted to one metric and/or month."""
+        prefix = self.prefix
+        if metric is not None:
+            prefix += f"{metric}/"
+            if month is not None:
+                prefix += f"{month}/"
+        files = self.fm.list_files(prefix)
+        if metric is None and month is not None:
+            files = [f for f in files if f"/{month}/" in f]
+        return [f for f in files if f.endswith('.jsonl.gz')]
+
+    def date_range(self) -> tuple[str, str] | None:
+        """
+        First and last YYYY-MM-DD found in archived URLs, or None if the
+        archive holds no dated responses. Only the earliest and latest month
+        partitions are read.
+        """
+        months = sorted({f.split('/')[-2] for f in self.partition_files()
+                         if re.fullmatch(r'\d{4}-\d{2}', f.split('/')[-2])})
+        if not months:
+            return None
+        bounds = []
+        for month, pick in ((months[0], min), (months[-1], max)):
+            dates = [d for rec in self.iter_records(month=month) for d in dates_in_url(rec['url'])]
+            bounds.append(pick(dates).isoformat())
+        return bounds[0], bounds[1]
+
+    def iter_records(self, metric: str = None, month: str = None):
+        """Yields archived records in part-file (i.e. write) order."""
+        for filename in self.partition_files(metric, month):
+            for line in gzip.decompress(self.fm.read_bytes(filename)).splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+class ReplaySession:
+    """
+    Drop-in stand-in for GarminSession that answers requests from a
+    ResponseArchive with no network access. The latest archived response for a
+    URL wins. Partitions are loaded on first use and the `max_partitions` most
+    recently used ones are kept in memory.
+
+    Daily range requests (`.../{start}/{end}`) need not match a recorded URL:
+    archived range responses of the endpoint are indexed by calendar date and
+    any window whose every day some recording covered is assembled from
+    them, the latest recording of a day winning. Real archives come from
+    incremental runs with adaptive window sizes, so a replay over a different
+    span never asks for the same windows.
+
+    GETs with no archived response raise ArchiveMiss. POSTs (cache-warm
+    requests) with no archived response are answered as DENIED, since Garmin
+    cannot be asked to rebuild anything offline.
+    """
+    def __init__(self, archive: ResponseArchive, max_partitions: int = 64):
+        self.archive = archive
+        self.max_partitions = max_partitions
+        self.response_cache = None
+        self.stats = {'requests': 0, 'misses': 0, 'assembled': 0}
+        self._partitions: OrderedDict = OrderedDict()
+        self._daily: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _partition(self, url: str) -> dict:
+        key = (url_metric(url), url_month(url, ''))
+        with self._lock:
+            if key in self._partitions:
+                self._partitions.move_to_end(key)
+                return self._partitions[key]
+        responses = {}
+        if key[1]:
+            for rec in self.archive.iter_records(*key):
+                responses[(rec['method'], rec['url'])] = rec['response']
+        else:
+            # Undated URLs are filed under the month they were recorded in
+            for rec in self.archive.iter_records(key[0]):
+                responses[(rec['method'], rec['url'])] = rec['response']
+        with self._lock:
+            self._partitions[key] = responses
+            while len(self._partitions) > self.max_partitions:
+                self._partitions.popitem(last=False)
+        return responses
+
+    def _daily_index(self, metric: str) -> dict:
+        """
+        Entries per calendar date from every archived range response of
+        `metric`: `{'days': {date: [entry, ...]}, 'key': ..., 'template': ...}`,
+        where a day is present only if some recording covered it.
+        """
+        with self._lock:
+            if metric in self._daily:
+                return self._daily[metric]
+        index = {'days': {}, 'key': None, 'template': None}
+        for rec in self.archive.iter_records(metric):
+            span = url_range(rec['url']) if rec['method'] == 'GET' else None
+            parsed = range_entries(rec['response']) if span else None
+            if parsed is None:
+                continue
+            key, entries = parsed
+            by_date = {}
+            for entry in entries:
+                by_date.setdefault(_entry_date(entry), []).append(entry)
+            start, end = span
+            for offset in range((end - start).days + 1):
+                d = start + timedelta(days=offset)
+                index['days'][d] = by_date.get(d, [])
+            index['key'], index['template'] = key, rec['response']
+        with self._lock:
+            self._daily[metric] = index
+        return index
+
+    def _assemble(self, url: str):
+        """A daily range response built from the calendar-date index, or None."""
+        span = url_range(url)
+        if span is None:
+            return None
+        index = self._daily_index(url_metric(url))
+        start, end = span
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        if index['template'] is None or any(d not in index['days'] for d in days):
+            return None
+        entries = [e for d in days for e in index['days'][d]]
+        if index['key'] is None:
+            return entries
+        return {**index['template'], index['key']: entries}
+
+    def _lookup(self, url: str, method: str):
+        responses = self._partition(url)
+        hit = (method, url) in responses
+        assembled = None if hit or method != 'GET' else self._assemble(url)
+        with self._lock:
+            self.stats['requests'] += 1
+            if not hit:
+                self.stats['assembled' if assembled is not None else 'misses'] += 1
+        if hit:
+            return responses[(method, url)]
+        if assembled is None:
+            raise ArchiveMiss(f"{method} {url}")
+        return assembled
+
+    def connect(self):
+        pass
+
+    def get(self, url, use_cache=True):
+        return self._lookup(url, 'GET')
+
+    def post(self, url):
+        try:
+            return self._lookup(url, 'POST')
+        except ArchiveMiss:
+            return {'status': 'DENIED'}
+
+    def invalidate_cached(self, url):
+        pass
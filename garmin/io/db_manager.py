@@ -1,15 +1,36 @@
 # garmin/db/database_manager.py
 
+import json
 import os
-import pandas as pd
-from sqlalchemy import create_engine
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, event, func, make_url, or_, select, update
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
-from garmin.io.models import Base
+from garmin import instrumentation
+from garmin.io.models import Base, BackfillShard, PullLedger, UpdateCheckpoint
+from garmin.io.upsert import bulk_upsert, copy_upsert, get_insert, WRITE_STRATEGIES
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tunes SQLite for bulk loads: WAL lets readers continue during writes and
+    synchronous=NORMAL only fsyncs at checkpoints, which is safe under WAL.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    # Concurrent writers wait for the lock instead of failing immediately
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+# Pull statuses that mean a query date needs no further requests.
+COMPLETE_STATUSES = ('fetched', 'no_data')
+# Precedence used when a query date has rows with several statuses.
+STATUS_PRECEDENCE = ('fetched', 'no_data', 'denied', 'unknown')
 
 # --- Generalized Database Manager ---
 class DatabaseManager:
-    def __init__(self, db_uri=None, environment=None):
+    def __init__(self, db_uri=None, environment=None, pool_size=None):
         """
         Initialize the database manager.
         
@@ -18,6 +39,9 @@ class DatabaseManager:
                 If not provided, it will be chosen based on the environment.
             environment (str, optional): 'aws' or 'local'. If not provided,
                 the code will try to detect AWS Lambda via AWS_EXECUTION_ENV.
+            pool_size (int, optional): Connections kept in the engine pool,
+                with as many again allowed as overflow. Size it to the number
+                of threads writing concurrently; defaults to SQLAlchemy's 5.
         """
         if environment is None:
             if 'AWS_EXECUTION_ENV' in os.environ:
@@ -34,7 +58,14 @@ class DatabaseManager:
                 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
                 db_path = os.path.join(base_dir, 'data', 'garmin.db')
                 db_uri = f'sqlite:///{db_path}'
-        self.engine = create_engine(db_uri)
+        engine_kwargs = {}
+        url = make_url(db_uri)
+        in_memory = url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+        if pool_size is not None and not in_memory:
+            engine_kwargs.update(pool_size=pool_size, max_overflow=pool_size, pool_pre_ping=True)
+        self.engine = create_engine(db_uri, **engine_kwargs)
+        if self.engine.url.get_backend_name() == 'sqlite':
+            event.listen(self.engine, 'connect', _set_sqlite_pragmas)
         self.Session = sessionmaker(bind=self.engine)
         self._create_tables()
     
@@ -45,6 +76,11 @@ class DatabaseManager:
             with self.engine.connect() as conn:
                 conn.execute(text("CREATE SCHEMA IF NOT EXISTS garmin"))
         Base.metadata.create_all(self.engine)
+        # create_all skips tables that already exist, so make sure indexes added
+        # to the models since the table was created are present too.
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
     
     def add_record(self, record):
         """Add a single record (an instance of a model)."""
@@ -93,6 +129,43 @@ class DatabaseManager:
         finally:
             session.close()
     
+    def transaction(self):
+        """
+        Context manager for one transaction, whose connection can be passed as
+        `conn` to the write methods so several writes commit together.
+        """
+        return self.engine.begin()
+
+    def upsert_df(self, model_class, df, index_elements, strategy='batch', conn=None, **batch_kwargs):
+        """
+        Upserts a DataFrame into the table for `model_class` in a single
+        transaction, using the engine's native ON CONFLICT support.
+
+        Args:
+            model_class: The SQLAlchemy model class to write to.
+            df (DataFrame): Rows to write; columns not on the table are ignored.
+            index_elements (list[str]): Unique column(s) used for conflict detection.
+            strategy (str): 'batch' for INSERT ... ON CONFLICT run per batch, or 'copy' to
+                stream through a COPY staging table. 'copy' falls back to
+                'batch' on backends other than PostgreSQL.
+            conn (Connection, optional): Write within this open transaction
+                (see `transaction`) instead of a new one.
+            **batch_kwargs: Passed through to `bulk_upsert` (max_bytes, max_rows).
+
+        Returns:
+            list[BatchStats]: Row count and timing for each executed batch.
+        """
+        if strategy not in WRITE_STRATEGIES:
+            raise ValueError(f"Unknown write strategy: {strategy}")
+        if strategy == 'copy' and self.engine.url.get_backend_name() != 'postgresql':
+            strategy = 'batch'
+        if conn is None:
+            with self.engine.begin() as conn:
+                return self.upsert_df(model_class, df, index_elements, strategy, conn, **batch_kwargs)
+        if strategy == 'copy':
+            return copy_upsert(conn, model_class, df, index_elements)
+        return bulk_upsert(conn, model_class, df, index_elements, **batch_kwargs)
+
     def get_records(self, model_class):
         """Retrieves all records for the given model class."""
         session = self.Session()
@@ -102,6 +175,364 @@ class DatabaseManager:
         finally:
             session.close()
 
+    def get_latest_date(self, model_class, column='date'):
+        """
+        Returns the most recent value of `column` for the given model class,
+        or None if the table is empty.
+        """
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(getattr(model_class, column)))).scalar()
+
+    def get_query_date_status(self, model_class):
+        """
+        Summarizes pull status per query date for a detailed model class.
+
+        Runs a single GROUP BY over the indexed `query_date` column instead of
+        reading every sample row. When a date has rows with several statuses,
+        the one earliest in STATUS_PRECEDENCE wins.
+
+        Returns:
+            dict[date, str]: Mapping of query date to pull status.
+        """
+        stmt = (
+            select(model_class.query_date, model_class.pull_status)
+            .group_by(model_class.query_date, model_class.pull_status)
+        )
+        rank = {s: i for i, s in enumerate(STATUS_PRECEDENCE)}
+        status = {}
+        with self.engine.connect() as conn:
+            for query_date, pull_status in conn.execute(stmt):
+                pull_status = pull_status or 'unknown'
+                current = status.get(query_date)
+                if current is None or rank.get(pull_status, len(rank)) < rank.get(current, len(rank)):
+                    status[query_date] = pull_status
+        return status
+
+    def get_pull_ledger(self, metric):
+        """
+        Returns the pull status of every query date recorded for `metric`.
+
+        Returns:
+            dict[date, str]: Mapping of query date to ledger status.
+        """
+        stmt = select(PullLedger.query_date, PullLedger.status).where(PullLedger.metric == metric)
+        with self.engine.connect() as conn:
+            return {d: s for d, s in conn.execute(stmt)}
+
+    def get_retry_queue(self, metric, base_backoff_s=12 * 3600, max_backoff_s=30 * 86400,
+                        limit=None, now=None, start_date=None, end_date=None):
+        """
+        Returns the query dates of `metric` that are due for another attempt,
+        in the order they should be retried.
+
+        Every ledger entry whose status is not in COMPLETE_STATUSES is queued.
+        After `attempts` failures a date waits `base_backoff_s * 2**(attempts - 1)`
+        seconds (capped at `max_backoff_s`) from its last attempt before it is
+        due again. Due dates are ordered by fewest attempts, then most recent
+        query date first.
+
+        Args:
+            limit (int, optional): Maximum number of dates returned, applied
+                after the `start_date`/`end_date` filter.
+            now (datetime, optional): Current UTC time; defaults to now.
+            start_date (date, optional): Earliest query date to include.
+            end_date (date, optional): Latest query date to include.
+
+        Returns:
+            list[date]: Due query dates in priority order.
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        stmt = (
+            select(PullLedger.query_date, PullLedger.attempts, PullLedger.last_attempt_utc)
+            .where(PullLedger.metric == metric)
+            .where(PullLedger.status.not_in(COMPLETE_STATUSES))
+        )
+        if start_date is not None:
+            stmt = stmt.where(PullLedger.query_date >= start_date)
+        if end_date is not None:
+            stmt = stmt.where(PullLedger.query_date <= end_date)
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        due = []
+        for query_date, attempts, last_attempt in rows:
+            attempts = attempts or 0
+            if last_attempt is not None and attempts > 0:
+                wait = min(max_backoff_s, base_backoff_s * 2 ** (attempts - 1))
+                if last_attempt + timedelta(seconds=wait) > now:
+                    continue
+            due.append((attempts, -query_date.toordinal(), query_date))
+        due.sort()
+        return [d for _, _, d in due[:limit]]
+
+    def has_pull_ledger(self, metric):
+        """True if any ledger entries exist for `metric`."""
+        stmt = select(PullLedger.id).where(PullLedger.metric == metric).limit(1)
+        with self.engine.connect() as conn:
+            return conn.execute(stmt).first() is not None
+
+    def record_pull_status(self, metric, statuses, row_counts=None, attempted_at=None, conn=None):
+        """
+        Records the outcome of one pull attempt for each query date in bulk.
+
+        Args:
+            metric (str): Ledger key, normally the detailed table name.
+            statuses (dict[date, str]): Status for each attempted query date.
+            row_counts (dict[date, int], optional): Sample rows written per date.
+            attempted_at (datetime, optional): Attempt time in UTC; defaults to now.
+            conn (Connection, optional): Write within this open transaction.
+
+        Returns:
+            list[BatchStats]: Row count and timing for each executed batch.
+        """
+        if not statuses:
+            return []
+        import pandas as pd
+        row_counts = row_counts or {}
+        attempted_at = attempted_at or datetime.now(timezone.utc).replace(tzinfo=None)
+        df = pd.DataFrame({
+            'metric': metric,
+            'query_date': list(statuses.keys()),
+            'status': list(statuses.values()),
+            'attempts': 1,
+            'last_attempt_utc': attempted_at,
+            'row_count': [row_counts.get(d, 0) for d in statuses],
+        })
+        return self.upsert_df(
+            PullLedger, df, ['metric', 'query_date'], conn=conn, accumulate=['attempts']
+        )
+
+    def seed_pull_ledger(self, metric, model_class):
+        """
+        One-time migration for databases written before the ledger existed:
+        derives ledger entries from the `pull_status` of the sample rows in
+        `model_class`, then deletes the sentinel rows that were used to record
+        'no_data' and 'denied' days.
+        """
+        stmt = (
+            select(model_class.query_date, model_class.pull_status, func.count())
+            .group_by(model_class.query_date, model_class.pull_status)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        if not rows:
+            return
+        status = self.get_query_date_status(model_class)
+        row_counts = {}
+        for query_date, pull_status, count in rows:
+            if pull_status == 'fetched':
+                row_counts[query_date] = count
+        self.record_pull_status(metric, status, row_counts)
+        with self.engine.begin() as conn:
+            conn.execute(
+                model_class.__table__.delete()
+                .where(model_class.pull_status.in_(['no_data', 'denied']))
+            )
+
+    def get_checkpoint(self, metric, scope):
+        """
+        Returns the stored checkpoint for `metric` over `scope`, or None.
+
+        Returns:
+            dict | None: status, last_committed_date, remaining_dates (list of
+                date strings), dates_done and started_utc.
+        """
+        stmt = (
+            select(UpdateCheckpoint.status, UpdateCheckpoint.last_committed_date,
+                   UpdateCheckpoint.remaining_dates, UpdateCheckpoint.dates_done,
+                   UpdateCheckpoint.started_utc)
+            .where(UpdateCheckpoint.metric == metric, UpdateCheckpoint.scope == scope)
+        )
+        with self.engine.connect() as conn:
+            row = conn.execute(stmt).first()
+        if row is None:
+            return None
+        checkpoint = dict(row._mapping)
+        checkpoint['remaining_dates'] = json.loads(checkpoint['remaining_dates'] or '[]')
+        return checkpoint
+
+    def save_checkpoint(self, metric, scope, status, remaining_dates, last_committed_date=None,
+                        dates_done=0, started_utc=None, conn=None):
+        """
+        Creates or replaces the checkpoint for `metric` over `scope`. Pass the
+        `conn` of the transaction that committed the chunk so the checkpoint
+        can never run ahead of the data.
+        """
+        import pandas as pd
+        now = self._utcnow()
+        df = pd.DataFrame([{
+            'metric': metric,
+            'scope': scope,
+            'status': status,
+            'last_committed_date': last_committed_date,
+            'remaining_dates': json.dumps(list(remaining_dates)),
+            'dates_done': dates_done,
+            'started_utc': started_utc or now,
+            'updated_utc': now,
+        }])
+        self.upsert_df(UpdateCheckpoint, df, ['metric', 'scope'], conn=conn)
+
+    @staticmethod
+    def _utcnow():
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def create_backfill_shards(self, shards):
+        """
+        Registers backfill shards, leaving any that already exist (by metric and
+        start date) untouched so planning can be repeated safely.
+
+        Args:
+            shards (list[tuple[str, date, date]]): `(metric, start_date, end_date)`.
+
+        Returns:
+            int: Number of shards newly created.
+        """
+        if not shards:
+            return 0
+        now = self._utcnow()
+        rows = [
+            {'metric': m, 'start_date': s, 'end_date': e, 'status': 'pending',
+             'attempts': 0, 'version': 0, 'updated_utc': now}
+            for m, s, e in shards
+        ]
+        insert = get_insert(self.engine.dialect.name)
+        stmt = insert(BackfillShard.__table__).on_conflict_do_nothing(
+            index_elements=['metric', 'start_date']
+        )
+        created = 0
+        with self.engine.begin() as conn:
+            for row in rows:
+                created += conn.execute(stmt.values(**row)).rowcount
+        return created
+
+    def claim_backfill_shard(self, worker_id, lease_s=900, metrics=None, now=None, max_attempts=5):
+        """
+        Leases the next available shard to `worker_id`: a pending shard, a
+        leased one whose lease has expired (its worker crashed), or a failed
+        one whose retry backoff has elapsed and that has been attempted fewer
+        than `max_attempts` times. Newest shards are claimed first.
+
+        Claims are optimistic: the UPDATE only succeeds if the shard's
+        `version` is unchanged since it was read, so two workers can never
+        both win the same shard. A lost race just moves on to the next
+        candidate.
+
+        Returns:
+            dict | None: The claimed shard's id, metric, start_date, end_date
+                and attempts, or None if nothing is available.
+        """
+        now = now or self._utcnow()
+        stmt = (
+            select(BackfillShard.id, BackfillShard.version)
+            .where(or_(
+                BackfillShard.status == 'pending',
+                (BackfillShard.status == 'leased') & (BackfillShard.lease_expires_utc < now),
+                # A failed shard's lease_expires_utc holds when it may be retried
+                (BackfillShard.status == 'failed') & (BackfillShard.attempts < max_attempts)
+                & (BackfillShard.lease_expires_utc < now),
+            ))
+            .order_by(BackfillShard.start_date.desc(), BackfillShard.id)
+            .limit(10)
+        )
+        if metrics is not None:
+            stmt = stmt.where(BackfillShard.metric.in_(list(metrics)))
+        while True:
+            with self.engine.connect() as conn:
+                candidates = conn.execute(stmt).all()
+            if not candidates:
+                return None
+            for shard_id, version in candidates:
+                claim = (
+                    update(BackfillShard)
+                    .where(BackfillShard.id == shard_id, BackfillShard.version == version)
+                    .values(
+                        status='leased',
+                        worker_id=worker_id,
+                        lease_expires_utc=now + timedelta(seconds=lease_s),
+                        attempts=BackfillShard.attempts + 1,
+                        version=BackfillShard.version + 1,
+                        updated_utc=now,
+                    )
+                )
+                with self.engine.begin() as conn:
+                    if conn.execute(claim).rowcount != 1:
+                        continue
+                    row = conn.execute(
+                        select(BackfillShard.id, BackfillShard.metric, BackfillShard.start_date,
+                               BackfillShard.end_date, BackfillShard.attempts)
+                        .where(BackfillShard.id == shard_id)
+                    ).one()
+                return dict(row._mapping)
+
+    def renew_backfill_lease(self, shard_id, worker_id, lease_s=900):
+        """
+        Extends the lease on a shard still held by `worker_id`. Returns False
+        if the lease was lost (expired and claimed by another worker).
+        """
+        now = self._utcnow()
+        stmt = (
+            update(BackfillShard)
+            .where(BackfillShard.id == shard_id,
+                   BackfillShard.worker_id == worker_id,
+                   BackfillShard.status == 'leased')
+            .values(lease_expires_utc=now + timedelta(seconds=lease_s), updated_utc=now)
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount == 1
+
+    def complete_backfill_shard(self, shard_id, worker_id, status='done', error=None, retry_after_s=0):
+        """
+        Releases a shard held by `worker_id` as 'done', 'failed', or back to
+        'pending' (e.g. when a worker stops at its deadline). A failed shard
+        can be claimed again once `retry_after_s` seconds have passed.
+        """
+        now = self._utcnow()
+        retry_at = now + timedelta(seconds=retry_after_s) if status == 'failed' else None
+        stmt = (
+            update(BackfillShard)
+            .where(BackfillShard.id == shard_id, BackfillShard.worker_id == worker_id)
+            .values(status=status, error=error, lease_expires_utc=retry_at, updated_utc=now)
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount == 1
+
+    def reset_backfill_shards(self, metrics=None, statuses=('failed',)):
+        """
+        Puts shards in `statuses` back to 'pending' with their attempts
+        cleared, e.g. to retry shards that used up their attempts once the
+        cause is fixed. Leased shards are left to their workers.
+
+        Returns:
+            int: Number of shards reset.
+        """
+        stmt = (
+            update(BackfillShard)
+            .where(BackfillShard.status.in_([s for s in statuses if s != 'leased']))
+            .values(status='pending', attempts=0, error=None, worker_id=None,
+                    lease_expires_utc=None, version=BackfillShard.version + 1,
+                    updated_utc=self._utcnow())
+        )
+        if metrics is not None:
+            stmt = stmt.where(BackfillShard.metric.in_(list(metrics)))
+        with self.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def get_backfill_progress(self):
+        """
+        Returns shard counts by metric and status.
+
+        Returns:
+            dict[str, dict[str, int]]: e.g. {'heart_rate_detailed': {'done': 12, 'pending': 80}}.
+        """
+        stmt = (
+            select(BackfillShard.metric, BackfillShard.status, func.count())
+            .group_by(BackfillShard.metric, BackfillShard.status)
+        )
+        progress = {}
+        with self.engine.connect() as conn:
+            for metric, status, count in conn.execute(stmt):
+                progress.setdefault(metric, {})[status] = count
+        return progress
+
     def get_df(self, table_name):
         """
         Retrieves all records from the table corresponding to model_class as a Pandas DataFrame.
@@ -112,8 +543,11 @@ class DatabaseManager:
         Returns:
             DataFrame: The table contents.
         """
+        import pandas as pd
         # Using read_sql with a simple SELECT query:
-        df = pd.read_sql(f"SELECT * FROM {table_name}", con=self.engine)
+        with instrumentation.span('db.read', label=table_name) as span:
+            df = pd.read_sql(f"SELECT * FROM {table_name}", con=self.engine)
+            span.add('rows', len(df))
         return df
 
     def drop_table(self, model_class):
@@ -1,6 +1,6 @@
 import os
 import pandas as pd
-import boto3
+from garmin import instrumentation
 
 class FileManager:
     """
@@ -16,8 +16,17 @@ class FileManager:
         self.local_dir = local_dir or os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data'))
         self.s3_bucket = s3_bucket or os.environ.get('GARMIN_S3_BUCKET')
         self.s3_prefix = s3_prefix or ''
-        if self.environment == 'aws' and boto3 is None:
-            raise ImportError("boto3 is required for AWS S3 operations.")
+        self._s3_client = None
+
+    def _s3(self):
+        # boto3 is only imported (and the client built) on first S3 access
+        if self._s3_client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise ImportError("boto3 is required for AWS S3 operations.")
+            self._s3_client = boto3.client('s3')
+        return self._s3_client
 
     def _local_path(self, filename):
         return os.path.join(self.local_dir, filename)
@@ -25,28 +34,41 @@ class FileManager:
     def _s3_key(self, filename):
         return f"{self.s3_prefix}{filename}"
 
+    def _span(self, op, kind):
+        return instrumentation.span(f'file.{op}', label=kind, environment=self.environment)
+
     def write_df(self, df, filename, format='parquet'):
-        if self.environment == 'aws':
-            self._write_df_s3(df, filename, format)
-        else:
-            os.makedirs(self.local_dir, exist_ok=True)
-            if format == 'parquet':
-                df.to_parquet(self._local_path(filename), index=False)
-            elif format == 'csv':
-                df.to_csv(self._local_path(filename), index=False)
+        with self._span('write', format) as span:
+            if self.environment == 'aws':
+                span.add('bytes', self._write_df_s3(df, filename, format))
             else:
-                raise ValueError(f"Unsupported format: {format}")
+                os.makedirs(self.local_dir, exist_ok=True)
+                if format == 'parquet':
+                    df.to_parquet(self._local_path(filename), index=False)
+                elif format == 'csv':
+                    df.to_csv(self._local_path(filename), index=False)
+                else:
+                    raise ValueError(f"Unsupported format: {format}")
+                if instrumentation.enabled():
+                    span.add('bytes', os.path.getsize(self._local_path(filename)))
+            span.add('rows', len(df))
 
     def read_df(self, filename, format='parquet'):
-        if self.environment == 'aws':
-            return self._read_df_s3(filename, format)
-        else:
-            if format == 'parquet':
-                return pd.read_parquet(self._local_path(filename))
-            elif format == 'csv':
-                return pd.read_csv(self._local_path(filename))
+        with self._span('read', format) as span:
+            if self.environment == 'aws':
+                df, size = self._read_df_s3(filename, format)
+                span.add('bytes', size)
             else:
-                raise ValueError(f"Unsupported format: {format}")
+                if format == 'parquet':
+                    df = pd.read_parquet(self._local_path(filename))
+                elif format == 'csv':
+                    df = pd.read_csv(self._local_path(filename))
+                else:
+                    raise ValueError(f"Unsupported format: {format}")
+                if instrumentation.enabled():
+                    span.add('bytes', os.path.getsize(self._local_path(filename)))
+            span.add('rows', len(df))
+        return df
 
     def _write_df_s3(self, df, filename, format):
         import io
@@ -59,45 +81,130 @@ class FileManager:
             buffer.seek(0)
         else:
             raise ValueError(f"Unsupported format: {format}")
+        size = buffer.seek(0, io.SEEK_END)
         buffer.seek(0)
-        s3 = boto3.client('s3')
+        s3 = self._s3()
         s3.upload_fileobj(buffer, self.s3_bucket, self._s3_key(filename))
+        return size
 
     def _read_df_s3(self, filename, format):
         import io
-        s3 = boto3.client('s3')
+        s3 = self._s3()
         buffer = io.BytesIO()
         s3.download_fileobj(self.s3_bucket, self._s3_key(filename), buffer)
+        size = buffer.getbuffer().nbytes
         buffer.seek(0)
         if format == 'parquet':
-            return pd.read_parquet(buffer)
+            return pd.read_parquet(buffer), size
         elif format == 'csv':
             buffer = io.StringIO(buffer.read().decode())
-            return pd.read_csv(buffer)
+            return pd.read_csv(buffer), size
         else:
             raise ValueError(f"Unsupported format: {format}")
 
     def write_text(self, text, filename):
         """Write a string to a file (local or S3)."""
-        if self.environment == 'aws':
-            import io
-            s3 = boto3.client('s3')
-            buffer = io.BytesIO(text.encode('utf-8'))
-            s3.upload_fileobj(buffer, self.s3_bucket, self._s3_key(filename))
-        else:
-            os.makedirs(os.path.dirname(self._local_path(filename)), exist_ok=True)
-            with open(self._local_path(filename), 'w', encoding='utf-8') as f:
-                f.write(text)
+        with self._span('write', 'text') as span:
+            if self.environment == 'aws':
+                import io
+                s3 = self._s3()
+                buffer = io.BytesIO(text.encode('utf-8'))
+                s3.upload_fileobj(buffer, self.s3_bucket, self._s3_key(filename))
+            else:
+                os.makedirs(os.path.dirname(self._local_path(filename)), exist_ok=True)
+                with open(self._local_path(filename), 'w', encoding='utf-8') as f:
+                    f.write(text)
+            span.add('bytes', len(text))
 
     def read_text(self, filename):
         """Read a string from a file (local or S3)."""
+        with self._span('read', 'text') as span:
+            if self.environment == 'aws':
+                import io
+                s3 = self._s3()
+                buffer = io.BytesIO()
+                s3.download_fileobj(self.s3_bucket, self._s3_key(filename), buffer)
+                buffer.seek(0)
+                text = buffer.read().decode('utf-8')
+            else:
+                with open(self._local_path(filename), 'r', encoding='utf-8') as f:
+                    text = f.read()
+            span.add('bytes', len(text))
+        return text
+
+
+    def write_bytes(self, data, filename):
+        """Write raw bytes to a file (local or S3)."""
+        with self._span('write', 'bytes') as span:
+            if self.environment == 'aws':
+                import io
+                s3 = self._s3()
+                s3.upload_fileobj(io.BytesIO(data), self.s3_bucket, self._s3_key(filename))
+            else:
+                os.makedirs(os.path.dirname(self._local_path(filename)), exist_ok=True)
+                with open(self._local_path(filename), 'wb') as f:
+                    f.write(data)
+            span.add('bytes', len(data))
+
+    def read_bytes(self, filename):
+        """Read raw bytes from a file (local or S3)."""
+        with self._span('read', 'bytes') as span:
+            if self.environment == 'aws':
+                import io
+                s3 = self._s3()
+                buffer = io.BytesIO()
+                s3.download_fileobj(self.s3_bucket, self._s3_key(filename), buffer)
+                data = buffer.getvalue()
+            else:
+                with open(self._local_path(filename), 'rb') as f:
+                    data = f.read()
+            span.add('bytes', len(data))
+        return data
+
+    def exists(self, filename):
+        """Check whether a file exists (local or S3)."""
         if self.environment == 'aws':
-            import io
-            s3 = boto3.client('s3')
-            buffer = io.BytesIO()
-            s3.download_fileobj(self.s3_bucket, self._s3_key(filename), buffer)
-            buffer.seek(0)
-            return buffer.read().decode('utf-8')
+            from botocore.exceptions import ClientError
+            s3 = self._s3()
+            try:
+                s3.head_object(Bucket=self.s3_bucket, Key=self._s3_key(filename))
+                return True
+            except ClientError:
+                return False
+        else:
+            return os.path.exists(self._local_path(filename))
+
+    def delete(self, filename):
+        """Delete a file if it exists (local or S3)."""
+        if self.environment == 'aws':
+            s3 = self._s3()
+            s3.delete_object(Bucket=self.s3_bucket, Key=self._s3_key(filename))
+        else:
+            try:
+                os.remove(self._local_path(filename))
+            except FileNotFoundError:
+                pass
+
+    def list_files(self, prefix=''):
+        """
+        List files under `prefix` (local or S3), as names relative to the
+        manager's root that can be passed back to the read methods.
+        """
+        if self.environment == 'aws':
+            s3 = self._s3()
+            paginator = s3.get_paginator('list_objects_v2')
+            names = []
+            for page in paginator.paginate(Bucket=self.s3_bucket, Prefix=self._s3_key(prefix)):
+                for obj in page.get('Contents', []):
+                    names.append(obj['Key'][len(self.s3_prefix):])
+            return sorted(names)
         else:
-            with open(self._local_path(filename), 'r', encoding='utf-8') as f:
-                return f.read()
+            root = self._local_path(prefix)
+            if not os.path.isdir(root):
+                return []
+            names = []
+            for dirpath, _, files in os.walk(root):
+                for fn in files:
+                    full = os.path.join(dirpath, fn)
+                    names.append(os.path.relpath(full, self.local_dir).replace(os.sep, '/'))
+            return sorted(names)
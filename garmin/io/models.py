@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, Float, String, Date, Boolean, DateTime
+from sqlalchemy import create_engine, Column, Integer, Float, String, Text, Date, Boolean, DateTime, UniqueConstraint
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -87,7 +87,7 @@ class BodyBattery(Base):
 class StepsDetailed(Base):
     __tablename__ = 'steps_detailed'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    query_date = Column(Date, unique=False, nullable=False)
+    query_date = Column(Date, unique=False, nullable=False, index=True)
     date_time_utc = Column(DateTime, unique=True, nullable=False)
     start_gmt = Column(Date)
     end_gmt = Column(Date)
@@ -101,7 +101,7 @@ class StepsDetailed(Base):
 class HeartRateDetailed(Base):
     __tablename__ = 'heart_rate_detailed'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    query_date = Column(Date, unique=False, nullable=False)
+    query_date = Column(Date, unique=False, nullable=False, index=True)
     date_time_utc = Column(DateTime, unique=True, nullable=False)
     timestamp = Column(Float)
     hr = Column(Float)
@@ -111,7 +111,7 @@ class HeartRateDetailed(Base):
 class SpO2Detailed(Base):
     __tablename__ = 'spo2_detailed'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    query_date = Column(Date, unique=False, nullable=False)
+    query_date = Column(Date, unique=False, nullable=False, index=True)
     date_time_utc = Column(DateTime, unique=True, nullable=False)
     timestamp = Column(Float)
     spo2_level = Column(Float)
@@ -122,13 +122,64 @@ class SpO2Detailed(Base):
 class RespirationDetailed(Base):
     __tablename__ = 'respiration_detailed'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    query_date = Column(Date, unique=False, nullable=False)
+    query_date = Column(Date, unique=False, nullable=False, index=True)
     date_time_utc = Column(DateTime, unique=True, nullable=False)
     timestamp = Column(Float)
     respiration = Column(Float)
     date_pulled = Column(Date)
     pull_status = Column(String)
 
+class PullLedger(Base):
+    """One row per (metric, query_date) recording the outcome of pulling that day."""
+    __tablename__ = 'pull_ledger'
+    __table_args__ = (UniqueConstraint('metric', 'query_date'),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    metric = Column(String, nullable=False)
+    query_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_attempt_utc = Column(DateTime)
+    row_count = Column(Integer)
+
+class BackfillShard(Base):
+    """
+    One metric x date-range unit of backfill work, leased to one worker at a
+    time. `version` is bumped on every claim so concurrent claims of the same
+    shard can be detected with a conditional UPDATE. For a failed shard,
+    `lease_expires_utc` is when it may be claimed again.
+    """
+    __tablename__ = 'backfill_shards'
+    __table_args__ = (UniqueConstraint('metric', 'start_date'),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    metric = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    status = Column(String, nullable=False, default='pending', index=True)
+    worker_id = Column(String)
+    lease_expires_utc = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=0)
+    updated_utc = Column(DateTime)
+    error = Column(String)
+
+class UpdateCheckpoint(Base):
+    """
+    Progress of the latest detailed update of a metric over a date scope,
+    written in the same transaction as each committed chunk so an interrupted
+    run can resume with the dates it had left.
+    """
+    __tablename__ = 'update_checkpoints'
+    __table_args__ = (UniqueConstraint('metric', 'scope'),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    metric = Column(String, nullable=False)
+    scope = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    last_committed_date = Column(Date)
+    remaining_dates = Column(Text)
+    dates_done = Column(Integer, nullable=False, default=0)
+    started_utc = Column(DateTime)
+    updated_utc = Column(DateTime)
+
 # ------------------------------
 # Master table for common fields
 # ------------------------------
@@ -0,0 +1,206 @@
+## garmin/io/response_cache.py
+
+import atexit
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import date, datetime
+from garmin.io.file_manager import FileManager
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def dates_in_url(url: str) -> list[date]:
+    """Returns every YYYY-MM-DD date that appears in `url`."""
+    dates = []
+    for match in _DATE_RE.findall(url):
+        try:
+            dates.append(datetime.strptime(match, "%Y-%m-%d").date())
+        except ValueError:
+            continue
+    return dates
+
+
+class ResponseCache:
+    """
+    On-disk (or S3) cache of Garmin Connect JSON responses keyed by URL.
+
+    Responses are stored as gzip-compressed JSON through a FileManager.
+    Freshness is decided from the dates in the URL: data for days older than
+    `immutable_after_days` never changes, so those entries never expire, while
+    recent days (and URLs without a date) expire after `recent_ttl_seconds`.
+    When the total size exceeds `max_bytes`, least recently used entries are
+    evicted.
+    """
+    INDEX_FILE = "index.json"
+    # Index changes between saves, and the longest an unsaved change waits;
+    # flush() persists the remainder.
+    SAVE_EVERY = 100
+    SAVE_INTERVAL_S = 60.0
+    # Eviction frees down to this fraction of max_bytes, so it runs (and
+    # sorts the index) once per batch of puts rather than on every one.
+    EVICT_TO = 0.9
+
+    def __init__(self,
+                 file_manager: FileManager = None,
+                 prefix: str = "response_cache/",
+                 immutable_after_days: int = 7,
+                 recent_ttl_seconds: float = 3600,
+                 max_bytes: int = 512 * 1024 * 1024):
+        self.fm = file_manager or FileManager()
+        self.prefix = prefix
+        self.immutable_after_days = immutable_after_days
+        self.recent_ttl_seconds = recent_ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # _lock guards the in-memory index only; file and S3 I/O happens
+        # outside it. _save_lock orders index saves so a newer snapshot is
+        # never overwritten by an older one.
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._index = None
+        self._total_bytes = 0
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        atexit.register(self.flush)
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _filename(self, key: str) -> str:
+        return f"{self.prefix}{key[:2]}/{key}.json.gz"
+
+    def _load_index(self) -> dict:
+        # Maps key -> {'size': bytes, 'last_access': epoch seconds}
+        if self._index is None:
+            try:
+                index = json.loads(self.fm.read_text(self.prefix + self.INDEX_FILE))
+            except Exception:
+                index = {}
+            with self._lock:
+                if self._index is None:
+                    self._index = index
+                    self._total_bytes = sum(e["size"] for e in index.values())
+        return self._index
+
+    def _changed(self):
+        """Counts an index change; call with _lock held. Returns whether a save is due."""
+        self._unsaved += 1
+        return (self._unsaved >= self.SAVE_EVERY
+                or time.monotonic() - self._saved_at >= self.SAVE_INTERVAL_S)
+
+    def _save_index(self):
+        with self._save_lock:
+            with self._lock:
+                if self._index is None:
+                    return
+                text = json.dumps(self._index)
+                self._unsaved = 0
+                self._saved_at = time.monotonic()
+            self.fm.write_text(text, self.prefix + self.INDEX_FILE)
+
+    def is_fresh(self, url: str, cached_at: float, now: float = None) -> bool:
+        """Whether an entry for `url` stored at `cached_at` can still be served."""
+        now = now or time.time()
+        dates = dates_in_url(url)
+        if dates:
+            age_days = (datetime.fromtimestamp(now).date() - max(dates)).days
+            if age_days > self.immutable_after_days:
+                return True
+        return now - cached_at <= self.recent_ttl_seconds
+
+    def lookup(self, url: str) -> tuple[bool, object]:
+        """
+        Returns `(True, response)` on a fresh hit, otherwise `(False, None)`.
+        A cached response may itself be None, hence the explicit flag.
+        """
+        key = self._key(url)
+        index = self._load_index()
+        with self._lock:
+            if key not in index:
+                self.misses += 1
+                return False, None
+        try:
+            entry = json.loads(gzip.decompress(self.fm.read_bytes(self._filename(key))))
+        except Exception:
+            # Unreadable, or evicted since the check above
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            return False, None
+        if entry.get("url") != url or not self.is_fresh(url, entry["cached_at"]):
+            with self._lock:
+                self.misses += 1
+            return False, None
+        with self._lock:
+            if key in index:
+                index[key]["last_access"] = time.time()
+            self.hits += 1
+        return True, entry["response"]
+
+    def put(self, url: str, response):
+        """Stores `response` for `url` and evicts old entries if over budget."""
+        key = self._key(url)
+        data = gzip.compress(json.dumps({
+            "url": url,
+            "cached_at": time.time(),
+            "response": response,
+        }).encode("utf-8"))
+        index = self._load_index()
+        self.fm.write_bytes(data, self._filename(key))
+        with self._lock:
+            self._drop(key)
+            index[key] = {"size": len(data), "last_access": time.time()}
+            self._total_bytes += len(data)
+            evicted = self._evict()
+            save = self._changed()
+        for old in evicted:
+            self.fm.delete(self._filename(old))
+        if save:
+            self._save_index()
+
+    def invalidate(self, url: str):
+        """Drops any cached response for `url`."""
+        key = self._key(url)
+        self._load_index()
+        with self._lock:
+            if not self._drop(key):
+                return
+            save = self._changed()
+        self.fm.delete(self._filename(key))
+        if save:
+            self._save_index()
+
+    def flush(self):
+        """Persists the index, including access times recorded by hits."""
+        if self._index is not None:
+            self._save_index()
+
+    def _drop(self, key) -> bool:
+        """Removes `key` from the index; call with _lock held."""
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return False
+        self._total_bytes -= entry["size"]
+        return True
+
+    def _evict(self) -> list[str]:
+        """
+        Drops least recently used entries from the index once over budget and
+        returns their keys, for the caller to delete outside the lock.
+        """
+        if self._total_bytes <= self.max_bytes:
+            return []
+        index = self._index
+        target = self.max_bytes * self.EVICT_TO
+        evicted = []
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if self._total_bytes <= target:
+                break
+            self._drop(key)
+            evicted.append(key)
+        return evicted
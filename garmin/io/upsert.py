@@ -0,0 +1,211 @@
+## garmin/io/upsert.py
+
+import io
+import time
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Dialect-native INSERT constructs that support ON CONFLICT.
+INSERT_CONSTRUCTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+# Parameter sets bound per executemany() call, and a rough cap on their
+# in-memory size; together they bound the records held at once.
+MAX_BATCH_ROWS = 10000
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+# Rows serialized per read() while streaming a DataFrame through COPY.
+COPY_CHUNK_ROWS = 10000
+
+WRITE_STRATEGIES = ('batch', 'copy')
+
+
+@dataclass
+class BatchStats:
+    """Timing and size of one executed upsert batch."""
+    batch: int
+    rows: int
+    seconds: float
+
+
+def df_to_records(df: "pd.DataFrame", columns: list[str]) -> list[dict]:
+    """
+    Converts a DataFrame into a list of plain dicts suitable for bind
+    parameters, mapping NaN/NaT to None.
+    """
+    df = df[columns].astype(object)
+    df = df.where(df.notna(), None)
+    return df.to_dict('records')
+
+
+def get_insert(dialect_name: str):
+    """Returns the ON CONFLICT-capable insert() for the given dialect."""
+    try:
+        return INSERT_CONSTRUCTS[dialect_name]
+    except KeyError:
+        raise ValueError(f"Upserts are not supported for dialect: {dialect_name}")
+
+
+def rows_per_batch(df: "pd.DataFrame",
+                   max_bytes: int = MAX_BATCH_BYTES,
+                   max_rows: int = None) -> int:
+    """
+    Number of rows bound per call given `max_rows` (default MAX_BATCH_ROWS)
+    and an estimate of the in-memory size of each row.
+    """
+    n = max_rows or MAX_BATCH_ROWS
+    if len(df):
+        row_bytes = df.memory_usage(deep=True, index=False).sum() / len(df)
+        n = min(n, max(1, int(max_bytes // max(1.0, row_bytes))))
+    return n
+
+
+def bulk_upsert(conn,
+                model_class,
+                df: "pd.DataFrame",
+                index_elements: list[str],
+                max_bytes: int = MAX_BATCH_BYTES,
+                max_rows: int = None,
+                accumulate: list[str] = ()) -> list[BatchStats]:
+    """
+    Upserts `df` into the table of `model_class` with one
+    INSERT ... ON CONFLICT DO UPDATE statement in the connection's native
+    dialect (PostgreSQL or SQLite), executed for a batch of rows at a time
+    through the driver's executemany. The statement is compiled once and the
+    rows are bound as parameter sets, so there is no per-batch SQL to build
+    and no bind parameter limit to stay under.
+
+    Columns listed in `accumulate` are added to the existing value on
+    conflict instead of replacing it. Only columns that exist on the table
+    are written. Rows are de-duplicated on `index_elements` (last one wins)
+    so the result does not depend on the order rows are applied in. The
+    caller owns the transaction on `conn`.
+
+    Returns:
+        list[BatchStats]: One entry per executemany() call.
+    """
+    insert = get_insert(conn.dialect.name)
+    table = model_class.__table__
+    columns = [c for c in df.columns if c in table.c and c != 'id']
+    if df.empty or not columns:
+        return []
+    df = df.dropna(subset=index_elements)
+    df = df.drop_duplicates(subset=index_elements, keep='last')
+
+    stmt = insert(table)
+    update_cols = [c for c in columns if c not in index_elements]
+    if update_cols:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                c: (func.coalesce(table.c[c], 0) + stmt.excluded[c]) if c in accumulate
+                else stmt.excluded[c]
+                for c in update_cols
+            },
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+    n_rows = rows_per_batch(df[columns], max_bytes, max_rows)
+    stats = []
+    for i, start in enumerate(range(0, len(df), n_rows)):
+        t0 = time.perf_counter()
+        records = df_to_records(df.iloc[start:start + n_rows], columns)
+        conn.execute(stmt, records)
+        stats.append(BatchStats(batch=i, rows=len(records), seconds=time.perf_counter() - t0))
+    return stats
+
+
+class _CsvStream(io.RawIOBase):
+    """
+    File-like object that serializes a DataFrame to CSV lazily, a chunk of rows
+    at a time, so COPY never needs the whole payload in one buffer.
+    """
+    def __init__(self, df: "pd.DataFrame", chunk_rows: int = COPY_CHUNK_ROWS):
+        self._df = df
+        self._chunk_rows = chunk_rows
+        self._pos = 0
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def _next_chunk(self) -> bytes:
+        if self._pos >= len(self._df):
+            return b""
+        chunk = self._df.iloc[self._pos:self._pos + self._chunk_rows]
+        self._pos += self._chunk_rows
+        return chunk.to_csv(header=False, index=False, na_rep="\\N").encode("utf-8")
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        out, self._buffer = self._buffer[:size], self._buffer[size:]
+        return out
+
+
+def copy_upsert(conn,
+                model_class,
+                df: "pd.DataFrame",
+                index_elements: list[str],
+                chunk_rows: int = COPY_CHUNK_ROWS) -> list[BatchStats]:
+    """
+    PostgreSQL-only upsert: streams `df` with COPY FROM STDIN into a temporary
+    staging table, then merges it into the target table with a single
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+
+    The staging table is dropped on commit. The caller owns the transaction on
+    `conn`, which must be backed by psycopg2.
+
+    Returns:
+        list[BatchStats]: A single entry covering the COPY and the merge.
+    """
+    table = model_class.__table__
+    columns = [c for c in df.columns if c in table.c and c != 'id']
+    if df.empty or not columns:
+        return []
+    df = df.dropna(subset=index_elements)
+    df = df.drop_duplicates(subset=index_elements, keep='last')
+
+    t0 = time.perf_counter()
+    preparer = conn.dialect.identifier_preparer
+    target = preparer.format_table(table)
+    stage = preparer.quote(f"stage_{table.name}_{uuid.uuid4().hex[:8]}")
+    col_list = ", ".join(preparer.quote(c) for c in columns)
+    update_cols = [c for c in columns if c not in index_elements]
+    conflict = ", ".join(preparer.quote(c) for c in index_elements)
+    if update_cols:
+        on_conflict = "DO UPDATE SET " + ", ".join(
+            f"{preparer.quote(c)} = EXCLUDED.{preparer.quote(c)}" for c in update_cols
+        )
+    else:
+        on_conflict = "DO NOTHING"
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+            f"SELECT {col_list} FROM {target} WITH NO DATA"
+        )
+        cursor.copy_expert(
+            f"COPY {stage} ({col_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            _CsvStream(df[columns], chunk_rows),
+        )
+        cursor.execute(
+            f"INSERT INTO {target} ({col_list}) SELECT {col_list} FROM {stage} "
+            f"ON CONFLICT ({conflict}) {on_conflict}"
+        )
+    finally:
+        cursor.close()
+    return [BatchStats(batch=0, rows=len(df), seconds=time.perf_counter() - t0)]
@@ -0,0 +1,3 @@
+from garmin.mock.synthetic import MockConfig, SyntheticPayloads, REAL_HISTORY_DAYS
+from garmin.mock.server import MockGarminServer, MockRouter, MockSession
+from garmin.mock.generate import generate_database, write_archive
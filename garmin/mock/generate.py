@@ -0,0 +1,164 @@
+## garmin/mock/generate.py
+
+import time
+from dataclasses import replace
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from sqlalchemy import delete, insert
+from garmin.io.models import Activity, StrengthActivity
+from garmin.mock.server import MockRouter, MockSession
+from garmin.mock.synthetic import MockConfig, SyntheticPayloads
+
+
+def activity_frames(payloads: SyntheticPayloads) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Every synthetic activity as rows for the `activities` table, and the sets
+    of the strength sessions as rows for the `strength` table.
+    """
+    activities = []
+    sets = []
+    for d in payloads.activity_days():
+        act = payloads.activity(d)
+        activities.append({
+            **{c.name: act.get(c.name) for c in Activity.__table__.columns if c.name in act},
+            'activityId': str(act['activityId']),
+            'activityType': act['activityType']['typeKey'],
+            'date': d,
+            'startTime': act['startTimeLocal'].split(' ')[1],
+            'detailsPulled': True,
+        })
+        for s in payloads.exercise_sets(act['activityId'])['exerciseSets']:
+            exercise = s['exercises'][0]
+            sets.append({
+                'activityId': str(act['activityId']),
+                'date': d,
+                'time': s['startTime'].split('T')[1][:8],
+                'exerciseType': exercise['category'],
+                'exerciseName': exercise['name'],
+                'exerciseProbability': str(exercise['probability']),
+                'setType': s['setType'],
+                'reps': s['repetitionCount'],
+                'weight': None if s['weight'] is None else int(s['weight']),
+                'duration': s['duration'],
+            })
+    return pd.DataFrame(activities), pd.DataFrame(sets)
+
+
+def _write_activities(db_manager, payloads: SyntheticPayloads) -> dict:
+    activities, sets = activity_frames(payloads)
+    if activities.empty:
+        return {'activities': 0, 'strength': 0}
+    with db_manager.transaction() as conn:
+        db_manager.upsert_df(Activity, activities, ['activityId'], conn=conn)
+        # strength has no natural key, so replace the sets of these activities
+        if not sets.empty:
+            ids = list(activities['activityId'])
+            for i in range(0, len(ids), 500):
+                conn.execute(delete(StrengthActivity).where(StrengthActivity.activityId.in_(ids[i:i + 500])))
+            records = sets.replace({np.nan: None}).to_dict('records')
+            conn.execute(insert(StrengthActivity), records)
+    return {'activities': len(activities), 'strength': len(sets)}
+
+
+def generate_database(db_manager, config: MockConfig = None, max_workers: int = 4,
+                      chunk_days: int = 31) -> dict:
+    """
+    Fills `db_manager`'s database with a synthetic account by running the
+    real updater (pullers, parsing, upserts, pull ledger and checkpoints)
+    against an in-process MockSession, then writes the activity tables
+    directly (the updater does not pull activities).
+
+    Args:
+        db_manager (DatabaseManager): Database to fill.
+        config (MockConfig, optional): Account shape; see `MockConfig.at_scale`.
+        max_workers (int): Models generated concurrently, and days fetched
+            concurrently per detailed model.
+        chunk_days (int): Detailed days committed per transaction.
+
+    Returns:
+        dict: Update summary, activity row counts and elapsed seconds.
+    """
+    from garmin.pullers.health import HealthPuller
+    from garmin.pullers.health_detailed import HealthDetailedPuller
+    from garmin.updaters import DataUpdater
+
+    # Every day is served ready; cache warming is the load test's business
+    config = replace(config or MockConfig(), cold_fraction=0.0, rate_429=0.0, latency_ms=0.0)
+    router = MockRouter(config)
+    session = MockSession(router)
+    updater = DataUpdater(
+        session=session,
+        db_manager=db_manager,
+        health_puller=HealthPuller(session, adaptive=False, max_workers=max_workers),
+        health_detailed_puller=HealthDetailedPuller(session, max_workers=max_workers),
+        detailed_chunk_days=chunk_days,
+    )
+    t0 = time.monotonic()
+    summary = updater.update_all(
+        max_workers=max_workers, start_date=router.payloads.first_day.strftime('%Y-%m-%d'),
+    )
+    summary['activities'] = _write_activities(db_manager, router.payloads)
+    summary['requests'] = session.stats['requests']
+    summary['elapsed_s'] = time.monotonic() - t0
+    return summary
+
+
+def write_archive(archive, config: MockConfig = None, activity_page: int = 100) -> dict:
+    """
+    Writes raw API-shaped responses for the whole synthetic history into a
+    ResponseArchive. Detailed endpoints get one response per day under the
+    pullers' exact URLs. Daily endpoints get one response per window of the
+    puller's configured `chunk_days`, aligned to the first day; ReplaySession
+    assembles other windows from them. Replay over
+    `ResponseArchive.date_range()`, as `manual_replay` does: days before the
+    first one (e.g. a default DataUpdater's 2015-01-01 start) will miss.
+
+    Args:
+        archive (ResponseArchive): Destination; flushed before returning.
+        config (MockConfig, optional): Account shape; see `MockConfig.at_scale`.
+        activity_page (int): Activities per activity-list response.
+
+    Returns:
+        dict: Responses written per endpoint.
+    """
+    from garmin.pullers.health import HealthPuller
+    from garmin.pullers.health_detailed import HealthDetailedPuller
+
+    config = replace(config or MockConfig(), cold_fraction=0.0)
+    payloads = SyntheticPayloads(config)
+    first, last = payloads.first_day, payloads.today
+    counts = {}
+
+    for data_type, cfg in HealthPuller(None, adaptive=False)._pull_configs.items():
+        step = timedelta(days=cfg.get('chunk_days', 28))
+        start = first
+        while start <= last:
+            end = min(start + step - timedelta(days=1), last)
+            url = cfg['url_template'].format(start_date=start.isoformat(), end_date=end.isoformat())
+            body = getattr(payloads, data_type)(start, end)
+            archive.record(url, 'GET', body)
+            counts[data_type] = counts.get(data_type, 0) + 1
+            start = end + timedelta(days=1)
+
+    detailed = {'heart_rate': 'heart_rate_detailed', 'respiration': 'respiration_detailed',
+                'spo2': 'spo2_detailed', 'steps': 'steps_detailed'}
+    for metric, cfg in HealthDetailedPuller(None)._pull_configs.items():
+        build = getattr(payloads, detailed[metric])
+        d = first
+        while d <= last:
+            archive.record(cfg['url_template'].format(date=d.isoformat()), 'GET', build(d))
+            d += timedelta(days=1)
+        counts[f"{metric}_detailed"] = (last - first).days + 1
+
+    activities = list(payloads.activity_days())
+    for start in range(0, len(activities), activity_page):
+        url = f'/activitylist-service/activities/search/activities?limit={activity_page}&start={start}'
+        archive.record(url, 'GET', payloads.activities(activity_page, start))
+    for d in activities:
+        activity_id = payloads.activity(d)['activityId']
+        url = f'/activity-service/activity/{activity_id}/exerciseSets'
+        archive.record(url, 'GET', payloads.exercise_sets(activity_id))
+    counts['activities'] = len(activities)
+    archive.flush()
+    return counts
@@ -0,0 +1,248 @@
+## garmin/mock/server.py
+
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import asdict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from garmin.mock.synthetic import MockConfig, SyntheticPayloads
+
+
+class MockRouter:
+    """
+    Answers Garmin Connect API paths from SyntheticPayloads, with the
+    configured latency, 429s, window limits and cache-warm behaviour, but
+    without any sockets. Shared by MockGarminServer and MockSession.
+
+    Days that need a cache warm return availability-only payloads (or an
+    all-zero steps chart) until a warm POST for that date has been accepted
+    and `warm_delay_s` has passed.
+    """
+    _DAILY = {
+        r'/weight-service/weight/range/(?P<start>[\d-]+)/(?P<end>[\d-]+)': 'weight',
+        r'/usersummary-service/stats/daily/(?P<start>[\d-]+)/(?P<end>[\d-]+)': 'steps',
+        r'/sleep-service/stats/sleep/daily/(?P<start>[\d-]+)/(?P<end>[\d-]+)': 'sleep',
+        r'/usersummary-service/stats/heartRate/daily/(?P<start>[\d-]+)/(?P<end>[\d-]+)': 'heart_rate',
+        r'/usersummary-service/stats/stress/daily/(?P<start>[\d-]+)/(?P<end>[\d-]+)': 'stress',
+        r'/usersummary-service/stats/bodybattery/daily/(?P<start>[\d-]+)/(?P<end>[\d-]+)': 'body_battery',
+    }
+    _DETAILED = {
+        r'/wellness-service/wellness/dailyHeartRate': 'heart_rate_detailed',
+        r'/wellness-service/wellness/daily/respiration/(?P<date>[\d-]+)': 'respiration_detailed',
+        r'/wellness-service/wellness/daily/spo2acclimation/(?P<date>[\d-]+)': 'spo2_detailed',
+        r'/wellness-service/wellness/dailySummaryChart/?': 'steps_detailed',
+    }
+
+    def __init__(self, config: MockConfig = None, payloads: SyntheticPayloads = None):
+        self.config = config or MockConfig()
+        self.payloads = payloads or SyntheticPayloads(self.config)
+        self.stats = {'requests': 0, 'rate_limited': 0, 'rejected_windows': 0,
+                      'warm_requests': 0, 'warm_denied': 0, 'bytes': 0}
+        self._warmed: dict[date, float] = {}
+        self._warm_times: list[float] = []
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+
+    def count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _ready(self, d: date) -> bool:
+        if not self.payloads.is_cold(d):
+            return True
+        with self._lock:
+            requested = self._warmed.get(d)
+        return requested is not None and time.monotonic() - requested >= self.config.warm_delay_s
+
+    def _warm(self, d: date) -> dict:
+        self.count('warm_requests')
+        now = time.monotonic()
+        with self._lock:
+            self._warm_times = [t for t in self._warm_times if now - t < 60]
+            denied = (self._rng.random() < self.config.deny_rate
+                      or len(self._warm_times) >= self.config.max_warm_per_minute)
+            if not denied:
+                self._warm_times.append(now)
+                self._warmed.setdefault(d, now)
+        if denied:
+            self.count('warm_denied')
+            return {'status': 'DENIED'}
+        return {'status': 'SUBMITTED'}
+
+    def handle(self, method: str, url: str) -> tuple[int, object, dict]:
+        """
+        Serves one request, applying latency and injected 429s. Returns
+        `(status, body, headers)`.
+        """
+        parts = urlsplit(url)
+        path = '/' + parts.path.lstrip('/')
+        if path == '/__stats':
+            with self._lock:
+                return 200, {**self.stats, 'config': asdict(self.config)}, {}
+        self.count('requests')
+        if self.config.latency_ms:
+            time.sleep(self.config.latency_ms / 1000 * self._rng.uniform(0.5, 1.5))
+        if self.config.rate_429 and self._rng.random() < self.config.rate_429:
+            self.count('rate_limited')
+            return 429, {'message': 'rate limited'}, {'Retry-After': str(self.config.retry_after_s)}
+        status, body = self.route(method, path, parse_qs(parts.query))
+        return status, body, {}
+
+    def route(self, method: str, path: str, query: dict):
+        """Returns `(status, body)` for one request."""
+        if method == 'POST':
+            m = re.fullmatch(r'/wellness-service/wellness/epoch/request/(?P<date>[\d-]+)', path)
+            if m:
+                return 200, self._warm(date.fromisoformat(m['date']))
+            return 404, {'message': 'not found'}
+
+        for pattern, name in self._DAILY.items():
+            m = re.fullmatch(pattern, path)
+            if m:
+                start, end = date.fromisoformat(m['start']), date.fromisoformat(m['end'])
+                if (end - start).days + 1 > self.config.max_window_days:
+                    self.count('rejected_windows')
+                    return 400, {'message': 'date range too large'}
+                return 200, getattr(self.payloads, name)(start, end)
+        for pattern, name in self._DETAILED.items():
+            m = re.fullmatch(pattern, path)
+            if m:
+                d = date.fromisoformat(m.groupdict().get('date') or query['date'][0])
+                return 200, getattr(self.payloads, name)(d, ready=self._ready(d))
+        if path == '/activitylist-service/activities/search/activities':
+            return 200, self.payloads.activities(
+                int(query.get('limit', ['20'])[0]), int(query.get('start', ['0'])[0])
+            )
+        m = re.fullmatch(r'/activity-service/activity/(?P<id>\d+)/exerciseSets', path)
+        if m:
+            return 200, self.payloads.exercise_sets(m['id'])
+        return 404, {'message': 'not found'}
+
+
+class MockHTTPError(Exception):
+    """
+    Error status from a MockSession, shaped like garth's errors (an `error`
+    carrying a `response` with `status_code` and `headers`) so the retry and
+    window-rejection handling treat it as the real thing.
+    """
+    class _Response:
+        def __init__(self, status_code, headers):
+            self.status_code = status_code
+            self.headers = headers
+
+    def __init__(self, status_code: int, url: str, headers: dict = None):
+        super().__init__(f"{status_code} for {url}")
+        self.error = self
+        self.response = self._Response(status_code, headers or {})
+
+
+class MockSession:
+    """
+    In-process stand-in for GarminSession that answers from a MockRouter with
+    no sockets or JSON encoding, for generating data or exercising the
+    pipeline without HTTP overhead. Responses are recorded to `archive`
+    (a ResponseArchive) if given, like a real session.
+    """
+    def __init__(self, router: MockRouter = None, archive=None):
+        self.router = router or MockRouter()
+        self.archive = archive
+        self.response_cache = None
+        self.stats = {'requests': 0}
+
+    def connect(self):
+        pass
+
+    def _request(self, url, method='GET'):
+        self.stats['requests'] += 1
+        status, body, headers = self.router.handle(method, url)
+        if status >= 400:
+            raise MockHTTPError(status, url, headers)
+        if self.archive is not None:
+            self.archive.record(url, method, body)
+        return body
+
+    def get(self, url, use_cache=True):
+        return self._request(url)
+
+    def post(self, url):
+        return self._request(url, method='POST')
+
+    def invalidate_cached(self, url):
+        pass
+
+
+class MockGarminServer:
+    """
+    Local HTTP stand-in for the Garmin Connect API, serving a MockRouter on
+    every endpoint the pullers use. Point a GarminSession at it with
+    `GarminSession(base_url=server.base_url)` (or GARMIN_API_BASE_URL).
+    `GET /__stats` returns request counters.
+    """
+    def __init__(self, config: MockConfig = None, host: str = '127.0.0.1', port: int = 0,
+                 router: MockRouter = None):
+        self.router = router or MockRouter(config)
+        self.config = self.router.config
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def stats(self) -> dict:
+        return self.router.stats
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockGarminServer":
+        """Serves on a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        router = self.router
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _serve(self, method):
+                status, body, headers = router.handle(method, self.path)
+                data = json.dumps(body).encode('utf-8')
+                router.count('bytes', len(data))
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve('GET')
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                self._serve('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
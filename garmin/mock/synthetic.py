@@ -0,0 +1,348 @@
+## garmin/mock/synthetic.py
+
+import math
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+# Roughly the history our real account holds; `scale` multiplies it.
+REAL_HISTORY_DAYS = 3 * 365
+
+
+@dataclass
+class MockConfig:
+    """
+    Shape of the synthetic account and behaviour of the mock server.
+
+    Attributes:
+        history_days: Days of history before `end_date`; earlier days have no data.
+        end_date: Last day with data (ISO date); defaults to today (UTC).
+        seed: Seed for the synthetic data, which is deterministic per date.
+        latency_ms: Mean added latency per request (uniform 0.5x-1.5x).
+        rate_429: Fraction of requests answered with 429 Too Many Requests.
+        retry_after_s: Retry-After sent with 429 responses.
+        no_data_fraction: Fraction of isolated days with no data at all.
+        gap_fraction: Fraction of fortnights containing a multi-day gap
+            (device not worn), up to `max_gap_days` long.
+        max_gap_days: Longest gap.
+        cold_fraction: Fraction of detailed days that need a cache warm before
+            their data is served.
+        warm_delay_s: Seconds from an accepted warm request until the day's
+            data is served.
+        deny_rate: Fraction of warm requests answered DENIED.
+        max_warm_per_minute: Warm requests accepted per minute before DENIED.
+        max_window_days: Largest daily range request accepted; larger ones
+            get a 400.
+        hr_interval_s: Spacing of detailed heart rate samples.
+        respiration_interval_s: Spacing of detailed respiration samples.
+        steps_interval_min: Length of each steps-chart interval.
+        weight_fraction: Fraction of days with a weigh-in.
+        activity_fraction: Fraction of days with a recorded activity.
+    """
+    history_days: int = REAL_HISTORY_DAYS
+    end_date: str = None
+    seed: int = 0
+    latency_ms: float = 0.0
+    rate_429: float = 0.0
+    retry_after_s: float = 0.0
+    no_data_fraction: float = 0.02
+    gap_fraction: float = 0.05
+    max_gap_days: int = 10
+    cold_fraction: float = 0.0
+    warm_delay_s: float = 1.0
+    deny_rate: float = 0.0
+    max_warm_per_minute: int = 1000
+    max_window_days: int = 448
+    hr_interval_s: int = 120
+    respiration_interval_s: int = 60
+    steps_interval_min: int = 15
+    weight_fraction: float = 0.3
+    activity_fraction: float = 0.5
+
+    @classmethod
+    def at_scale(cls, scale: float, **kwargs) -> "MockConfig":
+        """Config whose history is `scale` times REAL_HISTORY_DAYS."""
+        return cls(history_days=max(1, round(REAL_HISTORY_DAYS * scale)), **kwargs)
+
+
+def _epoch_ms(d: date, seconds: int = 0) -> int:
+    dt = datetime(d.year, d.month, d.day, tzinfo=timezone.utc) + timedelta(seconds=seconds)
+    return int(dt.timestamp() * 1000)
+
+
+# Strength sessions draw their sets from these (category, name) pairs.
+STRENGTH_EXERCISES = [
+    ('BENCH_PRESS', 'BARBELL_BENCH_PRESS'), ('SQUAT', 'BARBELL_BACK_SQUAT'),
+    ('DEADLIFT', 'BARBELL_DEADLIFT'), ('ROW', 'BENT_OVER_ROW'),
+    ('SHOULDER_PRESS', 'OVERHEAD_BARBELL_PRESS'), ('PULL_UP', 'PULL_UP'),
+]
+ACTIVITY_TYPES = ['running', 'cycling', 'strength_training', 'hiking', 'indoor_cycling', 'bouldering']
+
+
+class SyntheticPayloads:
+    """
+    Builds API-shaped JSON for each endpoint. Every day's values are derived
+    from `(seed, kind, date)` alone, so responses are reproducible and
+    independent of request order or window size. Slow trends (weight,
+    resting heart rate, fitness) drift over the years so long histories are
+    not just noise around a constant.
+    """
+    def __init__(self, config: MockConfig = None):
+        self.config = config or MockConfig()
+        end = self.config.end_date
+        self.today = date.fromisoformat(end) if end else datetime.now(timezone.utc).date()
+        self.first_day = self.today - timedelta(days=self.config.history_days - 1)
+
+    def rng(self, kind: str, d) -> random.Random:
+        return random.Random(f"{self.config.seed}:{kind}:{d}")
+
+    def _in_gap(self, d: date) -> bool:
+        block = d.toordinal() // 14
+        r = self.rng('gap', block)
+        if r.random() >= self.config.gap_fraction:
+            return False
+        length = r.randint(2, max(2, min(self.config.max_gap_days, 14)))
+        offset = d.toordinal() - block * 14 - r.randint(0, 14 - length)
+        return 0 <= offset < length
+
+    def has_data(self, d: date) -> bool:
+        if d < self.first_day or d > self.today:
+            return False
+        if self._in_gap(d):
+            return False
+        return self.rng('no_data', d).random() >= self.config.no_data_fraction
+
+    def is_cold(self, d: date) -> bool:
+        return self.rng('cold', d).random() < self.config.cold_fraction
+
+    def days(self, start: date = None, end: date = None):
+        """Days with data between `start` and `end` (default: the whole history)."""
+        d = max(start or self.first_day, self.first_day)
+        end = min(end or self.today, self.today)
+        while d <= end:
+            if self.has_data(d):
+                yield d
+            d += timedelta(days=1)
+
+    def _trend(self, d: date, period_days: float, amplitude: float) -> float:
+        # Deterministic slow seasonal/yearly drift, continuous across days
+        phase = self.rng('trend', period_days).random() * 2 * math.pi
+        return amplitude * math.sin(2 * math.pi * d.toordinal() / period_days + phase)
+
+    # --- Daily range endpoints ---
+    def weight(self, start, end):
+        summaries = []
+        for d in self.days(start, end):
+            r = self.rng('weight', d)
+            if r.random() >= self.config.weight_fraction:
+                continue
+            grams = 75000 + self._trend(d, 900, 4000) + 600 * r.gauss(0, 1)
+            summaries.append({
+                'summaryDate': d.isoformat(),
+                'allWeightMetrics': [{
+                    'weight': grams,
+                    'bmi': grams / 1000 / 1.8 ** 2,
+                    'bodyFat': 18 + self._trend(d, 900, 2) + r.gauss(0, 0.5),
+                    'bodyWater': 55 + r.gauss(0, 1),
+                    'boneMass': 3200 + 50 * r.gauss(0, 1),
+                    'muscleMass': 34000 + 500 * r.gauss(0, 1),
+                }],
+            })
+        return {'dailyWeightSummaries': summaries}
+
+    def steps(self, start, end):
+        values = []
+        for d in self.days(start, end):
+            total = self.total_steps(d)
+            values.append({'calendarDate': d.isoformat(), 'values': {
+                'stepGoal': 8000, 'totalSteps': total, 'totalDistance': total * 0.78,
+            }})
+        return {'values': values}
+
+    def total_steps(self, d: date) -> int:
+        r = self.rng('steps', d)
+        weekend = 1500 if d.weekday() >= 5 else 0
+        return int(max(0, r.gauss(9000 + weekend + self._trend(d, 365, 1500), 3000)))
+
+    def sleep(self, start, end):
+        stats = []
+        for d in self.days(start, end):
+            r = self.rng('sleep', d)
+            start_ms = _epoch_ms(d, -2 * 3600 + int(r.gauss(0, 1800)))
+            total = int(r.gauss(7.2 * 3600, 2400))
+            deep, rem = int(total * 0.2), int(total * 0.22)
+            stats.append({'calendarDate': d.isoformat(), 'values': {
+                'remTime': rem, 'restingHeartRate': self.resting_hr(d),
+                'localSleepStartTimeInMillis': start_ms, 'localSleepEndTimeInMillis': start_ms + total * 1000,
+                'gmtSleepStartTimeInMillis': start_ms, 'gmtSleepEndTimeInMillis': start_ms + total * 1000,
+                'totalSleepTimeInSeconds': total, 'deepTime': deep, 'awakeTime': int(r.uniform(300, 2400)),
+                'lightTime': total - deep - rem, 'sleepScoreQuality': r.choice(['GOOD', 'FAIR', 'EXCELLENT']),
+                'respiration': r.gauss(14, 1), 'spO2': r.gauss(95, 1), 'hrvStatus': 'BALANCED',
+                'sleepNeed': 480, 'bodyBatteryChange': int(r.uniform(20, 70)),
+                'skinTempF': None, 'skinTempC': None, 'hrv7dAverage': r.gauss(60, 8),
+                'sleepScore': int(r.uniform(50, 95)),
+            }})
+        return {'individualStats': stats}
+
+    def heart_rate(self, start, end):
+        return [
+            {'calendarDate': d.isoformat(), 'values': {
+                'restingHR': self.resting_hr(d),
+                'wellnessMaxAvgHR': self.resting_hr(d) + 90,
+                'wellnessMinAvgHR': self.resting_hr(d) - 5,
+            }}
+            for d in self.days(start, end)
+        ]
+
+    def stress(self, start, end):
+        out = []
+        for d in self.days(start, end):
+            r = self.rng('stress', d)
+            out.append({'calendarDate': d.isoformat(), 'values': {
+                'highStressDuration': int(r.uniform(0, 7200)), 'lowStressDuration': int(r.uniform(3600, 20000)),
+                'overallStressLevel': int(r.uniform(15, 45)), 'restStressDuration': int(r.uniform(20000, 40000)),
+            }})
+        return out
+
+    def body_battery(self, start, end):
+        out = []
+        for d in self.days(start, end):
+            r = self.rng('body_battery', d)
+            low = int(r.uniform(5, 40))
+            out.append({'calendarDate': d.isoformat(), 'values': {
+                'lowBodyBattery': low, 'highBodyBattery': min(100, low + int(r.uniform(30, 70))),
+            }})
+        return out
+
+    # --- Detailed per-day endpoints ---
+    def resting_hr(self, d: date) -> int:
+        return int(55 + self._trend(d, 1100, 4) + self.rng('resting_hr', d).gauss(0, 2))
+
+    def heart_rate_detailed(self, d, ready=True):
+        if not self.has_data(d):
+            return {'restingHeartRate': None}
+        res = {'restingHeartRate': self.resting_hr(d)}
+        if ready:
+            r = self.rng('hr_detailed', d)
+            step = self.config.hr_interval_s
+            res['heartRateValueDescriptors'] = [{'index': 0, 'key': 'timestamp'}, {'index': 1, 'key': 'heartrate'}]
+            res['heartRateValues'] = [
+                [_epoch_ms(d, s), int(res['restingHeartRate'] + abs(r.gauss(15, 12)))]
+                for s in range(0, 86400, step)
+            ]
+        return res
+
+    def respiration_detailed(self, d, ready=True):
+        if not self.has_data(d):
+            return {'lowestRespirationValue': None}
+        r = self.rng('respiration', d)
+        res = {'lowestRespirationValue': 10.0}
+        if ready:
+            step = self.config.respiration_interval_s
+            res['respirationValueDescriptorsDTOList'] = [{'index': 0, 'key': 'timestamp'}, {'index': 1, 'key': 'respiration'}]
+            res['respirationValuesArray'] = [[_epoch_ms(d, s), round(r.gauss(14, 2), 1)] for s in range(0, 86400, step)]
+        return res
+
+    def spo2_detailed(self, d, ready=True):
+        if not self.has_data(d):
+            return {'averageSpO2': None}
+        r = self.rng('spo2', d)
+        res = {'averageSpO2': 95.0}
+        if ready:
+            res['spO2HourlyAveragesDescriptorList'] = [
+                {'spo2ValueDescIndex': 0, 'spo2ValueDescKey': 'timestamp'},
+                {'spo2ValueDescIndex': 1, 'spo2ValueDescKey': 'spo2Level'},
+                {'spo2ValueDescIndex': 2, 'spo2ValueDescKey': 'monitoringEnvironmentLevel'},
+            ]
+            res['spO2HourlyAverages'] = [[_epoch_ms(d, h * 3600), int(r.uniform(90, 99)), 1] for h in range(24)]
+        return res
+
+    def steps_detailed(self, d, ready=True):
+        if not self.has_data(d):
+            return []
+        r = self.rng('steps_detailed', d)
+        step = self.config.steps_interval_min * 60
+        chart = []
+        for s in range(0, 86400, step):
+            start = datetime(d.year, d.month, d.day) + timedelta(seconds=s)
+            steps = int(max(0, r.gauss(100, 150))) if ready else 0
+            chart.append({
+                'startGMT': start.strftime('%Y-%m-%dT%H:%M:%S.0'),
+                'endGMT': (start + timedelta(seconds=step)).strftime('%Y-%m-%dT%H:%M:%S.0'),
+                'steps': steps, 'pushes': 0,
+                'primaryActivityLevel': 'active' if steps > 100 else 'sedentary',
+                'activityLevelConstant': steps > 100,
+            })
+        return chart
+
+    # --- Activities ---
+    def activity_days(self):
+        """Days with an activity, newest first."""
+        d = self.today
+        while d >= self.first_day:
+            if self.has_data(d) and self.rng('activity_day', d).random() < self.config.activity_fraction:
+                yield d
+            d -= timedelta(days=1)
+
+    def activity(self, d: date) -> dict:
+        r = self.rng('activity', d)
+        kind = r.choice(ACTIVITY_TYPES)
+        duration = r.uniform(1200, 5400)
+        distance = 0.0 if kind in ('strength_training', 'bouldering') else duration * r.uniform(2.5, 7.0)
+        avg_hr = int(r.uniform(110, 160))
+        zones = [r.uniform(0, duration / 5) for _ in range(5)]
+        return {
+            'activityId': d.toordinal() * 10,
+            'activityName': kind.replace('_', ' ').title(),
+            'activityType': {'typeKey': kind},
+            'startTimeLocal': f"{d.isoformat()} {r.randint(6, 19):02d}:{r.randint(0, 59):02d}:00",
+            'distance': distance,
+            'duration': duration,
+            'elapsedDuration': duration * r.uniform(1.0, 1.2),
+            'movingDuration': duration * r.uniform(0.8, 1.0),
+            'averageSpeed': distance / duration,
+            'calories': duration / 60 * r.uniform(6, 12),
+            'bmrCalories': duration / 60 * 1.2,
+            'averageHR': avg_hr,
+            'maxHR': avg_hr + int(r.uniform(15, 35)),
+            'steps': int(distance * 1.3) if kind in ('running', 'hiking') else None,
+            'waterEstimated': duration / 3600 * 600,
+            'aerobicTrainingEffect': r.uniform(1, 5),
+            'anaerobicTrainingEffect': r.uniform(0, 3),
+            'activityTrainingLoad': r.uniform(20, 250),
+            'moderateIntensityMinutes': int(r.uniform(0, duration / 60)),
+            'vigorousIntensityMinutes': int(r.uniform(0, duration / 120)),
+            'differenceBodyBattery': -int(r.uniform(2, 25)),
+            **{f'hrTimeInZone_{i + 1}': z for i, z in enumerate(zones)},
+        }
+
+    def activities(self, limit, start=0):
+        out = []
+        for i, d in enumerate(self.activity_days()):
+            if i >= start + limit:
+                break
+            if i >= start:
+                out.append(self.activity(d))
+        return out
+
+    def exercise_sets(self, activity_id):
+        d = date.fromordinal(int(activity_id) // 10)
+        if self.activity(d)['activityType']['typeKey'] != 'strength_training':
+            return {'exerciseSets': []}
+        r = self.rng('sets', activity_id)
+        t = datetime(d.year, d.month, d.day, 7)
+        sets = []
+        for _ in range(r.randint(6, 20)):
+            category, name = r.choice(STRENGTH_EXERCISES)
+            active = r.random() < 0.6
+            duration = r.uniform(20, 90) if active else r.uniform(60, 180)
+            sets.append({
+                'exercises': [{'category': category, 'name': name, 'probability': round(r.uniform(50, 100), 1)}],
+                'repetitionCount': r.randint(3, 12) if active else None,
+                'weight': round(r.uniform(20000, 120000), -3) if active else None,
+                'setType': 'ACTIVE' if active else 'REST',
+                'duration': duration,
+                'startTime': t.strftime('%Y-%m-%dT%H:%M:%S.0'),
+            })
+            t += timedelta(seconds=duration)
+        return {'exerciseSets': sets}
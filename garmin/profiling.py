@@ -0,0 +1,228 @@
+## garmin/profiling.py
+"""
+Opt-in per-stage cProfile for the pipeline entry points.
+
+Enabled by GARMIN_PROFILE=1, `--profile` on the manual scripts, or
+`{"profile": true}` in the Lambda event. Code marks its stages with
+
+    with profiling.stage('upsert'):
+        ...
+
+and time is attributed to the innermost open stage on the thread: entering
+`parse` inside `pull` pauses the `pull` profile until `parse` exits, so
+each stage's profile and wall time are exclusive. At the end of a run
+`write_report` writes `<stage>.prof` (loadable with pstats or snakeviz) per
+stage and a `summary.txt` with wall time per stage and the top
+GARMIN_PROFILE_TOP (default 25) functions of each, through a FileManager.
+
+Only threads that enter a stage are profiled; time spent in worker pools
+shows up as waiting in the stage that submitted the work. When disabled,
+`stage()` returns a shared no-op.
+"""
+import io
+import os
+import pstats
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class _NoopStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class _Frame:
+    """One open stage on one thread; paused while a nested stage runs."""
+    __slots__ = ('profile', 'elapsed', '_t0', '_active')
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.elapsed = 0.0
+        self._t0 = None
+        self._active = False
+
+    def resume(self):
+        self._t0 = time.perf_counter()
+        try:
+            self.profile.enable()
+            self._active = True
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; another
+            # thread holds it, so this stretch is timed but not profiled
+            self._active = False
+
+    def pause(self):
+        if self._active:
+            self.profile.disable()
+            self._active = False
+        self.elapsed += time.perf_counter() - self._t0
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'frame', 'outer')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        self.outer = stack[-1] if stack else None
+        if self.outer is not None:
+            self.outer.pause()
+        self.frame = _Frame(self.profiler._profile(self.name))
+        stack.append(self.frame)
+        self.frame.resume()
+        return self
+
+    def __exit__(self, *exc):
+        self.frame.pause()
+        self.profiler._stack().pop()
+        self.profiler._record(self.name, self.frame.elapsed)
+        if self.outer is not None:
+            self.outer.resume()
+        return False
+
+
+class StageProfiler:
+    """Collects one cProfile per stage and thread, merged when reported."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: dict[tuple[str, int], object] = {}
+        self._wall: dict[str, list] = {}
+        self.started = datetime.now(timezone.utc)
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _profile(self, name):
+        import cProfile
+        key = (name, threading.get_ident())
+        with self._lock:
+            if key not in self._profiles:
+                self._profiles[key] = cProfile.Profile()
+            return self._profiles[key]
+
+    def _record(self, name, seconds):
+        with self._lock:
+            wall = self._wall.setdefault(name, [0.0, 0])
+            wall[0] += seconds
+            wall[1] += 1
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def stats(self) -> dict[str, pstats.Stats]:
+        """Merged pstats per stage."""
+        merged = {}
+        with self._lock:
+            profiles = list(self._profiles.items())
+        for (name, _), profile in profiles:
+            try:
+                if name in merged:
+                    merged[name].add(profile)
+                else:
+                    merged[name] = pstats.Stats(profile)
+            except TypeError:
+                # Never enabled (see _Frame.resume), so nothing to load
+                continue
+        return merged
+
+    def summary(self, top: int = 25) -> str:
+        """Wall time per stage, then each stage's top functions by cumulative time."""
+        lines = [f"Stage profile started {self.started.isoformat(timespec='seconds')}", ""]
+        with self._lock:
+            wall = dict(self._wall)
+        total = sum(s for s, _ in wall.values()) or 1.0
+        lines.append(f"{'stage':<16}{'wall_s':>10}{'share':>8}{'calls':>8}")
+        for name, (seconds, calls) in sorted(wall.items(), key=lambda kv: -kv[1][0]):
+            lines.append(f"{name:<16}{seconds:>10.3f}{seconds / total:>8.1%}{calls:>8}")
+        for name, stats in sorted(self.stats().items(), key=lambda kv: -wall.get(kv[0], [0])[0]):
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(top)
+            lines += ["", f"=== {name} ===", out.getvalue().strip()]
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_manager=None, prefix: str = None, top: int = None) -> list[str]:
+        """
+        Writes `<prefix><stage>.prof` per stage and `<prefix>summary.txt`.
+
+        Returns:
+            list[str]: Filenames written, relative to the FileManager root.
+        """
+        from garmin.io.file_manager import FileManager
+        fm = file_manager or FileManager()
+        if prefix is None:
+            prefix = f"profiles/{self.started.strftime('%Y%m%dT%H%M%S')}/"
+        top = top or int(os.environ.get('GARMIN_PROFILE_TOP', 25))
+        written = []
+        for name, stats in self.stats().items():
+            # pstats only dumps to a path; round-trip through a temp file
+            fd, path = tempfile.mkstemp(suffix='.prof')
+            os.close(fd)
+            try:
+                stats.dump_stats(path)
+                with open(path, 'rb') as f:
+                    fm.write_bytes(f.read(), f"{prefix}{name}.prof")
+            finally:
+                os.remove(path)
+            written.append(f"{prefix}{name}.prof")
+        fm.write_text(self.summary(top), f"{prefix}summary.txt")
+        written.append(f"{prefix}summary.txt")
+        return written
+
+
+_profiler: StageProfiler | None = None
+
+
+def enable() -> StageProfiler:
+    """Starts profiling stages, if not already."""
+    global _profiler
+    if _profiler is None:
+        _profiler = StageProfiler()
+    return _profiler
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def stage(name: str):
+    if _profiler is None:
+        return _NOOP_STAGE
+    return _profiler.stage(name)
+
+
+def _from_env():
+    global _profiler
+    _profiler = StageProfiler() if os.environ.get('GARMIN_PROFILE', '') not in ('', '0') else None
+
+
+def write_report(file_manager=None, prefix: str = None, top: int = None) -> list[str]:
+    """
+    Writes the collected profiles (see `StageProfiler.write`), prints the
+    summary path and starts over, so warm Lambda invocations each get their
+    own report. Profiling stays on afterwards only if GARMIN_PROFILE is set.
+    """
+    if _profiler is None:
+        return []
+    written = _profiler.write(file_manager, prefix, top)
+    print(f"Wrote stage profiles: {written[-1]}")
+    _from_env()
+    return written
+
+
+_from_env()
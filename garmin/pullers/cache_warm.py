@@ -0,0 +1,138 @@
+## garmin/pullers/cache_warm.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+
+class CacheWarmScheduler:
+    """
+    Drives Garmin's "Reload Chart" flow for many dates at once.
+
+    Warm requests are POSTed in parallel batches. Each accepted date is then
+    polled with exponential backoff until its data is ready or the overall
+    deadline passes. A DENIED response pauses new warm requests for a
+    cool-down period and requeues the denied dates instead of giving up; only
+    after `max_cooldowns` cool-downs are the remaining dates reported as
+    denied.
+
+    Args:
+        batch_size: Warm requests issued per batch.
+        initial_delay: Seconds before the first readiness poll.
+        max_delay: Upper bound on the delay between polls of one date.
+        backoff: Multiplier applied to the poll delay after each miss.
+        deadline_s: Total seconds a `run` may spend warming and polling.
+        cooldown_s: Pause after a DENIED response before warming resumes.
+        max_cooldowns: Cool-downs allowed per run.
+    """
+    def __init__(self,
+                 batch_size: int = 8,
+                 initial_delay: float = 1.0,
+                 max_delay: float = 16.0,
+                 backoff: float = 2.0,
+                 deadline_s: float = 60.0,
+                 cooldown_s: float = 30.0,
+                 max_cooldowns: int = 1,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.batch_size = batch_size
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.deadline_s = deadline_s
+        self.cooldown_s = cooldown_s
+        self.max_cooldowns = max_cooldowns
+        self.clock = clock
+        self.sleep = sleep
+        self.last_report: dict[str, dict] = {}
+
+    def run(self,
+            dates: list[str],
+            post: Callable[[str], dict],
+            poll: Callable[[str], tuple[str, object]],
+            max_workers: int = 4,
+            deadline_s: float = None) -> Iterator[tuple[str, str, object]]:
+        """
+        Warms and polls `dates`, yielding `(date, status, payload)` as each one
+        resolves.
+
+        Args:
+            post: Sends the warm request for a date and returns the response.
+            poll: Re-fetches a date, returning `(status, payload)` where status
+                is 'fetched', 'no_data', 'denied', or 'warm' if not ready yet.
+
+            deadline_s: Caps this run's deadline below `self.deadline_s`,
+                e.g. to the time a caller has left; at 0 or less nothing is
+                warmed.
+
+        Dates still warming at the deadline are yielded as 'unknown'.
+        `last_report` maps every date to its status, poll count and the
+        latency from warm request to resolution.
+        """
+        self.last_report = {}
+        start = self.clock()
+        deadline = start + (self.deadline_s if deadline_s is None else min(self.deadline_s, deadline_s))
+        pending = list(dates)
+        waiting: dict[str, dict] = {}
+        cooldown_until = start
+        cooldowns = 0
+
+        def finish(date, status, payload=None):
+            entry = waiting.pop(date, None)
+            report = {'status': status, 'polls': 0, 'latency_s': None}
+            if entry is not None:
+                report['polls'] = entry['polls']
+                report['latency_s'] = self.clock() - entry['requested_at']
+            self.last_report[date] = report
+            return date, status, payload
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            while (pending or waiting) and self.clock() < deadline:
+                now = self.clock()
+                if pending and now >= cooldown_until:
+                    batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                    responses = list(executor.map(post, batch))
+                    denied = []
+                    for date, res in zip(batch, responses):
+                        if (res or {}).get('status') == 'DENIED':
+                            denied.append(date)
+                        else:
+                            waiting[date] = {
+                                'requested_at': now,
+                                'next_poll': now + self.initial_delay,
+                                'delay': self.initial_delay,
+                                'polls': 0,
+                            }
+                    if denied:
+                        cooldowns += 1
+                        if cooldowns > self.max_cooldowns:
+                            for date in denied + pending:
+                                yield finish(date, 'denied')
+                            pending = []
+                        else:
+                            pending = denied + pending
+                            cooldown_until = now + self.cooldown_s
+
+                now = self.clock()
+                due = [d for d, w in waiting.items() if w['next_poll'] <= now]
+                for date, (status, payload) in zip(due, executor.map(poll, due)):
+                    entry = waiting[date]
+                    entry['polls'] += 1
+                    if status == 'warm':
+                        entry['delay'] = min(entry['delay'] * self.backoff, self.max_delay)
+                        entry['next_poll'] = self.clock() + entry['delay']
+                    else:
+                        yield finish(date, status, payload)
+
+                if not (pending or waiting):
+                    break
+                wake = [deadline]
+                wake.extend(w['next_poll'] for w in waiting.values())
+                if pending:
+                    wake.append(cooldown_until)
+                delay = min(wake) - self.clock()
+                if delay > 0:
+                    self.sleep(delay)
+
+        for date in list(waiting) + pending:
+            yield finish(date, 'unknown')
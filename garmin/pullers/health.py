@@ -1,13 +1,38 @@
 ## garmin/pullers/health.py
 
+import json
+import threading
 import pandas as pd
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from tqdm.auto import tqdm
+from garmin import instrumentation, profiling
+from garmin.io.file_manager import FileManager
+from garmin.rate_limit import http_status
+from garmin.pullers.parsing import parse_daily_entries
+
+# Statuses with which the API rejects a request window that is too large.
+WINDOW_REJECTED_STATUSES = (400, 413, 414, 422)
 
 class HealthPuller:
-    def __init__(self, session):
+    def __init__(self, session, file_manager=None, adaptive=True, max_workers=4):
+        """
+        Args:
+            session: A GarminSession (or anything with a compatible get).
+            file_manager (FileManager, optional): Where learned chunk sizes
+                are persisted.
+            adaptive (bool): Learn the largest accepted window per data type
+                instead of always using the configured `chunk_days`.
+            max_workers (int): Concurrent window requests once a data type's
+                window size has settled.
+        """
         self.session = session
+        self.fm = file_manager or FileManager()
+        self.adaptive = adaptive
+        self.max_workers = max(1, max_workers)
+        self.chunk_sizes_file = 'pullers/chunk_sizes.json'
+        self._chunk_sizes = None
+        self._chunk_sizes_lock = threading.Lock()
         self._pull_configs = {
             'weight': {
                 'url_template': "/weight-service/weight/range/{start_date}/{end_date}?includeAll=true",
@@ -23,6 +48,7 @@ class HealthPuller:
                 'values_field': "allWeightMetrics",
                 'date_field': "summaryDate",
                 'chunk_days': 1000,
+                'max_chunk_days': 4000,
                 'post_processing': self._post_process_weight,
             },
             'steps': {
@@ -36,6 +62,8 @@ class HealthPuller:
                 'date_field': "calendarDate",
                 'values_field': "values",
                 'chunk_days': 28,
+                'max_chunk_days': 448,
+                'dense': True,
             },
             'sleep': {
                 'url_template': "/sleep-service/stats/sleep/daily/{start_date}/{end_date}",
@@ -65,6 +93,8 @@ class HealthPuller:
                 'date_field': "calendarDate",
                 'values_field': "values",
                 'chunk_days': 28,
+                'max_chunk_days': 448,
+                'dense': True,
             },
             'heart_rate': {
                 'url_template': "/usersummary-service/stats/heartRate/daily/{start_date}/{end_date}",
@@ -77,6 +107,8 @@ class HealthPuller:
                 'date_field': "calendarDate",
                 'values_field': "values",
                 'chunk_days': 28,
+                'max_chunk_days': 448,
+                'dense': True,
             },
             'stress': {
                 'url_template': "/usersummary-service/stats/stress/daily/{start_date}/{end_date}",
@@ -90,6 +122,8 @@ class HealthPuller:
                 'date_field': "calendarDate",
                 'values_field': "values",
                 'chunk_days': 28,
+                'max_chunk_days': 448,
+                'dense': True,
             },
             'body_battery': {
                 'url_template': "/usersummary-service/stats/bodybattery/daily/{start_date}/{end_date}",
@@ -101,9 +135,118 @@ class HealthPuller:
                 'date_field': "calendarDate",
                 'values_field': "values",
                 'chunk_days': 28,
+                'max_chunk_days': 448,
+                'dense': True,
             },
         }
 
+    def _load_chunk_sizes(self) -> dict:
+        if self._chunk_sizes is None:
+            try:
+                self._chunk_sizes = json.loads(self.fm.read_text(self.chunk_sizes_file))
+            except Exception:
+                self._chunk_sizes = {}
+        return self._chunk_sizes
+
+    def _learn_chunk_size(self, data_type: str, size: int, settled: bool):
+        """Records the window size learned for `data_type` and persists it."""
+        with self._chunk_sizes_lock:
+            sizes = self._load_chunk_sizes()
+            learned = {'size': size, 'settled': settled}
+            if sizes.get(data_type) == learned:
+                return
+            sizes[data_type] = learned
+            try:
+                self.fm.write_text(json.dumps(sizes, indent=2, sort_keys=True), self.chunk_sizes_file)
+            except Exception as e:
+                print(f"[WARN] Could not save learned chunk sizes: {e}")
+
+    def _fetch_window(self, url_template, start, end, response_path) -> list:
+        url = url_template.format(start_date=start, end_date=end)
+        res = self.session.get(url)
+
+        # Pull out the data in case it's nested
+        if response_path:
+            for key in response_path:
+                if res is None:
+                    break
+                res = res.get(key, [])
+        return res or []
+
+    @staticmethod
+    def _is_truncated(entries, date_field, start, end) -> bool:
+        """
+        Heuristic for dense daily metrics: the response stops early if it has
+        one entry per day from `start` onwards but ends before `end`. Windows
+        ending near today are exempt since the latest days may not exist yet.
+        """
+        if not entries or end >= datetime.today().date() - timedelta(days=1):
+            return False
+        dates = sorted({
+            datetime.strptime(str(e[date_field])[:10], "%Y-%m-%d").date()
+            for e in entries if e.get(date_field)
+        })
+        if not dates or dates[0] != start or dates[-1] >= end:
+            return False
+        return len(dates) == (dates[-1] - start).days + 1
+
+    def _fetch_segment(self,
+                       url_template: str,
+                       start,
+                       end,
+                       size: int,
+                       settled: bool,
+                       response_path: list[str] = None,
+                       date_field: str = 'calendarDate',
+                       dense: bool = False,
+                       max_chunk_days: int = None,
+                       pbar=None) -> tuple[list, int, bool]:
+        """
+        Fetches [start, end] in windows of `size` days. While the size is not
+        settled it doubles after every fully accepted window, up to
+        `max_chunk_days`. A window rejected by the API is halved and retried,
+        and a confirmed truncated response shrinks the window to what was
+        returned; both settle the size.
+
+        Returns:
+            tuple: (entries, window size, settled)
+        """
+        entries = []
+        suspected = None
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=size-1), end)
+            n_days = (chunk_end - chunk_start).days + 1
+            try:
+                part = self._fetch_window(url_template, chunk_start, chunk_end, response_path)
+            except Exception as e:
+                if http_status(e) not in WINDOW_REJECTED_STATUSES or n_days == 1:
+                    raise
+                size, settled = max(1, n_days // 2), True
+                continue
+
+            # A short response is only confirmed as truncation once the
+            # following days turn out to have data after all.
+            if suspected and part:
+                size, settled = suspected, True
+            suspected = None
+            if dense and self._is_truncated(part, date_field, chunk_start, chunk_end):
+                last = max(
+                    datetime.strptime(str(e[date_field])[:10], "%Y-%m-%d").date()
+                    for e in part if e.get(date_field)
+                )
+                suspected = (last - chunk_start).days + 1
+                chunk_end = last
+            entries.extend(part)
+            if pbar is not None:
+                pbar.update((chunk_end - chunk_start).days + 1)
+            chunk_start = chunk_end + timedelta(days=1)
+
+            if not settled and not suspected and n_days == size and max_chunk_days:
+                size = min(size * 2, max_chunk_days)
+                settled = size == max_chunk_days
+        return entries, size, settled
+
     def _pull(self,
               url_template: str,
               mapping: dict[str,str],
@@ -113,80 +256,95 @@ class HealthPuller:
               date_field: str = 'calendarDate',
               values_field: str = 'values',
               chunk_days: int = 28,
-              show_progress: bool = True) -> pd.DataFrame:
-        
+              show_progress: bool = True,
+              data_type: str = None,
+              max_chunk_days: int = None,
+              dense: bool = False) -> pd.DataFrame:
+        """
+        Pulls a date range in windows. With `data_type` set and adaptive
+        sizing enabled, the window size learned on previous runs is reused and
+        refined (see `_fetch_segment`); once settled, windows are fetched
+        concurrently on up to `max_workers` threads.
+        """
         start = datetime.strptime(start_date, "%Y-%m-%d").date()
         end = datetime.strptime(end_date,   "%Y-%m-%d").date()
         if start > end:
             raise ValueError("start_date must be <= end_date")
 
-        total_days = (end - start).days + 1
-        n_chunks   = (total_days + chunk_days - 1) // chunk_days
+        adaptive = self.adaptive and data_type is not None
+        learned = self._load_chunk_sizes().get(data_type) if adaptive else None
+        size = learned['size'] if learned else chunk_days
+        settled = learned['settled'] if learned else not adaptive
+        segment_kwargs = dict(
+            url_template=url_template,
+            response_path=response_path,
+            date_field=date_field,
+            dense=dense,
+            max_chunk_days=max_chunk_days if adaptive else None,
+        )
 
-        chunks = []
-        chunk_start = start
-        with tqdm(total=n_chunks, desc="Pulling time series", disable=not show_progress) as pbar:
-            while chunk_start <= end:
-                chunk_end = min(chunk_start + timedelta(days=chunk_days-1), end)
-                url = url_template.format(start_date=chunk_start, end_date=chunk_end)
-                res = self.session.get(url)
-
-                # Pull out the data in case it's nested
-                if response_path:
-                    for key in response_path:
-                        if res is None:
-                            break
-                        res = res.get(key, [])
-                if res is None:
+        total_days = (end - start).days + 1
+        with tqdm(total=total_days, desc="Pulling time series", unit="day", disable=not show_progress) as pbar:
+            if settled and self.max_workers > 1 and total_days > size:
+                windows = []
+                chunk_start = start
+                while chunk_start <= end:
+                    chunk_end = min(chunk_start + timedelta(days=size-1), end)
+                    windows.append((chunk_start, chunk_end))
                     chunk_start = chunk_end + timedelta(days=1)
-                    pbar.update(1)
-                    continue
-
-                rows = []
-                for entry in res:
-                    values = entry.get(values_field, entry)
-                    if isinstance(values, dict):
-                        values = [values]
-                    for measurement in values:
-                        row = {"date": entry[date_field]}
-                        for key, val in mapping.items():
-                            row[val] = measurement.get(key, np.nan)
-                        rows.append(row)
-
-                df_chunk = pd.DataFrame(rows, columns=["date"] + list(mapping.values()))
-                chunks.append(df_chunk)
-                chunk_start = chunk_end + timedelta(days=1)
-
-                pbar.update(1)
-
-        if not chunks:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    results = list(executor.map(
+                        lambda w: self._fetch_segment(
+                            start=w[0], end=w[1], size=size, settled=True, pbar=pbar, **segment_kwargs
+                        ),
+                        windows,
+                    ))
+                entries = [e for part, _, _ in results for e in part]
+                size = min(s for _, s, _ in results)
+            else:
+                entries, size, settled = self._fetch_segment(
+                    start=start, end=end, size=size, settled=settled, pbar=pbar, **segment_kwargs
+                )
+        if adaptive:
+            self._learn_chunk_size(data_type, size, settled)
+
+        if not entries:
             return pd.DataFrame(columns=["date"] + list(mapping.values())).set_index("date")
 
-        df = pd.concat(chunks, ignore_index=True)
-        df["date"] = pd.to_datetime(df["date"])
-        return df.set_index("date").sort_index()
+        with instrumentation.span('puller.health.parse', label=data_type) as span, profiling.stage('parse'):
+            df = parse_daily_entries(entries, mapping, date_field, values_field)
+            df["date"] = pd.to_datetime(df["date"])
+            df = df.set_index("date").sort_index()
+            span.add('entries', len(entries))
+            span.add('rows', len(df))
+        return df
 
     def pull_data(self, data_type: str, start_date=None, end_date=None, show_progress=True) -> pd.DataFrame:
         if data_type not in self._pull_configs:
             raise ValueError(f"Unsupported data type: {data_type}")
         
         config = self._pull_configs[data_type]
-        df = self._pull(
-            url_template=config['url_template'],
-            mapping=config['mapping'],
-            start_date=start_date or "2017-01-01",
-            end_date=end_date or datetime.today().strftime("%Y-%m-%d"),
-            response_path=config.get('response_path'),
-            date_field=config.get('date_field', 'calendarDate'),
-            values_field=config.get('values_field', 'values'),
-            chunk_days=config.get('chunk_days', 28),
-            show_progress=show_progress
-        )
-        
-        # Apply any post-processing if defined
-        if 'post_processing' in config and callable(config['post_processing']):
-            df = config['post_processing'](df)
-        
+        with instrumentation.span('puller.health', label=data_type) as span:
+            df = self._pull(
+                url_template=config['url_template'],
+                mapping=config['mapping'],
+                start_date=start_date or "2017-01-01",
+                end_date=end_date or datetime.today().strftime("%Y-%m-%d"),
+                response_path=config.get('response_path'),
+                date_field=config.get('date_field', 'calendarDate'),
+                values_field=config.get('values_field', 'values'),
+                chunk_days=config.get('chunk_days', 28),
+                show_progress=show_progress,
+                data_type=data_type,
+                max_chunk_days=config.get('max_chunk_days'),
+                dense=config.get('dense', False),
+            )
+
+            # Apply any post-processing if defined
+            if 'post_processing' in config and callable(config['post_processing']):
+                df = config['post_processing'](df)
+            span.add('rows', len(df))
+
         return df
 
     def _post_process_weight(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -1,11 +1,25 @@
 ## garmin/pullers/health_detailed.py
 
+import copy
 import pandas as pd
 import numpy as np
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from tqdm.auto import tqdm
-from typing import Callable
+from garmin import instrumentation, profiling
+from garmin.io.archive import ArchiveMiss
+from typing import Callable, Iterator
+from garmin.pullers.cache_warm import CacheWarmScheduler
+from garmin.pullers.parsing import parse_descriptor_payloads, parse_table_payloads
+
+# Outcomes reported per query date in `_last_pull_status` and streamed chunks.
+PULL_STATUSES = ('fetched', 'no_data', 'denied', 'unknown')
+
+# Days of raw payloads held before parsing when a whole range is requested.
+PARSE_CHUNK_DAYS = 31
 
 class NoDataAvailable(Exception):
     """No historical data available for the given date."""
@@ -16,11 +30,27 @@ class CacheWarmDenied(Exception):
 class CacheWarmRequested(Exception):
     """We POSTed a cache‐warm and need to retry once data is ready."""
 
+class CacheWarmNeeded(Exception):
+    """Data are missing but a cache warm was not requested yet."""
+
 class HealthDetailedPuller:
-    def __init__(self, session):
+    def __init__(self, session, max_workers: int = 4, cache_warm: CacheWarmScheduler = None):
+        """
+        Args:
+            session: A GarminSession (or anything with compatible get/post).
+            max_workers: Maximum number of days fetched concurrently. Use 1 for
+                strictly sequential requests.
+            cache_warm: Scheduler used to warm and re-poll dates whose chart
+                data Garmin has not built yet.
+        """
         self.session = session
-        self._cache_warm_denied = False
+        self.max_workers = max(1, max_workers)
+        self.cache_warm = cache_warm or CacheWarmScheduler()
+        self._cache_warm_denied_until = 0.0
+        self._last_warm_report: dict[str, dict] = {}
         self._last_pull_status: dict[str, list[str]] = {}
+        # Per-pull state lives on the instance, so concurrent pulls each need
+        # their own puller; see `fork`.
         self._pull_configs = {
             'heart_rate': {
                 'url_template': 'wellness-service/wellness/dailyHeartRate?date={date}',
@@ -70,169 +100,297 @@ class HealthDetailedPuller:
             },
         }
 
-    def _pull(self,
-              url_template: str,
-              mapping: dict[str,str],
-              date: str,
-              availability_key: str,
-              descriptors_key: str = None,
-              values_key: str = None,
-              descriptors_key_map: dict[str, str] = {'index': 'index', 'key': 'key'}
-        ) -> pd.DataFrame:
+    def _invalidate_cached(self, url: str):
+        invalidate = getattr(self.session, 'invalidate_cached', None)
+        if invalidate is not None:
+            invalidate(url)
+
+    def _post_cache_warm(self, date: str) -> dict:
+        """
+        Asks Garmin to rebuild the day's chart data (the "Reload Chart" button
+        in the web UI).
+        """
+        return self.session.post(f'wellness-service/wellness/epoch/request/{date}') or {}
+
+    def _request_cache_warm(self, url: str, date: str, request_warm: bool = True):
         """
-        Single-day grab.  If `descriptors_key` is given we use the descriptor→values logic
-        and support cache‐warm.  Otherwise we treat `res` as a flat JSON for chart data.
-        In either case, `availability_key` tells us which field to look at to decide
-        “really no data” vs “might need cache‐warm.”
+        Handles a day whose data still need a cache warm and raises the
+        matching exception. With `request_warm=False` nothing is POSTed and
+        CacheWarmNeeded is raised, leaving the warm to the scheduler.
+        """
+        # The cached copy of this response is incomplete; make sure the next
+        # attempt goes to Garmin.
+        self._invalidate_cached(url)
+        if not request_warm:
+            raise CacheWarmNeeded(date)
+        if time.monotonic() < self._cache_warm_denied_until:
+            # Garmin refused recently; wait out the cool-down
+            raise CacheWarmDenied(date)
+        post_res = self._post_cache_warm(date)
+        if post_res.get("status") == "DENIED":
+            self._cache_warm_denied_until = time.monotonic() + self.cache_warm.cooldown_s
+            raise CacheWarmDenied(date)
+        # Cache warm request was accepted, but need to wait a few seconds
+        # before it'll be available
+        raise CacheWarmRequested(date)
+
+    def _fetch_day(self,
+                   url_template: str,
+                   mapping: dict[str,str],
+                   date: str,
+                   availability_key: str,
+                   descriptors_key: str = None,
+                   values_key: str = None,
+                   request_warm: bool = True,
+                   **kwargs):
+        """
+        Single-day request returning the raw payload. If `descriptors_key` is
+        given the payload uses the descriptor→values layout, otherwise it is a
+        flat list of chart records. In either case, `availability_key` tells us
+        which field to look at to decide "really no data" vs "might need
+        cache‐warm", and the matching exception is raised. See
+        `_request_cache_warm` for `request_warm`.
         """
         url = url_template.format(date=date)
         res = self.session.get(url)
 
         # Descriptor-based endpoints (e.g., heart rate, respiration, spo2)
         if descriptors_key:
-            descriptors = res.get(descriptors_key) or []
             # No descriptors field, need to determine why
-            if not descriptors:
+            if not res.get(descriptors_key):
                 if res.get(availability_key) is None:
                     raise NoDataAvailable(date)
-                
-                # If availability_key exists, then data are missing,
-                # but we can likely get garmin to warm the cache. This
-                # is the "Reload Chart" button in the web UI
-                if self._cache_warm_denied:
-                    # Already tried to warm the cache, but Garmin refused
-                    raise CacheWarmDenied(date)
-
-                post_url = f'wellness-service/wellness/epoch/request/{date}'
-                post_res = self.session.post(post_url)
-                if post_res.get("status") == "DENIED":
-                    self._cache_warm_denied = True
-                    raise CacheWarmDenied(date)
-                else:
-                    # Cache warm request was accepted, but need to wait a
-                    # few seconds before it'll be available
-                    raise CacheWarmRequested(date)
-            
-            cols = [None] * len(res[descriptors_key])
-            for desc in res[descriptors_key]:
-                cols[desc[descriptors_key_map['index']]] = desc[descriptors_key_map['key']]
-            df = pd.DataFrame(res[values_key], columns=cols)
-            df = df.rename(columns=mapping)
-            df['query_date'] = date
-            if 'timestamp' in df.columns:
-                df['date_time_utc'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
-            return df
+                # If availability_key exists, then data are missing, but we
+                # can likely get garmin to warm the cache.
+                self._request_cache_warm(url, date, request_warm)
+            return res
 
         # Table-based endpoints (e.g., steps)
         if res == []:
             raise NoDataAvailable(date)
-        df = pd.DataFrame(res).rename(columns=mapping)
         # If all values are zero, might need to warm cache
-        if (df[availability_key] == 0).all():
-            if self._cache_warm_denied:
-                raise CacheWarmDenied(date)
-            post_res = self.session.post(
-                f"wellness-service/wellness/epoch/request/{date}"
-            )
-            if post_res.get("status") == "DENIED":
-                self._cache_warm_denied = True
-                raise CacheWarmDenied(date)
+        raw_key = next((k for k, v in mapping.items() if v == availability_key), availability_key)
+        if all(r.get(raw_key) == 0 for r in res):
+            self._request_cache_warm(url, date, request_warm)
+        return res
+
+    def fork(self) -> "HealthDetailedPuller":
+        """
+        A puller sharing this one's session and settings but with its own
+        pull status, warm report, denial cool-down and CacheWarmScheduler,
+        for running alongside this one on another thread.
+        """
+        cache_warm = copy.copy(self.cache_warm)
+        cache_warm.last_report = {}
+        puller = copy.copy(self)
+        puller.cache_warm = cache_warm
+        puller._cache_warm_denied_until = 0.0
+        puller._last_warm_report = {}
+        puller._last_pull_status = {}
+        return puller
+
+    @staticmethod
+    def _has_rows(payload, values_key: str = None, **kwargs) -> bool:
+        if values_key:
+            return bool(payload.get(values_key))
+        return bool(payload)
+
+    @staticmethod
+    def _parse(payloads: list[tuple[str, object]],
+               mapping: dict[str,str],
+               descriptors_key: str = None,
+               values_key: str = None,
+               descriptors_key_map: dict[str, str] = {'index': 'index', 'key': 'key'},
+               **kwargs) -> pd.DataFrame:
+        """Parses `(date, payload)` pairs from `_fetch_day` into one DataFrame."""
+        if not payloads:
+            return pd.DataFrame()
+        with (instrumentation.span('puller.detailed.parse', label=values_key or 'table') as span,
+              profiling.stage('parse')):
+            if descriptors_key:
+                df = parse_descriptor_payloads(
+                    payloads, descriptors_key, values_key, mapping, descriptors_key_map
+                )
             else:
-                raise CacheWarmRequested(date)
-        df['query_date'] = date
-        # Otherwise return the data
-        if 'start_gmt' in df.columns:
-            df['date_time_utc'] = pd.to_datetime(df['start_gmt'], utc=True)
+                df = parse_table_payloads(payloads, mapping)
+            span.add('days', len(payloads))
+            span.add('rows', len(df))
         return df
 
-    def _pull_for_range(self,
-                        pull_one_day: Callable[[str],pd.DataFrame],
-                        start_date: str = None,
-                        end_date: str = None,
-                        dates: list[str] = None) -> pd.DataFrame:
-        """Loop over single‐day pulls, batch cache warms, then retry once."""
+    def _pull(self,
+              url_template: str,
+              mapping: dict[str,str],
+              date: str,
+              availability_key: str,
+              descriptors_key: str = None,
+              values_key: str = None,
+              descriptors_key_map: dict[str, str] = {'index': 'index', 'key': 'key'}
+        ) -> pd.DataFrame:
+        """
+        Single-day grab: `_fetch_day` followed by `_parse`.
+        """
+        res = self._fetch_day(
+            url_template, mapping, date, availability_key, descriptors_key, values_key
+        )
+        return self._parse(
+            [(date, res)], mapping, descriptors_key, values_key, descriptors_key_map
+        )
+
+    @staticmethod
+    def _resolve_dates(start_date: str = None,
+                       end_date: str = None,
+                       dates: list[str] = None,
+                       keep_order: bool = False) -> list[str]:
         if dates is not None:
-            date_list = sorted(set(dates))  # Ensure no duplicates and sorted
-        elif start_date and end_date:
+            if keep_order:
+                return list(dict.fromkeys(dates))  # Drop duplicates, keep priority order
+            return sorted(set(dates))  # Ensure no duplicates and sorted
+        if start_date and end_date:
             start = datetime.strptime(start_date, "%Y-%m-%d").date()
             end = datetime.strptime(end_date, "%Y-%m-%d").date()
             if start > end:
                 raise ValueError("start_date must be <= end_date")
-            date_list = [d.strftime("%Y-%m-%d") for d in pd.date_range(start, end)]
-        else:
-            raise ValueError("Must provide either dates or both start_date and end_date.")
-        
-        fetched = []
-        no_data = []
-        to_retry = []
-        denied = []
-        df_list = []
+            return [d.strftime("%Y-%m-%d") for d in pd.date_range(start, end)]
+        raise ValueError("Must provide either dates or both start_date and end_date.")
+
+    def _ordered_map(self, fn: Callable, items: list) -> Iterator[tuple]:
+        """
+        Yields `(item, fn(item))` in input order, running up to `max_workers`
+        calls concurrently with a bounded number of requests in flight.
+        """
+        if self.max_workers <= 1:
+            for item in items:
+                yield item, fn(item)
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            remaining = iter(items)
+            pending = deque(
+                (item, executor.submit(fn, item))
+                for item in islice(remaining, self.max_workers * 2)
+            )
+            while pending:
+                item, future = pending.popleft()
+                result = future.result()
+                for nxt in islice(remaining, 1):
+                    pending.append((nxt, executor.submit(fn, nxt)))
+                yield item, result
+
+    def _iter_range(self,
+                    config: dict,
+                    date_list: list[str],
+                    chunk_days: int = 1,
+                    deadline=None) -> Iterator[tuple[pd.DataFrame, dict[str, list[str]]]]:
+        """
+        Loop over single-day requests for the data type described by `config`,
+        parsing and yielding every `chunk_days` resolved dates
+        as `(df, status)` where `status` maps each of PULL_STATUSES to the
+        dates in that chunk. Dates that need a cache warm are handed to
+        `cache_warm` once per chunk's worth of attempted dates, so a range
+        cut short still warms the cold days it reached; any still warming at
+        the warm deadline are reported as 'unknown'. With a `deadline`
+        (scheduler.Deadline) that warm deadline is capped at the time left.
+
+        `_last_pull_status` is updated as chunks are produced, so it reflects
+        everything yielded so far. `_last_warm_report` holds the per-date
+        warm latency of the last range.
+        """
+        self._last_pull_status = {s: [] for s in PULL_STATUSES}
+        self._last_warm_report = {}
+        chunk = {'payloads': [], **{s: [] for s in PULL_STATUSES}}
+
+        def resolve(date, status, payload=None):
+            if payload is not None:
+                chunk['payloads'].append((date, payload))
+            chunk[status].append(date)
+            self._last_pull_status[status].append(date)
+            instrumentation.count(f'puller.detailed.{status}')
 
-        # First pass: try to pull all the data, keeping track of cache warms
-        # and denied requests
-        for date in tqdm(date_list, desc="Pulling data"):
+        def flush():
+            # Payloads are parsed together, once per chunk
+            payloads = sorted(chunk.pop('payloads'), key=lambda p: p[0])
+            status = dict(chunk)
+            chunk.clear()
+            chunk.update({'payloads': [], **{s: [] for s in PULL_STATUSES}})
+            return self._parse(payloads, **config), status
+
+        def n_resolved():
+            return sum(len(chunk[s]) for s in PULL_STATUSES)
+
+        def attempt(date):
+            # Runs on a worker thread; only touches the network, not `chunk`
             try:
-                df_day = pull_one_day(date)
-                if not df_day.empty:
-                    df_list.append(df_day)
-                    fetched.append(date)
-                else:
-                    no_data.append(date)
-            except CacheWarmRequested:
-                to_retry.append(date)
+                payload = self._fetch_day(date=date, request_warm=False, **config)
+                if self._has_rows(payload, **config):
+                    return 'fetched', payload
+                return 'no_data', None
+            except CacheWarmNeeded:
+                return 'warm', None
             except CacheWarmDenied:
-                denied.append(date)
+                return 'denied', None
             except NoDataAvailable:
-                no_data.append(date)
-                continue
-        
-        # Try to get the data after the cache warm requests
+                return 'no_data', None
+            except ArchiveMiss:
+                # Replaying an archive that lacks this day: retried on a
+                # later run like any other unresolved date
+                return 'unknown', None
+
+        def warm(dates):
+            # Warm the cache for the missing dates and poll until they are
+            # ready, but never past the caller's deadline
+            budget = None if deadline is None else deadline.remaining()
+            results = self.cache_warm.run(dates, self._post_cache_warm, attempt, self.max_workers,
+                                          deadline_s=budget)
+            for date, status, payload in tqdm(results, total=len(dates), desc="Warming cache"):
+                resolve(date, status, payload)
+            self._last_warm_report.update(self.cache_warm.last_report)
+
+        # Pull every date, keeping track of the ones that need a cache warm;
+        # those are warmed before each chunk is yielded
+        to_retry = []
+        results = self._ordered_map(attempt, date_list)
+        for date, (status, payload) in tqdm(results, total=len(date_list), desc="Pulling data"):
+            if status == 'warm':
+                to_retry.append(date)
+            else:
+                resolve(date, status, payload)
+            if n_resolved() + len(to_retry) >= chunk_days:
+                if to_retry:
+                    warm(to_retry)
+                    to_retry = []
+                yield flush()
+
         if to_retry:
-            time.sleep(1)
-            for date in tqdm(to_retry, desc="Retrying cache warm requests"):
-                try:
-                    df_day = pull_one_day(date)
-                    if not df_day.empty:
-                        df_list.append(df_day)
-                        fetched.append(date)
-                    else:
-                        no_data.append(date)
-                except CacheWarmDenied:
-                    denied.append(date)
-                except NoDataAvailable:
-                    no_data.append(date)
+            warm(to_retry)
+        if n_resolved():
+            yield flush()
 
+    def _pull_for_range(self,
+                        config: dict,
+                        start_date: str = None,
+                        end_date: str = None,
+                        dates: list[str] = None) -> pd.DataFrame:
+        """Loop over single‐day pulls, then warm and poll the missing dates."""
+        date_list = self._resolve_dates(start_date, end_date, dates)
+        df_list = [
+            df for df, _ in self._iter_range(config, date_list, chunk_days=PARSE_CHUNK_DAYS)
+            if not df.empty
+        ]
+        denied = self._last_pull_status['denied']
+        no_data = self._last_pull_status['no_data']
+        latencies = [r['latency_s'] for r in self._last_warm_report.values() if r['latency_s'] is not None]
+        if latencies:
+            print(f"Cache warmed {len(latencies)} dates, "
+                  f"median {np.median(latencies):.1f}s, max {max(latencies):.1f}s")
         if denied:
             print(f"Cache warm denied for {len(denied)} dates: {', '.join(denied)}")
         if no_data:
             print(f"No data available for {len(no_data)} dates: {', '.join(no_data)}")
-        
-        self._last_pull_status = {
-            'fetched': fetched,
-            'no_data': no_data,
-            'denied': denied,
-        }
+
         if df_list:
             return pd.concat(df_list, ignore_index=True)
         else:
             return pd.DataFrame()
 
-    def _pull_single_day(self,
-                         date: str,
-                         config: dict) -> pd.DataFrame:
-        """
-        Generic single-day pull function.
-        """
-        return self._pull(
-            url_template=config['url_template'],
-            mapping=config['mapping'],
-            date=date,
-            availability_key=config['availability_key'],
-            descriptors_key=config.get('descriptors_key'),
-            values_key=config.get('values_key'),
-            descriptors_key_map=config.get('descriptors_key_map', {'index': 'index', 'key': 'key'}),
-        )
-
     def _generic_range_pull(self,
                             name: str,
                             start_date=None,
@@ -245,7 +403,7 @@ class HealthDetailedPuller:
         config = self._pull_configs[name]
         expected_cols = list(config['mapping'].values()) + ['query_date', 'date_time_utc']
         df = self._pull_for_range(
-            lambda date: self._pull_single_day(date, config),
+            config,
             start_date=start_date,
             end_date=end_date,
             dates=dates
@@ -264,4 +422,35 @@ class HealthDetailedPuller:
         """
         if data_type not in self._pull_configs:
             raise ValueError(f"Unsupported data type: {data_type}")
-        return self._generic_range_pull(data_type, start_date, end_date, dates)
\ No newline at end of file
+        with instrumentation.span('puller.detailed', label=data_type) as span:
+            df = self._generic_range_pull(data_type, start_date, end_date, dates)
+            span.add('rows', len(df))
+        return df
+
+    def iter_data(self,
+                  data_type: str,
+                  start_date: str = None,
+                  end_date: str = None,
+                  dates: list[str] = None,
+                  chunk_days: int = 1,
+                  deadline=None) -> Iterator[tuple[pd.DataFrame, dict[str, list[str]]]]:
+        """
+        Streaming counterpart of `pull_data`: yields `(df, status)` after every
+        `chunk_days` resolved dates instead of holding the whole range in
+        memory. `status` maps each of PULL_STATUSES to the dates covered by
+        that chunk. Explicit `dates` are pulled in the order given. Cache
+        warms stop at `deadline` (scheduler.Deadline), if given.
+        """
+        if data_type not in self._pull_configs:
+            raise ValueError(f"Unsupported data type: {data_type}")
+        if start_date is None:
+            start_date = datetime.today().strftime('%Y-%m-%d')
+        if end_date is None:
+            end_date = start_date
+        config = self._pull_configs[data_type]
+        expected_cols = list(config['mapping'].values()) + ['query_date', 'date_time_utc']
+        date_list = self._resolve_dates(start_date, end_date, dates, keep_order=True)
+        for df, status in self._iter_range(config, date_list, chunk_days=chunk_days, deadline=deadline):
+            if df.empty:
+                df = pd.DataFrame(columns=expected_cols)
+            yield df, status
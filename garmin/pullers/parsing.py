@@ -0,0 +1,115 @@
+## garmin/pullers/parsing.py
+
+import numpy as np
+import pandas as pd
+
+
+def _values_array(values: list) -> np.ndarray:
+    """
+    Converts a list of value rows into a 2-D array, float64 when every value is
+    numeric (None becomes NaN) and object otherwise.
+    """
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = np.empty((len(values), max(len(v) for v in values)), dtype=object)
+        for i, row in enumerate(values):
+            arr[i, :len(row)] = row
+    return arr.reshape(len(values), -1)
+
+
+def parse_descriptor_payloads(payloads: list[tuple[str, dict]],
+                              descriptors_key: str,
+                              values_key: str,
+                              mapping: dict[str, str],
+                              descriptors_key_map: dict[str, str] = {'index': 'index', 'key': 'key'}
+                              ) -> pd.DataFrame:
+    """
+    Parses many days of descriptor/values payloads (heart rate, respiration,
+    spo2) in one pass.
+
+    Each payload's `values_key` rows are converted to a NumPy array and copied
+    column by column into preallocated output arrays, so the only DataFrame
+    built is the final one. Timestamps are kept as int64 milliseconds and
+    converted to `date_time_utc` once for the whole chunk.
+
+    Args:
+        payloads: `(query_date, payload)` pairs.
+
+    Returns:
+        DataFrame: Mapped value columns plus `query_date` and `date_time_utc`.
+    """
+    # First pass only sizes the output, so each day's array can be converted
+    # and released one at a time in the second.
+    days = [(date, payload) for date, payload in payloads if payload.get(values_key)]
+    n_total = sum(len(payload[values_key]) for _, payload in days)
+
+    out = {}
+    query_dates = np.empty(n_total, dtype=object)
+    pos = 0
+    for date, payload in days:
+        arr = _values_array(payload[values_key])
+        n = len(arr)
+        dtype = object if arr.dtype == object else np.float64
+        for desc in payload[descriptors_key]:
+            name = desc[descriptors_key_map['key']]
+            name = mapping.get(name, name)
+            if name not in out:
+                out[name] = np.full(n_total, np.nan, dtype=dtype)
+            elif dtype == object and out[name].dtype != object:
+                out[name] = out[name].astype(object)
+            out[name][pos:pos + n] = arr[:, desc[descriptors_key_map['index']]]
+        query_dates[pos:pos + n] = date
+        pos += n
+
+    df = pd.DataFrame(out)
+    df['query_date'] = query_dates
+    if 'timestamp' in df.columns:
+        ts = df['timestamp'].to_numpy()
+        if ts.dtype != object and not np.isnan(ts).any():
+            df['timestamp'] = ts.astype(np.int64)
+        df['date_time_utc'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
+    return df
+
+
+def parse_table_payloads(payloads: list[tuple[str, list[dict]]],
+                         mapping: dict[str, str]) -> pd.DataFrame:
+    """
+    Parses many days of list-of-records payloads (e.g. the steps chart) into a
+    single DataFrame built once from the concatenated records.
+    """
+    records = []
+    lengths = []
+    for date, payload in payloads:
+        records.extend(payload)
+        lengths.append(len(payload))
+    df = pd.DataFrame.from_records(records).rename(columns=mapping)
+    df['query_date'] = np.repeat(np.array([d for d, _ in payloads], dtype=object), lengths)
+    if 'start_gmt' in df.columns:
+        df['date_time_utc'] = pd.to_datetime(df['start_gmt'], utc=True)
+    return df
+
+
+def parse_daily_entries(entries: list[dict],
+                        mapping: dict[str, str],
+                        date_field: str = 'calendarDate',
+                        values_field: str = 'values') -> pd.DataFrame:
+    """
+    Parses daily summary entries into one column list per mapped field instead
+    of a dict per measurement. An entry's `values_field` may hold one
+    measurement (dict) or several (list); entries without it are their own
+    measurement.
+    """
+    dates = []
+    measurements = []
+    for entry in entries:
+        values = entry.get(values_field, entry)
+        if isinstance(values, dict):
+            values = [values]
+        dates.extend([entry[date_field]] * len(values))
+        measurements.extend(values)
+
+    columns = {"date": dates}
+    for key, name in mapping.items():
+        columns[name] = [m.get(key, np.nan) for m in measurements]
+    return pd.DataFrame(columns, columns=["date"] + list(mapping.values()))
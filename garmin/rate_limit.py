@@ -0,0 +1,114 @@
+## garmin/rate_limit.py
+
+import random
+import threading
+import time
+
+# HTTP statuses that are worth retrying: rate limiting, timeouts and
+# transient server-side failures. A superset of garth's own status_forcelist,
+# whose retries GarminSession turns off so RetryPolicy sees every failure.
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+def endpoint_family(url: str) -> str:
+    """
+    Groups a Connect API path by its service, e.g.
+    'wellness-service/wellness/dailyHeartRate?date=...' -> 'wellness-service'.
+    """
+    return url.lstrip('/').split('/', 1)[0].split('?', 1)[0]
+
+
+def http_status(exc: Exception) -> int | None:
+    """Extracts the HTTP status code from a garth/requests error, if any."""
+    error = getattr(exc, 'error', exc)
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds requested by a Retry-After header on the failed response."""
+    error = getattr(exc, 'error', exc)
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows bursts of up to `burst` requests and a
+    sustained `rate` requests per second.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Blocks until a token is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """One TokenBucket per endpoint family, created on first use."""
+    def __init__(self, rate: float = 5.0, burst: int = 10, family_rates: dict[str, float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.family_rates = family_rates or {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str) -> float:
+        family = endpoint_family(url)
+        with self._lock:
+            bucket = self._buckets.get(family)
+            if bucket is None:
+                bucket = TokenBucket(self.family_rates.get(family, self.rate), self.burst)
+                self._buckets[family] = bucket
+        return bucket.acquire()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for retryable HTTP errors.
+
+    Args:
+        max_retries: Retries after the first attempt; 0 disables retrying.
+        base_delay: Delay cap for the first retry, doubled on each attempt.
+        max_delay: Upper bound on any single delay.
+        statuses: HTTP statuses that trigger a retry.
+    """
+    def __init__(self,
+                 max_retries: int = 4,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0,
+                 statuses: tuple[int, ...] = RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.statuses = statuses
+
+    def should_retry(self, exc: Exception, attempt: int) -> bool:
+        return attempt < self.max_retries and http_status(exc) in self.statuses
+
+    def delay(self, exc: Exception, attempt: int) -> float:
+        requested = retry_after(exc)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
@@ -0,0 +1,227 @@
+## garmin/scheduler.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from garmin import instrumentation, profiling
+
+
+class Deadline:
+    """
+    Point in time by which a run must have stopped, less a safety margin.
+
+    Args:
+        seconds: Seconds from now until the hard deadline; None means no limit.
+        margin_s: Seconds kept in reserve for committing and returning.
+    """
+    def __init__(self, seconds: float = None, margin_s: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.margin_s = margin_s
+        self._end = None if seconds is None else clock() + seconds
+
+    @classmethod
+    def from_lambda_context(cls, context, margin_s: float = 30.0) -> "Deadline":
+        """
+        Deadline from a Lambda context's remaining time. Outside Lambda (no
+        context) the `GARMIN_DEADLINE_S` environment variable gives a
+        synthetic deadline, and without it there is no limit.
+        """
+        remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+        if remaining_ms is not None:
+            return cls(remaining_ms() / 1000, margin_s)
+        seconds = os.environ.get('GARMIN_DEADLINE_S')
+        return cls(float(seconds) if seconds else None, margin_s)
+
+    def remaining(self) -> float:
+        """Usable seconds left, after the margin."""
+        if self._end is None:
+            return float('inf')
+        return self._end - self.margin_s - self.clock()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class UpdateScheduler:
+    """
+    Runs DataUpdater work against a Deadline.
+
+    Daily metrics are cheap, single-request updates and go first so fresh data
+    always lands. Detailed metrics are then advanced round-robin one committed
+    chunk at a time, so a long backfill of one metric cannot starve the others.
+    A unit is only started if the time left covers the metric's last unit, so
+    the run stops between commits rather than being killed mid-write.
+
+    With `max_workers > 1` every model instead runs on its own thread (daily
+    metrics submitted first), each draining its chunks under the same deadline
+    rule, so a run takes roughly as long as its slowest model.
+
+    Errors are isolated per model: the model is marked 'error' in the summary
+    and the others carry on.
+    """
+    def __init__(self, updater, deadline: Deadline = None, max_workers: int = 1,
+                 start_date: str = "2015-01-01", end_date: str = None):
+        self.updater = updater
+        self.start_date = start_date
+        self.end_date = end_date
+        self.deadline = deadline or Deadline()
+        self.max_workers = max(1, max_workers)
+
+    def _fits(self, estimate: float) -> bool:
+        return not self.deadline.expired() and self.deadline.remaining() >= estimate
+
+    @staticmethod
+    def _fail(model_class, entry, exc):
+        print(f"Error updating {model_class.__tablename__}:", exc)
+        entry['status'] = 'error'
+        entry['error'] = f"{type(exc).__name__}: {exc}"
+
+    def _run_daily(self, model_class, entry):
+        if self.deadline.expired():
+            return
+        t0 = time.monotonic()
+        try:
+            with instrumentation.span('update.daily', label=model_class.__tablename__), profiling.stage('pull'):
+                self.updater.update(model_class, start_date=self.start_date, end_date=self.end_date)
+            entry['status'] = 'done'
+            entry['remaining_dates'] = 0
+        except Exception as e:
+            self._fail(model_class, entry, e)
+        entry['units'] += 1
+        entry['seconds'] += time.monotonic() - t0
+
+    def _advance(self, model_class, stream, entry) -> tuple[bool, float]:
+        """
+        Runs one unit of a detailed stream. Returns whether the stream has more
+        work and how long the unit took.
+        """
+        t0 = time.monotonic()
+        try:
+            with (instrumentation.span('update.detailed_chunk', label=model_class.__tablename__) as span,
+                  profiling.stage('pull')):
+                unit = next(stream)
+                span.add('dates', unit['dates'])
+                span.add('rows', unit['rows'])
+        except StopIteration:
+            # A stream can also end early, at the updater's time budget
+            if not entry['remaining_dates']:
+                entry['status'] = 'done'
+                entry['remaining_dates'] = 0
+            return False, 0.0
+        except Exception as e:
+            self._fail(model_class, entry, e)
+            return False, 0.0
+        finally:
+            entry['seconds'] += time.monotonic() - t0
+        elapsed = time.monotonic() - t0
+        entry['status'] = 'done' if unit['remaining_dates'] <= 0 else 'partial'
+        entry['units'] += 1
+        entry['dates'] += unit['dates']
+        entry['rows'] += unit['rows']
+        entry['remaining_dates'] = unit['remaining_dates']
+        return True, elapsed
+
+    def _detailed_stream(self, model_class):
+        # Streams run interleaved or on separate threads; each gets its own
+        # puller so their pull status and cache-warm state stay apart. The
+        # deadline bounds cache warms inside a unit, which _fits cannot see.
+        return self.updater.iter_detailed_updates(
+            model_class, self.start_date, end_date=self.end_date,
+            puller=self.updater.health_detailed_puller.fork(), deadline=self.deadline,
+        )
+
+    def _drain_detailed(self, model_class, entry):
+        stream = self._detailed_stream(model_class)
+        estimate = 0.0
+        try:
+            more = True
+            while more and self._fits(estimate):
+                more, estimate = self._advance(model_class, stream, entry)
+        finally:
+            stream.close()
+
+    def _run_model(self, model_class, entry):
+        if model_class in self.updater.stream_fn_map:
+            self._drain_detailed(model_class, entry)
+        else:
+            self._run_daily(model_class, entry)
+
+    def _run_serial(self, models, summary):
+        daily = [m for m in models if m not in self.updater.stream_fn_map]
+        detailed = [m for m in models if m in self.updater.stream_fn_map]
+        for model_class in daily:
+            self._run_daily(model_class, summary[model_class.__tablename__])
+
+        streams = {m: self._detailed_stream(m) for m in detailed}
+        estimates = {m: 0.0 for m in detailed}
+        while streams:
+            for model_class in list(streams):
+                if not self._fits(estimates[model_class]):
+                    continue
+                more, estimates[model_class] = self._advance(
+                    model_class, streams[model_class], summary[model_class.__tablename__]
+                )
+                if not more:
+                    streams.pop(model_class).close()
+            if streams and not any(self._fits(estimates[m]) for m in streams):
+                break
+        for stream in streams.values():
+            stream.close()
+
+    def _run_parallel(self, models, summary):
+        ordered = sorted(models, key=lambda m: m in self.updater.stream_fn_map)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self._run_model, m, summary[m.__tablename__])
+                for m in ordered
+            ]
+            for future in futures:
+                future.result()
+
+    def run(self, models: list) -> dict:
+        """
+        Updates `models` and returns a summary:
+
+            {'status': 'complete' | 'deadline' | 'error',
+             'elapsed_s': float,
+             'errors': {table: message},
+             'models': {table: {'status': 'done' | 'partial' | 'pending' | 'error',
+                                'units', 'dates', 'rows', 'remaining_dates',
+                                'seconds', 'error'}}}
+
+        'remaining_dates' is None when a metric was never started.
+        """
+        started = time.monotonic()
+        summary = {
+            m.__tablename__: {
+                'status': 'pending', 'units': 0, 'dates': 0, 'rows': 0,
+                'remaining_dates': None, 'seconds': 0.0, 'error': None,
+            }
+            for m in models
+        }
+        if self.max_workers > 1:
+            self._run_parallel(models, summary)
+        else:
+            self._run_serial(models, summary)
+
+        for entry in summary.values():
+            entry['seconds'] = round(entry['seconds'], 3)
+        errors = {name: e['error'] for name, e in summary.items() if e['status'] == 'error'}
+        if any(e['status'] in ('pending', 'partial') for e in summary.values()):
+            status = 'deadline'
+        elif errors:
+            status = 'error'
+        else:
+            status = 'complete'
+        result = {
+            'status': status,
+            'elapsed_s': round(time.monotonic() - started, 3),
+            'errors': errors,
+            'models': summary,
+        }
+        print(f"Update {result['status']} after {result['elapsed_s']:.1f}s: " + ", ".join(
+            f"{name}={e['status']}" for name, e in summary.items()
+        ))
+        return result
@@ -0,0 +1,77 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import os
+import socket
+from multiprocessing import Process
+from garmin.updaters import DataUpdater
+from garmin.io.db_manager import DatabaseManager
+from garmin.api import GarminSession
+from garmin.scheduler import Deadline
+
+def run_worker(worker_id, lease_s, max_shards, deadline_s, max_attempts):
+    # Each process needs its own engine and HTTP session
+    db_manager = DatabaseManager(pool_size=2)
+    session = GarminSession()
+    updater = DataUpdater(session=session, db_manager=db_manager)
+    summary = updater.run_backfill_worker(
+        worker_id,
+        lease_s=lease_s,
+        max_shards=max_shards,
+        deadline=Deadline(deadline_s) if deadline_s else None,
+        max_attempts=max_attempts,
+    )
+    print(f"[{worker_id}] Finished: {summary}")
+
+def main():
+    """
+    Sharded backfill of the detailed metrics.
+
+        python -m garmin.scripts.backfill_worker --plan 2015-01-01
+        python -m garmin.scripts.backfill_worker --processes 4
+        python -m garmin.scripts.backfill_worker --reset-failed --processes 0
+
+    Planning registers metric x month shards in the database; workers (in
+    this or any other process/machine sharing the database) then claim and
+    run them until none are left. Failed shards are retried with a backoff
+    up to --max-attempts times; --reset-failed puts them back to pending.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--plan', metavar='START_DATE', help='Register shards from START_DATE to --end-date.')
+    parser.add_argument('--end-date', help='Last date to plan (default: today).')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes to start.')
+    parser.add_argument('--lease-s', type=float, default=900, help='Shard lease length in seconds.')
+    parser.add_argument('--max-shards', type=int, help='Shards per worker before exiting.')
+    parser.add_argument('--max-attempts', type=int, default=5, help='Claims per shard before a failed one is left alone.')
+    parser.add_argument('--reset-failed', action='store_true', help='Put failed shards back to pending first.')
+    parser.add_argument('--deadline-s', type=float, help='Stop claiming and release shards after this many seconds.')
+    args = parser.parse_args()
+
+    if args.reset_failed:
+        print(f"Reset {DatabaseManager().reset_backfill_shards()} failed shards.")
+    if args.plan:
+        db_manager = DatabaseManager()
+        updater = DataUpdater(session=GarminSession(), db_manager=db_manager)
+        updater.plan_backfill(args.plan, args.end_date)
+        print(db_manager.get_backfill_progress())
+    if args.processes < 1:
+        return
+
+    base_id = f"{socket.gethostname()}-{os.getpid()}"
+    worker_args = (args.lease_s, args.max_shards, args.deadline_s, args.max_attempts)
+    if args.processes <= 1:
+        run_worker(base_id, *worker_args)
+        return
+    procs = [
+        Process(target=run_worker, args=(f"{base_id}-{i}", *worker_args))
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    print(DatabaseManager().get_backfill_progress())
+
+if __name__ == "__main__":
+    main()
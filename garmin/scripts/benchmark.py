@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+from garmin.benchmarks import SIZES, STAGES, compare, run_benchmarks
+
+def main():
+    """
+    Times and memory-profiles the pipeline stages on fixed synthetic inputs.
+
+        python -m garmin.scripts.benchmark --out bench.json
+        python -m garmin.scripts.benchmark --save-baseline data/bench_baseline.json
+        python -m garmin.scripts.benchmark --baseline data/bench_baseline.json
+
+    No credentials or network are needed. With --baseline the run is compared
+    against a stored result and the exit status is 1 if any stage got slower,
+    used more memory than the tolerances allow, or stopped running ('error',
+    'skipped' or missing), so it can gate a deploy.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small'],
+                        help=f'Input sizes in days of history: {SIZES}.')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='Stages to run (default: all).')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage; the best is reported.')
+    parser.add_argument('--out', metavar='PATH', help='Write the results as JSON to PATH.')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Write the results as the new baseline.')
+    parser.add_argument('--baseline', metavar='PATH', help='Compare against this stored result.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative slowdown or memory growth per stage.')
+    parser.add_argument('--min-delta-s', type=float, default=0.01,
+                        help='Ignore slowdowns smaller than this many seconds.')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.stages, args.repeat)
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance, args.tolerance, args.min_delta_s)
+        print(f"\nAgainst {args.baseline} (commit {baseline['meta'].get('git_commit')}):")
+        for r in rows:
+            flag = 'REGRESSION' if r['regression'] else 'ok'
+            if r['status'] != 'ok':
+                print(f"{r['stage']:<28} {r['status']:>31}  {flag}")
+                continue
+            print(f"{r['stage']:<28} {r['time_ratio']:>6.2f}x time  {r['mem_ratio']:>6.2f}x mem  {flag}")
+        regressions = [r['stage'] for r in rows if r['regression']]
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import json
+from garmin.mock import MockConfig, REAL_HISTORY_DAYS, generate_database, write_archive
+
+def main():
+    """
+    Generates a synthetic multi-year Garmin account for scale benchmarks.
+
+        python -m garmin.scripts.generate_synthetic --scale 10 --db-uri sqlite:///data/bench_10x.db
+        python -m garmin.scripts.generate_synthetic --scale 1 --archive data/synthetic_1x
+
+    --scale multiplies the history of our real account (REAL_HISTORY_DAYS);
+    --days sets it directly. With --db-uri the tables are filled through the
+    real updater; with --archive raw API responses are written as a
+    ResponseArchive that can be replayed offline with
+    `python -m garmin.scripts.manual_replay --archive DIR`.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0, help=f'Multiple of {REAL_HISTORY_DAYS} days of history.')
+    parser.add_argument('--days', type=int, help='Days of history (overrides --scale).')
+    parser.add_argument('--end-date', help='Last day of the history (default: today).')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db-uri', help='Fill this database.')
+    parser.add_argument('--archive', metavar='DIR', help='Write a response archive under DIR.')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent models/days when filling a database.')
+    args = parser.parse_args()
+    if not args.db_uri and not args.archive:
+        parser.error('give --db-uri and/or --archive')
+
+    config = MockConfig.at_scale(args.scale, end_date=args.end_date, seed=args.seed)
+    if args.days:
+        config.history_days = args.days
+    print(f"Synthetic account: {config.history_days} days of history")
+
+    if args.archive:
+        from garmin.io.archive import ResponseArchive
+        from garmin.io.file_manager import FileManager
+        archive = ResponseArchive(FileManager('local', local_dir=args.archive))
+        print(f"Wrote archive: {write_archive(archive, config)}")
+    if args.db_uri:
+        from garmin.io.db_manager import DatabaseManager
+        db_manager = DatabaseManager(args.db_uri, pool_size=args.workers + 1)
+        summary = generate_database(db_manager, config, max_workers=args.workers)
+        print(json.dumps({
+            'status': summary['status'],
+            'elapsed_s': round(summary['elapsed_s'], 1),
+            'requests': summary['requests'],
+            'activities': summary['activities'],
+            'rows': {table: m['rows'] for table, m in summary['models'].items()},
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
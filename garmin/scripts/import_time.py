@@ -0,0 +1,66 @@
+import argparse
+import subprocess
+import sys
+
+def measure(modules: list[str] = ()) -> list[tuple[str, int, int]]:
+    """
+    Cold-imports `modules` (or nothing, to see what interpreter startup
+    imports) in one fresh interpreter with `-X importtime`.
+
+    Returns:
+        list[tuple[str, int, int]]: `(module, self_us, cumulative_us)` for
+            every module imported, in import order.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}" if modules else 'pass'],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{proc.stderr}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def main():
+    """
+    Reports the cold import time of some modules (by default the Lambda
+    handler and everything it imports per invocation) and optionally fails if
+    it exceeds a budget, e.g. in CI:
+
+        python -m garmin.scripts.import_time --budget-ms 1500
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('modules', nargs='*', help='Modules to import together (default: the Lambda handler set).')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules to list.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs; the fastest is reported.')
+    parser.add_argument('--budget-ms', type=float, help='Exit with status 1 if the import takes longer.')
+    args = parser.parse_args()
+
+    modules = args.modules
+    if not modules:
+        from garmin.scripts.lambda_update import HANDLER_IMPORTS
+        modules = ['garmin.scripts.lambda_update', *HANDLER_IMPORTS]
+    startup = {name for name, _, _ in measure()}
+    runs = [
+        [row for row in measure(modules) if row[0] not in startup]
+        for _ in range(max(1, args.repeat))
+    ]
+    # Every module's own time, so nothing imported by more than one is counted twice
+    best = min(runs, key=lambda r: sum(s for _, s, _ in r))
+    total_ms = sum(s for _, s, _ in best) / 1000
+
+    print(f"{', '.join(modules)}: {total_ms:.1f} ms cold import ({len(best)} modules, best of {len(runs)})")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(best, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"Import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
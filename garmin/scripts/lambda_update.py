@@ -1,13 +1,41 @@
 """
 Lambda handler for triggering Garmin data update from AWS Lambda.
+
+The updater stack is imported inside the handler, and garth and boto3 only
+where they are first used, so loading this module is cheap.
+`python -m garmin.scripts.import_time` measures this module plus
+HANDLER_IMPORTS, i.e. what an invocation really imports.
 """
-from garmin.updaters import DataUpdater
-from garmin.io.db_manager import DatabaseManager
-from garmin.api import GarminSession
+import os
+from garmin import instrumentation, profiling
+from garmin.scheduler import Deadline
+
+# Modules an invocation imports: the handler's own imports below, plus the
+# pullers DataUpdater imports when it builds its defaults (these bring in
+# pandas, numpy and tqdm). Keep in step with both.
+HANDLER_IMPORTS = (
+    'garmin.updaters', 'garmin.io.db_manager', 'garmin.api',
+    'garmin.pullers.health', 'garmin.pullers.health_detailed',
+)
 
 def lambda_handler(event, context):
-    db_manager = DatabaseManager()
+    deadline = Deadline.from_lambda_context(context)
+    # GARMIN_PROFILE=1 profiles every invocation; the event can ask for one
+    if (event or {}).get('profile'):
+        profiling.enable()
+    from garmin.updaters import DataUpdater
+    from garmin.io.db_manager import DatabaseManager
+    from garmin.api import GarminSession
+
+    max_workers = int(os.environ.get('GARMIN_UPDATE_WORKERS', 1))
+    # One connection per concurrent model plus one for ledger/planning queries
+    db_manager = DatabaseManager(pool_size=max_workers + 1)
     session = GarminSession()
     updater = DataUpdater(session=session, db_manager=db_manager)
-    updater.update_all()
-    return {"status": "success"}
+    summary = updater.update_all(deadline=deadline, max_workers=max_workers)
+    if session.garth is not None:
+        # Persist a token garth refreshed mid-run so the next invocation reuses it
+        session.refresh_token()
+    instrumentation.flush(status=summary["status"], requests=session.stats["requests"])
+    profiling.write_report()
+    return {"status": "success" if summary["status"] != "error" else "error", "summary": summary}
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from dataclasses import asdict, fields
+from multiprocessing import Process, Queue
+from urllib.request import urlopen
+from garmin.mock import MockConfig, MockGarminServer, SyntheticPayloads
+
+def serve(config, queue):
+    server = MockGarminServer(config)
+    queue.put(server.base_url)
+    server.httpd.serve_forever()
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / (1024 if os.uname().sysname == 'Darwin' else 1)
+
+def row_counts(db_manager) -> dict:
+    from sqlalchemy import func, select
+    from garmin.io.models import Base
+    with db_manager.engine.connect() as conn:
+        return {
+            name: conn.execute(select(func.count()).select_from(table)).scalar()
+            for name, table in Base.metadata.tables.items()
+        }
+
+def run_load_test(config: MockConfig, max_workers=1, rate=1000.0, deadline_s=None,
+                  db_uri=None, work_dir=None) -> dict:
+    """
+    Starts a MockGarminServer in its own process (so its CPU does not count
+    against the client), runs a full `update_all` against it into a fresh
+    database and reports throughput and the client's peak RSS.
+    """
+    from garmin.api import GarminSession
+    from garmin.io.db_manager import DatabaseManager
+    from garmin.io.file_manager import FileManager
+    from garmin.pullers.health import HealthPuller
+    from garmin.rate_limit import RateLimiter
+    from garmin.scheduler import Deadline
+    from garmin.updaters import DataUpdater
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix='garmin_load_')
+    queue = Queue()
+    proc = Process(target=serve, args=(config, queue), daemon=True)
+    proc.start()
+    try:
+        base_url = queue.get(timeout=30)
+        session = GarminSession(
+            data_dir=work_dir, base_url=base_url,
+            rate_limiter=RateLimiter(rate=rate, burst=max(1, int(rate))),
+        )
+        db_manager = DatabaseManager(
+            db_uri or f"sqlite:///{os.path.join(work_dir, 'garmin.db')}", pool_size=max_workers + 1,
+        )
+        updater = DataUpdater(
+            session=session, db_manager=db_manager,
+            health_puller=HealthPuller(session, file_manager=FileManager('local', local_dir=work_dir)),
+        )
+        start_date = SyntheticPayloads(config).first_day.strftime('%Y-%m-%d')
+        t0 = time.monotonic()
+        summary = updater.update_all(
+            deadline=Deadline(deadline_s) if deadline_s else None,
+            max_workers=max_workers, start_date=start_date,
+        )
+        elapsed = time.monotonic() - t0
+        with urlopen(f"{base_url}/__stats") as res:
+            server_stats = json.load(res)
+    finally:
+        proc.terminate()
+        proc.join()
+
+    rows = row_counts(db_manager)
+    data_rows = sum(n for name, n in rows.items() if name not in ('pull_ledger', 'update_checkpoints', 'backfill_shards'))
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'requests': server_stats['requests'],
+        'requests_per_s': round(server_stats['requests'] / elapsed, 1),
+        'rows': data_rows,
+        'rows_per_s': round(data_rows / elapsed, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'server': {k: v for k, v in server_stats.items() if k != 'config'},
+        'client': session.stats,
+        'tables': rows,
+        'status': summary['status'],
+        'errors': summary['errors'],
+        'config': {**asdict(config), 'max_workers': max_workers, 'rate': rate},
+    }
+
+def main():
+    """
+    End-to-end load test of update_all against a local mock Garmin Connect.
+
+        python -m garmin.scripts.load_test --days 365 --workers 4 --latency-ms 50
+        python -m garmin.scripts.load_test --rate-429 0.05 --cold-fraction 0.2 --json out.json
+
+    No credentials, network or AWS access are needed; the database and
+    learned chunk sizes go to a temporary directory unless --db-uri is given.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=90, help='Days of history to serve and pull.')
+    parser.add_argument('--workers', type=int, default=1, help='Models updated concurrently.')
+    parser.add_argument('--rate', type=float, default=1000.0, help='Client rate limit, requests/second.')
+    parser.add_argument('--deadline-s', type=float, help='Stop the update after this many seconds.')
+    parser.add_argument('--db-uri', help='Database to write to (default: a temporary sqlite file).')
+    parser.add_argument('--json', metavar='PATH', help='Also write the report to PATH.')
+    for field in fields(MockConfig):
+        if field.name == 'history_days':
+            continue
+        kind = str if field.default is None else type(field.default)
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=kind, default=field.default)
+    args = parser.parse_args()
+
+    config = MockConfig(history_days=args.days, **{
+        f.name: getattr(args, f.name) for f in fields(MockConfig) if f.name != 'history_days'
+    })
+    report = run_load_test(config, args.workers, args.rate, args.deadline_s, args.db_uri)
+    print(f"{report['status']}: {report['elapsed_s']:.1f}s, "
+          f"{report['requests']} requests ({report['requests_per_s']:.1f}/s), "
+          f"{report['rows']} rows ({report['rows_per_s']:.1f}/s), "
+          f"peak RSS {report['peak_rss_mb']:.0f} MB")
+    print(f"Server: {report['server']}")
+    if report['errors']:
+        print(f"Errors: {report['errors']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+from garmin.updaters import DataUpdater
+from garmin.io.db_manager import DatabaseManager
+from garmin.io.archive import ResponseArchive, ReplaySession
+from garmin.io.file_manager import FileManager
+from garmin.pullers.health import HealthPuller
+
+def main():
+    """
+    Rebuilds the database from the raw response archive (recorded with
+    GARMIN_RAW_ARCHIVE=1, or written by generate_synthetic --archive)
+    without any network access.
+
+        python -m garmin.scripts.manual_replay
+        python -m garmin.scripts.manual_replay --archive data/synthetic_1x --db-uri sqlite:///data/replay.db
+
+    Pulls cover the archive's own date range. Daily windows need not match
+    the recorded ones: ReplaySession assembles them from the archived days.
+    Detailed days missing from the archive are recorded as unknown instead
+    of failing the metric.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--archive', metavar='DIR', help='Local archive root (default: the FileManager default).')
+    parser.add_argument('--db-uri', help='Database to fill (default: the DatabaseManager default).')
+    parser.add_argument('--start-date', help="First day to replay (default: the archive's first day).")
+    parser.add_argument('--end-date', help="Last day to replay (default: the archive's last day).")
+    args = parser.parse_args()
+
+    fm = FileManager('local', local_dir=args.archive) if args.archive else None
+    archive = ResponseArchive(fm)
+    span = archive.date_range()
+    if span is None and not (args.start_date and args.end_date):
+        print("Archive holds no dated responses; nothing to replay.")
+        return
+    start_date = args.start_date or span[0]
+    end_date = args.end_date or span[1]
+    print(f"Replaying {start_date}..{end_date}")
+
+    db_manager = DatabaseManager(args.db_uri)
+    session = ReplaySession(archive)
+    updater = DataUpdater(
+        session=session,
+        db_manager=db_manager,
+        # Replayed response times say nothing about Garmin; don't learn from them
+        health_puller=HealthPuller(session, adaptive=False),
+    )
+    summary = updater.update_all(start_date=start_date, end_date=end_date)
+    print(f"Replayed {session.stats['requests']} requests ({session.stats['misses']} not in archive); "
+          f"status {summary['status']}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
+import os
+from garmin import instrumentation, profiling
 from garmin.updaters import DataUpdater
 from garmin.io.db_manager import DatabaseManager
 from garmin.api import GarminSession
 
 def main():
-    db_manager = DatabaseManager()
+    """
+    Pulls everything new from Garmin Connect into the database.
+
+        python -m garmin.scripts.manual_update --profile
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile each stage and write the profiles (same as GARMIN_PROFILE=1).')
+    if parser.parse_args().profile:
+        profiling.enable()
+    max_workers = int(os.environ.get('GARMIN_UPDATE_WORKERS', 1))
+    db_manager = DatabaseManager(pool_size=max_workers + 1)
     session = GarminSession()
     updater = DataUpdater(session=session, db_manager=db_manager)
-    updater.update_all()
+    summary = updater.update_all(max_workers=max_workers)
+    instrumentation.flush(status=summary["status"], requests=session.stats["requests"])
+    profiling.write_report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
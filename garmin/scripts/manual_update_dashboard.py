@@ -1,19 +1,36 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
+from garmin import instrumentation, profiling
 from garmin.io.file_manager import FileManager
 from garmin.analysis.plotting import make_metric_bokeh_plot
 
 def main():
+    """
+    Renders the metric dashboards from the processed data.
+
+        python -m garmin.scripts.manual_update_dashboard --profile
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile each stage and write the profiles (same as GARMIN_PROFILE=1).')
+    if parser.parse_args().profile:
+        profiling.enable()
     fm = FileManager()
     moving_average_lims = (0, 150)
     metrics = ['health_stats', 'heart_rate', 'sleep', 'steps']
     for metric in metrics:
-        df = fm.read_df(f'processed/{metric}.parquet', format='parquet')
-        df_ma = fm.read_df(f'moving_averages/{metric}.parquet', format='parquet')
-        script, div = make_metric_bokeh_plot(metric, df, df_ma, ma_lims=moving_average_lims)
-        fm.write_text(script, f"dashboards/metric_timeseries/{metric}_timeseries_script.html")
-        fm.write_text(div, f"dashboards/metric_timeseries/{metric}_timeseries_div.html")
+        with profiling.stage('load'):
+            df = fm.read_df(f'processed/{metric}.parquet', format='parquet')
+            df_ma = fm.read_df(f'moving_averages/{metric}.parquet', format='parquet')
+        with profiling.stage('render'):
+            script, div = make_metric_bokeh_plot(metric, df, df_ma, ma_lims=moving_average_lims)
+        with profiling.stage('save'):
+            fm.write_text(script, f"dashboards/metric_timeseries/{metric}_timeseries_script.html")
+            fm.write_text(div, f"dashboards/metric_timeseries/{metric}_timeseries_div.html")
+    instrumentation.flush()
+    profiling.write_report(fm)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,13 +1,11 @@
 ## garmin/updaters.py
 
-import pandas as pd
-from datetime import datetime, timedelta
-from tqdm import tqdm
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Callable
+from garmin import instrumentation, profiling
 from garmin.io.db_manager import DatabaseManager
-from garmin.pullers.health import HealthPuller
-from garmin.pullers.health_detailed import HealthDetailedPuller
-from sqlalchemy.dialects.postgresql import insert
+from garmin.scheduler import UpdateScheduler
 from garmin.io.models import (
     HealthStats, Steps, Sleep, Stress, BodyBattery, HeartRate,
     HeartRateDetailed, SpO2Detailed, StepsDetailed, RespirationDetailed
@@ -21,10 +19,44 @@ class DataUpdater:
         health_puller=None,
         health_detailed_puller=None,
         activity_puller=None,
+        write_strategy: str = "auto",
+        detailed_chunk_days: int = 7,
+        retry_limit: int = 60,
+        time_budget_s: float = None,
     ):
+        """
+        Args:
+            write_strategy: How upserts are written. 'batch' executes one
+                INSERT ... ON CONFLICT per batch of rows, 'copy' streams through a COPY staging table
+                (PostgreSQL only, falls back to 'batch' elsewhere), and 'auto'
+                uses 'copy' for the high-volume detailed tables and 'batch' for
+                the daily ones.
+            detailed_chunk_days: Number of days pulled before each commit when
+                streaming detailed metrics. Bounds memory and the work lost if
+                a run is interrupted.
+            retry_limit: Maximum number of previously denied or unknown dates
+                retried per detailed metric per run. New dates are not limited.
+            time_budget_s: Seconds a detailed metric may spend pulling in one
+                run. Checked between chunks; anything left over is picked up
+                by the next run.
+        """
+        if write_strategy not in ("auto", "batch", "copy"):
+            raise ValueError(f"Unknown write strategy: {write_strategy}")
+        self.write_strategy = write_strategy
+        self.detailed_chunk_days = detailed_chunk_days
+        self.retry_limit = retry_limit
+        self.time_budget_s = time_budget_s
         self.db = db_manager or DatabaseManager()
-        self.health_puller = health_puller or HealthPuller(session)
-        self.health_detailed_puller = health_detailed_puller or HealthDetailedPuller(session)
+        # The pullers bring in pandas and tqdm; imported here so that loading
+        # this module (e.g. at Lambda init) stays cheap
+        if health_puller is None:
+            from garmin.pullers.health import HealthPuller
+            health_puller = HealthPuller(session)
+        if health_detailed_puller is None:
+            from garmin.pullers.health_detailed import HealthDetailedPuller
+            health_detailed_puller = HealthDetailedPuller(session)
+        self.health_puller = health_puller
+        self.health_detailed_puller = health_detailed_puller
         #self.activity_puller = activity_puller or ActivityPuller(session)
         
         self.pull_fn_map = {
@@ -39,6 +71,12 @@ class DataUpdater:
             SpO2Detailed: lambda **kwargs: self.health_detailed_puller.pull_data('spo2', **kwargs),
             StepsDetailed: lambda **kwargs: self.health_detailed_puller.pull_data('steps', **kwargs),
         }
+        self.stream_fn_map = {
+            HeartRateDetailed: lambda puller=None, **kwargs: (puller or self.health_detailed_puller).iter_data('heart_rate', **kwargs),
+            RespirationDetailed: lambda puller=None, **kwargs: (puller or self.health_detailed_puller).iter_data('respiration', **kwargs),
+            SpO2Detailed: lambda puller=None, **kwargs: (puller or self.health_detailed_puller).iter_data('spo2', **kwargs),
+            StepsDetailed: lambda puller=None, **kwargs: (puller or self.health_detailed_puller).iter_data('steps', **kwargs),
+        }
         self.updater_map = {
             HealthStats: self._update_daily_time_series,
             Steps: self._update_daily_time_series,
@@ -52,22 +90,45 @@ class DataUpdater:
             StepsDetailed: self._update_detailed_time_series,
         }
 
+    def _upsert(self, model_class, df, index_elements, batch_size=None, detailed=False, conn=None):
+        """
+        Bulk upserts `df` and reports per-batch row counts and timings.
+        Errors propagate so the caller can isolate the failing model.
+        """
+        strategy = self.write_strategy
+        if strategy == "auto":
+            strategy = "copy" if detailed else "batch"
+        with (instrumentation.span('db.upsert', label=model_class.__tablename__, strategy=strategy) as span,
+              profiling.stage('upsert')):
+            stats = self.db.upsert_df(
+                model_class, df, index_elements, strategy=strategy, conn=conn, max_rows=batch_size
+            )
+            span.add('rows', sum(b.rows for b in stats))
+            span.add('batches', len(stats))
+        total = sum(b.seconds for b in stats)
+        print(
+            f"Upserted {sum(b.rows for b in stats)} rows into {model_class.__tablename__} "
+            f"in {len(stats)} batches ({total:.2f}s)."
+        )
+        return stats
+
     def _update_daily_time_series(
         self,
         model_class,
         start_date: str = "2015-01-01",
-        batch_size: int = 100,
+        batch_size: int = None,
+        end_date: str = None,
     ):
+        import pandas as pd
         pull_fn = self.pull_fn_map.get(model_class)
         if pull_fn is None:
             raise ValueError(f"No puller found for {model_class.__name__}")
-        existing_records = self.db.get_records(model_class)
-        if existing_records:
-            last_date = max(r.date for r in existing_records)
+        last_date = self.db.get_latest_date(model_class)
+        if last_date is not None:
             start_date = last_date.strftime("%Y-%m-%d")
 
         today = datetime.today().date()
-        df = pull_fn(start_date=start_date, end_date=today.strftime("%Y-%m-%d"))
+        df = pull_fn(start_date=start_date, end_date=end_date or today.strftime("%Y-%m-%d"))
         if df.empty:
             print(f"No {model_class.__tablename__} data returned from Garmin.")
             return
@@ -76,124 +137,286 @@ class DataUpdater:
         df["date_pulled"] = today
         print('Data pulled, upserting')
 
-        session = self.db.Session()
-        try:
-            batch = []
-            for i, (_, row) in enumerate(tqdm(df.iterrows(), total=len(df)), 1):
-                data = row.to_dict()
-                stmt = insert(model_class).values(**data)
-                update_cols = {c: stmt.excluded[c] for c in data if c != "id"}
-                stmt = stmt.on_conflict_do_update(index_elements=["date"], set_=update_cols)
-                batch.append(stmt)
-
-                if i % batch_size == 0:
-                    for b in batch:
-                        session.execute(b)
-                    session.commit()
-                    batch = []
-
-            # Final batch
-            for b in batch:
-                session.execute(b)
-            session.commit()
-
-        except Exception as e:
-            session.rollback()
-            print("Error upserting records:", e)
-        finally:
-            session.close()
+        self._upsert(model_class, df, ["date"], batch_size)
+
+    def _plan_detailed_dates(self, model_class, start_date: str = "2015-01-01",
+                             end_date: str = None) -> list[str]:
+        """
+        Returns the query dates to pull this run, in the order to pull them:
+        dates from `start_date` to `end_date` (default today) that were never
+        attempted, newest first, followed by up to `retry_limit` denied/unknown
+        dates in that range from the ledger's retry queue whose backoff has
+        elapsed.
+        """
+        import pandas as pd
+        today = datetime.today().date()
+        if end_date is not None:
+            today = min(today, datetime.strptime(end_date, "%Y-%m-%d").date())
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        metric = model_class.__tablename__
+        if not self.db.has_pull_ledger(metric):
+            self.db.seed_pull_ledger(metric, model_class)
+
+        ledger = self.db.get_pull_ledger(metric)
+        date_list = pd.date_range(start=start, end=today).date
+        new_dates = [d for d in reversed(date_list) if d not in ledger]
+        retry_dates = self.db.get_retry_queue(
+            metric, limit=self.retry_limit, start_date=start, end_date=today
+        )
+        if retry_dates:
+            print(f"Retrying {len(retry_dates)} dates for {metric}.")
+        return [d.strftime('%Y-%m-%d') for d in new_dates + retry_dates]
+
+    def _write_detailed_chunk(self, model_class, df, status_map, batch_size=None, checkpoint=None):
+        """
+        Upserts one pulled chunk of detailed samples, records its ledger status
+        and saves `checkpoint` (keyword arguments for
+        `DatabaseManager.save_checkpoint`) in a single transaction. If anything
+        raises, none of it is committed and the dates are planned again.
+        """
+        import pandas as pd
+        from garmin.pullers.health_detailed import PULL_STATUSES
+        metric = model_class.__tablename__
+        dt_cols = ['query_date', 'date_pulled', 'start_gmt', 'end_gmt']
+        df = df.copy()
+        df["date_pulled"] = datetime.today().date()
+        df["pull_status"] = "fetched"
+        for col in dt_cols:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col]).dt.date
+        df["date_time_utc"] = pd.to_datetime(df["date_time_utc"], utc=True)
 
-        print(f"Upserted {len(df)} rows into {model_class.__tablename__}.")
+        attempted = [d for status in PULL_STATUSES for d in status_map.get(status, [])]
+        with self.db.transaction() as conn:
+            if not df.empty:
+                print(f"Upserting {len(df)} rows to {metric}")
+                self._upsert(model_class, df, ["date_time_utc"], batch_size, detailed=True, conn=conn)
+            self.db.record_pull_status(
+                metric,
+                self._ledger_statuses(attempted, status_map),
+                row_counts=df.groupby("query_date").size().to_dict(),
+                conn=conn,
+            )
+            if checkpoint is not None:
+                self.db.save_checkpoint(metric, conn=conn, **checkpoint)
 
     def _update_detailed_time_series(
         self,
         model_class,
         start_date: str = "2015-01-01",
-        batch_size: int = 100,
+        batch_size: int = None,
+        end_date: str = None,
     ):
-        pull_fn = self.pull_fn_map.get(model_class)
-        if pull_fn is None:
-            raise ValueError(f"No puller found for {model_class.__name__}")
-        
-        today = datetime.today().date()
-        session = self.db.Session()
+        """
+        Streams the detailed metric day by day, committing samples and ledger
+        status every `detailed_chunk_days` days so memory stays bounded and an
+        interrupted run keeps everything committed so far. Stops between
+        chunks once `time_budget_s` is spent.
+        """
+        for _ in self.iter_detailed_updates(model_class, start_date, batch_size, end_date):
+            pass
 
-        # Find which query dates to pull
-        existing = session.query(model_class.query_date, model_class.pull_status).all()
-        existing_status = {r.query_date: r.pull_status for r in existing}
+    def iter_detailed_updates(self, model_class, start_date: str = "2015-01-01",
+                              batch_size: int = None, end_date: str = None, puller=None,
+                              deadline=None):
+        """
+        Generator form of `_update_detailed_time_series`: pulls and commits one
+        chunk of `detailed_chunk_days` dates per step and yields a summary of
+        it, so callers can interleave metrics or stop between chunks with
+        everything so far committed.
 
-        date_list = pd.date_range(start=start_date, end=today).date
-        to_pull = [
-            d.strftime('%Y-%m-%d') for d in date_list
-            if existing_status.get(d) not in {"fetched", "no_data"}
-        ]
+        Progress is checkpointed per metric and date scope with every chunk.
+        If the previous run over the same scope did not finish, its progress
+        counters carry over. The dates it still had planned are pulled again
+        in the order `_plan_detailed_dates` gives, so the newest days still come
+        first when every run is cut short. Dates the ledger shows were
+        committed are not fetched or written again.
+
+        Pass a `puller` (e.g. `health_detailed_puller.fork()`) when several
+        of these run at once, so they do not share per-pull state. The stream
+        ends early, between chunks, once `time_budget_s` is spent; the
+        checkpoint is left running so the next run picks up the rest. A
+        `deadline` (scheduler.Deadline) is passed to the puller so that
+        waiting on cache warms within a chunk cannot run past it.
+
+        Yields:
+            dict: 'dates' resolved and 'rows' written in the chunk, and
+                'remaining_dates' still planned this run.
+        """
+        stream_fn = self.stream_fn_map.get(model_class)
+        if stream_fn is None:
+            raise ValueError(f"No puller found for {model_class.__name__}")
+
+        # Only time spent in this generator counts, not time the caller spends
+        # on other metrics' streams between chunks
+        t_resume = time.monotonic()
+        spent = 0.0
+        metric = model_class.__tablename__
+        scope = f"{start_date}..{end_date or ''}"
+        to_pull = self._plan_detailed_dates(model_class, start_date, end_date)
+        previous = self.db.get_checkpoint(metric, scope)
+        if previous is not None and previous['status'] == 'running':
+            planned = set(to_pull)
+            resumed = [d for d in previous['remaining_dates'] if d in planned]
+            print(
+                f"Resuming {metric} from checkpoint: {len(resumed)} dates carried over, "
+                f"last committed {previous['last_committed_date']}."
+            )
         if not to_pull:
-            print(f"No dates to pull for {model_class.__tablename__}.")
+            print(f"No dates to pull for {metric}.")
             return
-        
-        df = pull_fn(dates=to_pull)
-        pulled_on = datetime.today().date()
 
-        # Map pull status to each record
-        status_map = getattr(self.health_detailed_puller, "_last_pull_status", {})
+        checkpoint = {
+            'scope': scope,
+            'status': 'running',
+            'remaining_dates': to_pull,
+            'last_committed_date': None,
+            'dates_done': 0,
+            'started_utc': datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+        if previous is not None and previous['status'] == 'running':
+            for key in ('last_committed_date', 'dates_done', 'started_utc'):
+                checkpoint[key] = previous[key]
+        self.db.save_checkpoint(metric, **checkpoint)
+        from garmin.pullers.health_detailed import PULL_STATUSES
+        stream = stream_fn(puller=puller, dates=to_pull, chunk_days=self.detailed_chunk_days,
+                           deadline=deadline)
+        try:
+            for df, status_map in stream:
+                resolved = {d for s in PULL_STATUSES for d in status_map.get(s, [])}
+                checkpoint['remaining_dates'] = [
+                    d for d in checkpoint['remaining_dates'] if d not in resolved
+                ]
+                checkpoint['dates_done'] += len(resolved)
+                if resolved:
+                    checkpoint['last_committed_date'] = datetime.strptime(max(resolved), "%Y-%m-%d").date()
+                if not checkpoint['remaining_dates']:
+                    checkpoint['status'] = 'complete'
+                self._write_detailed_chunk(model_class, df, status_map, batch_size, checkpoint)
+                spent += time.monotonic() - t_resume
+                yield {
+                    'dates': len(resolved),
+                    'rows': len(df),
+                    'remaining_dates': len(checkpoint['remaining_dates']),
+                }
+                t_resume = time.monotonic()
+                if (checkpoint['remaining_dates'] and self.time_budget_s is not None
+                        and spent > self.time_budget_s):
+                    print(f"Time budget spent for {metric}; remaining dates left for the next run.")
+                    break
+        finally:
+            stream.close()
 
-        df["date_pulled"] = pulled_on
-        df["pull_status"] = df["query_date"].apply(
-            lambda d: "fetched" if d in status_map['fetched'] else
-                    "denied"  if d in status_map['denied']  else
-                    "no_data" if d in status_map['no_data'] else "unknown"
-        )
-        # Add missing `no data` dates with minimal records
-        for d in set(status_map['no_data']) | set(status_map['denied']):
-            if d in df["query_date"]:
-                continue
-            if d in status_map['no_data']:
-                status = 'no_data'
-            elif d in status_map['denied']:
-                status = 'denied'
-            df = pd.concat([
-                df,
-                pd.DataFrame([{
-                    "query_date": d,
-                    "date_time_utc": datetime.combine(pd.to_datetime(d), datetime.max.time()),
-                    "date_pulled": pulled_on,
-                    "pull_status": status
-                }])
-            ], ignore_index=True)
-        
-        dt_cols = ['query_date', 'date_pulled', 'start_gmt', 'end_gmt']
-        for col in dt_cols:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col]).dt.date
-        df["date_time_utc"] = pd.to_datetime(df["date_time_utc"], utc=True)
+    def plan_backfill(self, start_date: str = "2015-01-01", end_date: str = None, models=None) -> int:
+        """
+        Splits a backfill of the detailed metrics into one shard per metric and
+        calendar month and registers them in the shard lease table. Daily
+        metrics are pulled in a few range requests and need no sharding.
+        Planning again is harmless: existing shards are kept as they are.
 
-        print(f"Upserting {len(df)} rows to {model_class.__tablename__}")
-        try:
-            batch = []
-            for i, (_, row) in enumerate(tqdm(df.iterrows(), total=len(df)), 1):
-                data = row.to_dict()
-                stmt = insert(model_class).values(**data)
-                update_cols = {c: stmt.excluded[c] for c in data if c != "id"}
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=["date_time_utc"],
-                    set_=update_cols
+        Returns:
+            int: Number of shards newly created.
+        """
+        import pandas as pd
+        models = [self._resolve_model_class(m) for m in (models or self.stream_fn_map)]
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else datetime.today().date()
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        shards = []
+        for month_start in pd.date_range(start.replace(day=1), end, freq="MS").date:
+            month_end = (pd.Timestamp(month_start) + pd.offsets.MonthEnd(0)).date()
+            for model_class in models:
+                if model_class not in self.stream_fn_map:
+                    raise ValueError(f"{model_class.__name__} is not a detailed metric")
+                shards.append((model_class.__tablename__, max(month_start, start), min(month_end, end)))
+        created = self.db.create_backfill_shards(shards)
+        print(f"Planned {len(shards)} backfill shards ({created} new).")
+        return created
+
+    def run_backfill_worker(self, worker_id: str, lease_s: float = 900, max_shards: int = None,
+                            deadline=None, models=None, batch_size: int = None,
+                            max_attempts: int = 5, retry_backoff_s: float = 600) -> dict:
+        """
+        Claims and executes backfill shards until none are left, `max_shards`
+        have been run, or `deadline` is near. Any number of workers, in any
+        number of processes, can run against the same database.
+
+        The lease is renewed after every committed chunk. A worker that loses
+        its lease stops working on that shard, and a worker that crashes simply
+        lets its lease expire so another one picks the shard up. Work already
+        committed is skipped via the pull ledger when a shard is re-run. Dates
+        that end up denied or unknown are left to the ledger's retry queue.
+        A shard that raises is marked failed and claimed again after
+        `retry_backoff_s`, doubling per attempt, until it has been attempted
+        `max_attempts` times; `DatabaseManager.reset_backfill_shards` puts
+        exhausted ones back.
+
+        Returns:
+            dict: Shard counts by outcome ('done', 'failed', 'released', 'lost').
+        """
+        metric_models = {m.__tablename__: m for m in self.stream_fn_map}
+        metrics = None
+        if models is not None:
+            metrics = [self._resolve_model_class(m).__tablename__ for m in models]
+        summary = {'done': 0, 'failed': 0, 'released': 0, 'lost': 0}
+        while max_shards is None or sum(summary.values()) < max_shards:
+            if deadline is not None and deadline.expired():
+                break
+            shard = self.db.claim_backfill_shard(worker_id, lease_s, metrics=metrics,
+                                                 max_attempts=max_attempts)
+            if shard is None:
+                break
+            model_class = metric_models[shard['metric']]
+            label = f"{shard['metric']} {shard['start_date']}..{shard['end_date']}"
+            print(f"[{worker_id}] Claimed {label} (attempt {shard['attempts']})")
+            outcome = 'done'
+            units = self.iter_detailed_updates(
+                model_class,
+                start_date=shard['start_date'].strftime("%Y-%m-%d"),
+                end_date=shard['end_date'].strftime("%Y-%m-%d"),
+                batch_size=batch_size,
+                deadline=deadline,
+            )
+            try:
+                for unit in units:
+                    if not self.db.renew_backfill_lease(shard['id'], worker_id, lease_s):
+                        outcome = 'lost'
+                        break
+                    if unit['remaining_dates'] > 0 and deadline is not None and deadline.expired():
+                        outcome = 'released'
+                        break
+            except Exception as e:
+                print(f"[{worker_id}] Error in {label}:", e)
+                self.db.complete_backfill_shard(
+                    shard['id'], worker_id, 'failed', str(e),
+                    retry_after_s=retry_backoff_s * 2 ** (shard['attempts'] - 1),
                 )
-                batch.append(stmt)
-
-                if i % batch_size == 0:
-                    for s in batch:
-                        session.execute(s)
-                    session.commit()
-                    batch = []
-
-            for s in batch:
-                session.execute(s)
-            session.commit()
-        except Exception as e:
-            session.rollback()
-            print(f"Error during upsert of {model_class.__tablename__}:", e)
-        finally:
-            session.close()
+                summary['failed'] += 1
+                continue
+            finally:
+                units.close()
+            if outcome == 'done':
+                self.db.complete_backfill_shard(shard['id'], worker_id, 'done')
+            elif outcome == 'released':
+                self.db.complete_backfill_shard(shard['id'], worker_id, 'pending')
+            summary[outcome] += 1
+            print(f"[{worker_id}] {label}: {outcome}")
+        return summary
+
+    @staticmethod
+    def _ledger_statuses(dates, status_map):
+        """
+        Maps each attempted date string to its pull status, defaulting to
+        'unknown' for dates the puller did not report on.
+        """
+        from garmin.pullers.health_detailed import PULL_STATUSES
+        statuses = {}
+        for status in PULL_STATUSES:
+            for d in status_map.get(status, []):
+                statuses[d] = status
+        return {
+            datetime.strptime(d, "%Y-%m-%d").date(): statuses.get(d, "unknown")
+            for d in dates
+        }
 
     def _resolve_model_class(self, class_or_name: str | type) -> type:
         if isinstance(class_or_name, str):
@@ -208,19 +431,38 @@ class DataUpdater:
     def update(self,
                model_class,
                start_date: str = "2015-01-01",
-               batch_size: int = 100):
+               batch_size: int = None,
+               end_date: str = None):
         model_class = self._resolve_model_class(model_class)
         self.updater_map[model_class](
             model_class,
             start_date=start_date,
-            batch_size=batch_size
+            batch_size=batch_size,
+            end_date=end_date,
         )
 
-    def update_all(self):
+    def update_all(self, deadline=None, max_workers: int = 1,
+                   start_date: str = "2015-01-01", end_date: str = None) -> dict:
+        """
+        Updates every model: daily metrics first, then the detailed metrics
+        interleaved chunk by chunk, stopping cleanly before `deadline`. A
+        failing model is recorded in the summary and does not stop the others.
+
+        Args:
+            deadline (Deadline, optional): When to stop; no limit if omitted.
+            max_workers (int): Models updated concurrently. With more than one,
+                each model runs on its own thread sharing this updater's
+                session and database pools, which should be sized to match.
+            start_date (str): Earliest date to fill for models with no data yet.
+            end_date (str, optional): Last date to pull; defaults to today.
+
+        Returns:
+            dict: Summary from `UpdateScheduler.run`.
+        """
         model_class_list = [
             "HealthStats", "Steps", "Sleep", "Stress", "BodyBattery", "HeartRate",
             "HeartRateDetailed", "SpO2Detailed",
             "StepsDetailed", "RespirationDetailed"
         ]
-        for model_class in model_class_list:
-            self.update(model_class)
\ No newline at end of file
+        models = [self._resolve_model_class(m) for m in model_class_list]
+        return UpdateScheduler(self, deadline, max_workers, start_date, end_date).run(models)
\ No newline at end of file